@@ -0,0 +1,162 @@
+# General Imports
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Mapping
+
+# Consumption Imports
+from consumptionbackend.Consumable import Consumable
+from consumptionbackend.Personnel import Personnel
+from consumptionbackend.Status import Status
+from synthetic import SyntheticLibrary, build_library, TYPES
+
+
+def time_operation(
+    operation: Callable[[random.Random], None], repeat: int, seed: int
+) -> Mapping[str, float]:
+    rng = random.Random(seed)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation(rng)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "repeat": repeat,
+        "min_ms": min(timings),
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+        "max_ms": max(timings),
+    }
+
+
+def operations(library: SyntheticLibrary) -> Mapping[str, Callable]:
+    def any_id(rng: random.Random) -> int:
+        return rng.randint(1, library.consumables)
+
+    def new(rng: random.Random):
+        Consumable.new(do_log=False, name="Benchmark", type=rng.choice(TYPES))
+
+    def update(rng: random.Random):
+        Consumable.update({"id": any_id(rng)}, {"rating": 5.0}, do_log=False)
+
+    def delete(rng: random.Random):
+        Consumable.delete(do_log=False, id=any_id(rng))
+
+    return {
+        "new": new,
+        "find_id": lambda rng: Consumable.find(id=any_id(rng)),
+        "find_series_id": lambda rng: Consumable.find(
+            series_id=rng.randint(1, library.series)
+        ),
+        "find_name": lambda rng: Consumable.find(name=f" {any_id(rng)}"),
+        "find_type": lambda rng: Consumable.find(type=rng.choice(TYPES)),
+        "find_status": lambda rng: Consumable.find(status=rng.choice(list(Status))),
+        "find_rating": lambda rng: Consumable.find(rating=5.5),
+        "find_tags": lambda rng: Consumable.find(tags=rng.sample(library.tags, 2)),
+        "get_personnel": lambda rng: Consumable(id=any_id(rng)).get_personnel(),
+        "get_tags": lambda rng: Consumable(id=any_id(rng)).get_tags(),
+        "personnel_get_consumables": lambda rng: Personnel(
+            id=rng.randint(1, library.personnel)
+        ).get_consumables(),
+        "update": update,
+        # Run last as it removes rows the other operations may select
+        "delete": delete,
+    }
+
+
+def run(size: int, repeat: int, seed: int, only: list) -> Mapping:
+    library = SyntheticLibrary(size, seed=seed)
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        db = build_library(os.path.join(directory, "bench.db"), library)
+        populate_s = time.perf_counter() - start
+        results = {}
+        for name, operation in operations(library).items():
+            if only and name not in only:
+                continue
+            results[name] = time_operation(operation, repeat, seed)
+        db.close()
+    return {
+        "size": size,
+        "seed": seed,
+        "populate_s": populate_s,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "operations": results,
+    }
+
+
+def compare(current: Mapping, baseline: Mapping, threshold: float) -> list:
+    regressions = []
+    for key, run_result in current.items():
+        old_run = baseline.get(key)
+        if old_run is None:
+            continue
+        for name, timing in run_result["operations"].items():
+            old = old_run["operations"].get(name)
+            if old is None or old["median_ms"] == 0:
+                continue
+            ratio = timing["median_ms"] / old["median_ms"]
+            if ratio > threshold:
+                regressions.append(
+                    f"{key}/{name}: {old['median_ms']:.3f}ms -> {timing['median_ms']:.3f}ms ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Time core consumptionbackend operations on synthetic libraries."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 10000],
+        help="number of consumables per generated library (e.g. 1000 100000 1000000)",
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=44)
+    parser.add_argument(
+        "--only", nargs="+", default=[], help="restrict to the named operations"
+    )
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of a previous run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="fail when a median exceeds the baseline median by this factor",
+    )
+    args = parser.parse_args(argv)
+
+    results = {
+        str(size): run(size, args.repeat, args.seed, args.only) for size in args.sizes
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
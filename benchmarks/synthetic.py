@@ -0,0 +1,150 @@
+# General Imports
+import random
+import sqlite3
+from collections.abc import Sequence
+
+# Consumption Imports
+from consumptionbackend.Database import DatabaseHandler, DatabaseInstantiator
+from consumptionbackend.Consumable import Consumable
+from consumptionbackend.Personnel import Personnel
+from consumptionbackend.Series import Series
+from consumptionbackend.Status import Status
+
+TYPES = ["NOVEL", "MANGA", "TV", "FILM", "GAME", "ANIME", "COMIC", "PODCAST"]
+ROLES = ["Author", "Illustrator", "Director", "Writer", "Composer", "Translator"]
+WORDS = [
+    "shadow",
+    "river",
+    "empire",
+    "glass",
+    "winter",
+    "engine",
+    "garden",
+    "silver",
+    "thousand",
+    "night",
+    "machine",
+    "ocean",
+    "last",
+    "crown",
+    "storm",
+    "paper",
+]
+FIRST_NAMES = ["Ursula", "Terry", "Kazuo", "Octavia", "Hayao", "Naoki", "Iain", "Jo"]
+LAST_NAMES = ["Le Guin", "Pratchett", "Ishiguro", "Butler", "Miyazaki", "Urasawa"]
+
+
+class SyntheticLibrary:
+    def __init__(
+        self,
+        consumables: int,
+        seed: int = 44,
+        series_ratio: float = 0.1,
+        personnel_ratio: float = 0.2,
+        tag_vocabulary: int = 60,
+        max_tags: int = 5,
+        max_credits: int = 3,
+    ) -> None:
+        self.consumables = consumables
+        self.seed = seed
+        self.series = max(1, int(consumables * series_ratio))
+        self.personnel = max(1, int(consumables * personnel_ratio))
+        self.tags = [f"tag{i}" for i in range(tag_vocabulary)]
+        self.max_tags = max_tags
+        self.max_credits = max_credits
+
+    def _name(self, rng: random.Random, index: int) -> str:
+        return f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {index}"
+
+    def populate(self, db: sqlite3.Connection, batch_size: int = 10000) -> None:
+        rng = random.Random(self.seed)
+        cur = db.cursor()
+        cur.executemany(
+            f"INSERT INTO {Series.DB_NAME} (id, name) VALUES (?,?)",
+            ((i, self._name(rng, i)) for i in range(1, self.series + 1)),
+        )
+        cur.executemany(
+            f"""INSERT INTO {Personnel.DB_NAME} (id, first_name, last_name, pseudonym)
+                VALUES (?,?,?,?)""",
+            (
+                (
+                    i,
+                    rng.choice(FIRST_NAMES),
+                    rng.choice(LAST_NAMES),
+                    rng.choice(WORDS) if rng.random() < 0.1 else None,
+                )
+                for i in range(1, self.personnel + 1)
+            ),
+        )
+        consumables, tags, credits = [], [], []
+        for i in range(1, self.consumables + 1):
+            consumables.append(self._consumable_row(rng, i))
+            for tag in rng.sample(self.tags, rng.randint(0, self.max_tags)):
+                tags.append((i, tag))
+            for personnel_id in rng.sample(
+                range(1, self.personnel + 1),
+                min(self.personnel, rng.randint(0, self.max_credits)),
+            ):
+                credits.append((personnel_id, i, rng.choice(ROLES)))
+            if len(consumables) >= batch_size:
+                self._flush(cur, consumables, tags, credits)
+        self._flush(cur, consumables, tags, credits)
+        db.commit()
+
+    def _consumable_row(self, rng: random.Random, index: int) -> Sequence:
+        status = rng.choice(list(Status))
+        max_parts = rng.randint(1, 200) if rng.random() < 0.8 else None
+        if status == Status.PLANNING:
+            parts = 0
+        elif status == Status.COMPLETED:
+            parts = max_parts or rng.randint(1, 50)
+        else:
+            parts = rng.randint(0, max_parts or 50)
+        start_date = 1.2e9 + rng.random() * 5e8 if status != Status.PLANNING else None
+        end_date = (
+            start_date + rng.random() * 3e7
+            if status == Status.COMPLETED and start_date
+            else None
+        )
+        return (
+            index,
+            rng.randint(1, self.series) if rng.random() < 0.4 else -1,
+            self._name(rng, index),
+            rng.choice(TYPES),
+            status.value,
+            parts,
+            max_parts,
+            1 if status == Status.COMPLETED else 0,
+            round(rng.uniform(1, 10), 1) if rng.random() < 0.7 else None,
+            start_date,
+            end_date,
+        )
+
+    @staticmethod
+    def _flush(cur: sqlite3.Cursor, consumables: list, tags: list, credits: list):
+        cur.executemany(
+            f"""INSERT INTO {Consumable.DB_NAME}
+                (id, series_id, name, type, status, parts, max_parts, completions, rating, start_date, end_date)
+                VALUES (?,?,?,?,?,?,?,?,?,?,?)""",
+            consumables,
+        )
+        cur.executemany(
+            f"INSERT INTO {Consumable.DB_TAG_MAPPING_NAME} (consumable_id, tag) VALUES (?,?)",
+            tags,
+        )
+        cur.executemany(
+            f"""INSERT OR IGNORE INTO {Consumable.DB_PERSONNEL_MAPPING_NAME}
+                (personnel_id, consumable_id, role) VALUES (?,?,?)""",
+            credits,
+        )
+        consumables.clear()
+        tags.clear()
+        credits.clear()
+
+
+def build_library(path: str, library: SyntheticLibrary) -> sqlite3.Connection:
+    db = sqlite3.connect(path)
+    DatabaseHandler.DB_CONNECTION = db
+    DatabaseInstantiator.run()
+    library.populate(db)
+    return db
@@ -0,0 +1,617 @@
+# General Imports
+from __future__ import annotations
+import json
+import re
+import sqlite3
+import time
+from abc import abstractmethod, ABC
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from typing import Union, Any
+
+# Consumption Imports
+from .Status import Status
+from .Libraries import combined_name
+
+# Columns of the tables behind the entity API, in table order
+TABLES = {
+    "series": ("id", "name"),
+    "personnel": ("id", "first_name", "last_name", "pseudonym"),
+    "consumables": (
+        "id",
+        "series_id",
+        "name",
+        "type",
+        "status",
+        "parts",
+        "max_parts",
+        "completions",
+        "rating",
+        "start_date",
+        "end_date",
+    ),
+    "consumable_tags": ("consumable_id", "tag"),
+    "consumable_personnel": ("personnel_id", "consumable_id", "role"),
+}
+# Mapping tables have no id and are keyed by their whole primary key
+PRIMARY_KEYS = {
+    "consumable_tags": ("consumable_id", "tag"),
+    "consumable_personnel": ("personnel_id", "consumable_id", "role"),
+}
+# Column defaults other than NULL
+DEFAULTS = {
+    "consumables": {"series_id": -1, "status": 0, "parts": 0, "completions": 0},
+}
+# Columns MemoryBackend hashes, those the entity filters and mapping lookups
+# compare by equality
+MEMORY_INDEXES = {
+    "consumables": ("series_id", "type", "status"),
+    "consumable_tags": ("consumable_id", "tag"),
+    "consumable_personnel": ("personnel_id", "consumable_id"),
+}
+
+
+def _hash_key(value: Any) -> Any:
+    # Upper case so case-insensitive filters can use the same index
+    return value.upper() if isinstance(value, str) else value
+
+
+class Filter(ABC):
+    @abstractmethod
+    def sql(self, column: str, across: bool = False) -> tuple[str, list]:
+        pass
+
+    @abstractmethod
+    def test(self, value: Any) -> bool:
+        pass
+
+    def hash_keys(self) -> Union[Iterable[Any], None]:
+        # Index keys any match is filed under, None if it needs a scan
+        return None
+
+
+class Equals(Filter):
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def sql(self, column: str, across: bool = False) -> tuple[str, list]:
+        return f"{column} = ?", [self.value]
+
+    def test(self, value: Any) -> bool:
+        # NULL is never equal to anything
+        return value is not None and value == self.value
+
+    def hash_keys(self) -> Iterable[Any]:
+        return [] if self.value is None else [_hash_key(self.value)]
+
+
+class NoCase(Filter):
+    def __init__(self, value: str) -> None:
+        self.value = value
+
+    def sql(self, column: str, across: bool = False) -> tuple[str, list]:
+        return f"upper({column}) = upper(?)", [self.value]
+
+    def test(self, value: Any) -> bool:
+        return value is not None and str(value).upper() == self.value.upper()
+
+    def hash_keys(self) -> Iterable[Any]:
+        return [self.value.upper()]
+
+
+class Like(Filter):
+    # Case-insensitive substring, % and _ in text stay LIKE wildcards
+    def __init__(self, text: str) -> None:
+        self.pattern = f"%{text}%"
+        self._regex = re.compile(
+            "".join(
+                ".*" if c == "%" else "." if c == "_" else re.escape(c)
+                for c in self.pattern
+            ),
+            re.I | re.S,
+        )
+
+    def sql(self, column: str, across: bool = False) -> tuple[str, list]:
+        return f"upper({column}) LIKE upper(?)", [self.pattern]
+
+    def test(self, value: Any) -> bool:
+        return value is not None and self._regex.fullmatch(str(value)) is not None
+
+
+class In(Filter):
+    def __init__(self, values: Iterable[Any]) -> None:
+        self.values = list(values)
+
+    def sql(self, column: str, across: bool = False) -> tuple[str, list]:
+        return f"{column} IN (SELECT value FROM json_each(?))", [
+            json.dumps(self.values)
+        ]
+
+    def test(self, value: Any) -> bool:
+        return value is not None and value in self.values
+
+    def hash_keys(self) -> Iterable[Any]:
+        return {_hash_key(value) for value in self.values if value is not None}
+
+
+class AllOf(Filter):
+    # The column is a key of table, which must hold every one of values in
+    # value_column for it, e.g. consumables carrying all of some tags
+    def __init__(
+        self, table: str, key: str, value_column: str, values: Sequence[Any]
+    ) -> None:
+        self.table = table
+        self.key = key
+        self.value_column = value_column
+        self.values = list(values)
+
+    def sql(self, column: str, across: bool = False) -> tuple[str, list]:
+        templating = ",".join(["?" for _ in self.values])
+        # Ids are only unique within a library, so combined rows match on both
+        key = f"library, {self.key}" if across else self.key
+        table = combined_name(self.table) if across else self.table
+        sql = f"""{f"(library, {column})" if across else column} IN
+                (SELECT {key}
+                    FROM {table}
+                    WHERE {self.value_column} IN ({templating})
+                    GROUP BY {key}
+                    HAVING COUNT(*) = {len(self.values)}
+                )
+            """
+        return sql, list(self.values)
+
+    def test(self, value: Any) -> bool:
+        # Decided by other rows of table, MemoryBackend._resolve turns it
+        # into an In over the matching keys first
+        raise RuntimeError("AllOf must be resolved against its table first.")
+
+
+def _pairs(
+    filters: Union[Mapping[str, Any], Iterable[tuple[str, Any]]]
+) -> list[tuple[str, Filter]]:
+    # A list of pairs allows more than one filter on a column
+    if isinstance(filters, Mapping):
+        filters = filters.items()
+    return [
+        (column, value if isinstance(value, Filter) else Equals(value))
+        for column, value in filters
+    ]
+
+
+def where_sql(
+    filters: Union[Mapping[str, Any], Iterable[tuple[str, Any]]],
+    across: bool = False,
+) -> tuple[str, list]:
+    where = ["true"]
+    values = []
+    for column, condition in _pairs(filters):
+        sql, params = condition.sql(column, across=across)
+        where.append(sql)
+        values.extend(params)
+    return " AND ".join(where), values
+
+
+class Backend(ABC):
+    # Storage behind the entity API. Rows are tuples in TABLES order, filters
+    # map columns to values (equality) or Filter instances.
+
+    @abstractmethod
+    def insert(self, table: str, row: Mapping[str, Any]) -> Union[int, None]:
+        pass
+
+    @abstractmethod
+    def select(
+        self, table: str, filters: Union[Mapping[str, Any], Iterable] = ()
+    ) -> list[tuple]:
+        pass
+
+    @abstractmethod
+    def select_mapped(
+        self,
+        mapping: str,
+        filters: Union[Mapping[str, Any], Iterable],
+        column: str,
+        table: str,
+    ) -> list[tuple[tuple, tuple]]:
+        # Each mapping row with the row of table whose id is in column
+        pass
+
+    @abstractmethod
+    def update(
+        self,
+        table: str,
+        filters: Union[Mapping[str, Any], Iterable],
+        set_map: Mapping[str, Any],
+    ) -> list[tuple]:
+        pass
+
+    @abstractmethod
+    def save(
+        self, updates: Iterable[tuple[str, Sequence[str], Sequence[Sequence[Any]]]]
+    ) -> None:
+        # (table, fields, rows of field values then id), all or nothing
+        pass
+
+    @abstractmethod
+    def delete(self, table: str, filters: Union[Mapping[str, Any], Iterable]) -> int:
+        pass
+
+
+class SqliteBackend(Backend):
+    def __init__(self, connect: Callable[[], sqlite3.Connection]) -> None:
+        # Called per operation, so working copies, libraries, instrumentation
+        # and the result cache all apply
+        self.connect = connect
+
+    @classmethod
+    def select_sql(
+        cls, table: str, filters: Union[Mapping[str, Any], Iterable] = ()
+    ) -> tuple[str, list]:
+        where, values = where_sql(filters)
+        return f"SELECT * FROM {table} WHERE {where}", values
+
+    @classmethod
+    def select_mapped_sql(
+        cls,
+        mapping: str,
+        filters: Union[Mapping[str, Any], Iterable],
+        column: str,
+        table: str,
+    ) -> tuple[str, list]:
+        where, values = where_sql(
+            [(f"{mapping}.{key}", value) for key, value in _pairs(filters)]
+        )
+        sql = f"""SELECT {mapping}.*, {table}.* FROM {mapping}
+                JOIN {table} ON {table}.id = {mapping}.{column}
+                WHERE {where}"""
+        return sql, values
+
+    @classmethod
+    def update_sql(
+        cls,
+        table: str,
+        filters: Union[Mapping[str, Any], Iterable],
+        set_map: Mapping[str, Any],
+    ) -> tuple[str, list]:
+        set_sql = ", ".join(f"{column} = ?" for column in set_map.keys())
+        where, values = where_sql(filters)
+        sql = f"UPDATE {table} SET {set_sql} WHERE {where} RETURNING *"
+        return sql, list(set_map.values()) + values
+
+    @classmethod
+    def delete_sql(
+        cls, table: str, filters: Union[Mapping[str, Any], Iterable]
+    ) -> tuple[str, list]:
+        where, values = where_sql(filters)
+        return f"DELETE FROM {table} WHERE {where}", values
+
+    def _write(self, sql: str, values: Sequence[Any]) -> sqlite3.Cursor:
+        db = self.connect()
+        cur = db.cursor()
+        try:
+            cur.execute(sql, values)
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        return cur
+
+    def insert(self, table: str, row: Mapping[str, Any]) -> Union[int, None]:
+        sql = f"""INSERT INTO {table} ({', '.join(row.keys())})
+                VALUES ({','.join('?' for _ in row)})"""
+        return self._write(sql, list(row.values())).lastrowid
+
+    def select(
+        self, table: str, filters: Union[Mapping[str, Any], Iterable] = ()
+    ) -> list[tuple]:
+        cur = self.connect().cursor()
+        cur.execute(*self.select_sql(table, filters))
+        return cur.fetchall()
+
+    def select_mapped(
+        self,
+        mapping: str,
+        filters: Union[Mapping[str, Any], Iterable],
+        column: str,
+        table: str,
+    ) -> list[tuple[tuple, tuple]]:
+        cur = self.connect().cursor()
+        cur.execute(*self.select_mapped_sql(mapping, filters, column, table))
+        width = len(TABLES[mapping])
+        return [(row[:width], row[width:]) for row in cur.fetchall()]
+
+    def update(
+        self,
+        table: str,
+        filters: Union[Mapping[str, Any], Iterable],
+        set_map: Mapping[str, Any],
+    ) -> list[tuple]:
+        db = self.connect()
+        cur = db.cursor()
+        try:
+            cur.execute(*self.update_sql(table, filters, set_map))
+            rows = cur.fetchall()
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        return rows
+
+    def save(
+        self, updates: Iterable[tuple[str, Sequence[str], Sequence[Sequence[Any]]]]
+    ) -> None:
+        db = self.connect()
+        cur = db.cursor()
+        try:
+            # One executemany per table and set of changed columns
+            for table, fields, rows in updates:
+                set_sql = ", ".join(f"{field} = ?" for field in fields)
+                cur.executemany(f"UPDATE {table} SET {set_sql} WHERE id = ?", rows)
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+
+    def delete(self, table: str, filters: Union[Mapping[str, Any], Iterable]) -> int:
+        return self._write(*self.delete_sql(table, filters)).rowcount
+
+
+def _consumable_triggers(row: dict[str, Any]) -> dict[str, Any]:
+    # DatabaseInstantiator._consumable_triggers, each fix-up UPDATE fires the
+    # other triggers again, so they run until the row stops changing
+    completed = row["status"] == Status.COMPLETED.value
+    if (
+        row["start_date"] is not None
+        and row["end_date"] is not None
+        and row["start_date"] > row["end_date"]
+    ):
+        raise sqlite3.IntegrityError("end date must be after start date")
+    # strftime('%s') is whole seconds, stored with REAL affinity
+    now = float(int(time.time()))
+    changes = {}
+    if row["completions"] == 0 and completed:
+        changes["completions"] = 1
+    if row["start_date"] is None and row["status"] == Status.IN_PROGRESS.value:
+        changes["start_date"] = now
+    if row["end_date"] is None and completed:
+        changes["end_date"] = now
+    if row["parts"] == 0 and completed:
+        changes["parts"] = 1 if row["max_parts"] is None else row["max_parts"]
+    if row["max_parts"] is None and row["parts"] != 0 and completed:
+        changes["max_parts"] = row["parts"]
+    return changes
+
+
+class MemoryBackend(Backend):
+    # Tables held as dicts keyed by rowid, the id where there is one, with hash
+    # indexes on MEMORY_INDEXES and the consumable triggers replayed in Python.
+    # Foreign keys are not enforced, as SQLite leaves them off by default.
+    TRIGGERS: Mapping[str, Callable[[dict[str, Any]], dict[str, Any]]] = {
+        "consumables": _consumable_triggers,
+    }
+
+    def __init__(self, indexes: Mapping[str, Sequence[str]] = MEMORY_INDEXES) -> None:
+        self.tables: dict[str, dict[int, list]] = {table: {} for table in TABLES}
+        self.positions = {
+            table: {column: i for i, column in enumerate(columns)}
+            for table, columns in TABLES.items()
+        }
+        # Primary key to rowid for the mapping tables
+        self.unique: dict[str, dict[tuple, int]] = {table: {} for table in PRIMARY_KEYS}
+        # Table to column to hash key to rowids
+        self.indexes: dict[str, dict[str, dict[Any, set[int]]]] = {
+            table: {column: {} for column in columns}
+            for table, columns in indexes.items()
+        }
+        # DatabaseInstantiator.series_table
+        self.insert("series", {"id": -1, "name": "None"})
+
+    def _primary_key(self, table: str, row: Sequence[Any]) -> tuple:
+        positions = self.positions[table]
+        return tuple(row[positions[column]] for column in PRIMARY_KEYS[table])
+
+    def _rowid(self, table: str, row: Sequence[Any]) -> Any:
+        # The unique key a row is stored under, its id or its primary key
+        return self._primary_key(table, row) if table in PRIMARY_KEYS else row[0]
+
+    def _index(self, table: str, rowid: int, row: Sequence[Any], add: bool) -> None:
+        for column, index in self.indexes.get(table, {}).items():
+            value = row[self.positions[table][column]]
+            if value is None:
+                continue
+            if add:
+                index.setdefault(_hash_key(value), set()).add(rowid)
+            else:
+                rowids = index[_hash_key(value)]
+                rowids.discard(rowid)
+                if len(rowids) == 0:
+                    del index[_hash_key(value)]
+
+    def _store(self, table: str, rowid: int, row: list) -> None:
+        self.tables[table][rowid] = row
+        if table in PRIMARY_KEYS:
+            self.unique[table][self._primary_key(table, row)] = rowid
+        self._index(table, rowid, row, True)
+
+    def _discard(self, table: str, rowid: int) -> list:
+        row = self.tables[table].pop(rowid)
+        if table in PRIMARY_KEYS:
+            del self.unique[table][self._primary_key(table, row)]
+        self._index(table, rowid, row, False)
+        return row
+
+    def _taken(self, table: str) -> Mapping[Any, int]:
+        # Unique key to rowid
+        if table in PRIMARY_KEYS:
+            return self.unique[table]
+        return {rowid: rowid for rowid in self.tables[table]}
+
+    def _resolve(self, condition: Filter) -> Filter:
+        if not isinstance(condition, AllOf):
+            return condition
+        counts: dict[Any, int] = {}
+        position = self.positions[condition.table][condition.key]
+        for row in self.select(
+            condition.table, {condition.value_column: In(condition.values)}
+        ):
+            counts[row[position]] = counts.get(row[position], 0) + 1
+        return In(
+            key for key, count in counts.items() if count == len(condition.values)
+        )
+
+    def _matching(
+        self, table: str, filters: Union[Mapping[str, Any], Iterable]
+    ) -> list[tuple[int, list]]:
+        rows = self.tables[table]
+        positions = self.positions[table]
+        conditions = [
+            (column, self._resolve(condition)) for column, condition in _pairs(filters)
+        ]
+        # Start from the smallest candidate set a hashed column offers
+        candidates = None
+        for column, condition in conditions:
+            hash_keys = condition.hash_keys()
+            if hash_keys is None:
+                continue
+            if column == "id" and table not in PRIMARY_KEYS:
+                rowids = {key for key in hash_keys if key in rows}
+            elif column in self.indexes.get(table, {}):
+                index = self.indexes[table][column]
+                rowids = set()
+                for hash_key in hash_keys:
+                    rowids |= index.get(hash_key, set())
+            else:
+                continue
+            if candidates is None or len(rowids) < len(candidates):
+                candidates = rowids
+        # Rowid order, as a table scan would return them
+        rowids = rows.keys() if candidates is None else sorted(candidates)
+        return [
+            (rowid, rows[rowid])
+            for rowid in rowids
+            if all(
+                condition.test(rows[rowid][positions[column]])
+                for column, condition in conditions
+            )
+        ]
+
+    def _triggered(self, table: str, row: list) -> list:
+        trigger = self.TRIGGERS.get(table)
+        if trigger is None:
+            return row
+        columns = TABLES[table]
+        values = dict(zip(columns, row))
+        while True:
+            changes = {
+                column: value
+                for column, value in trigger(values).items()
+                if values[column] != value
+            }
+            if len(changes) == 0:
+                return [values[column] for column in columns]
+            values.update(changes)
+
+    def _next_rowid(self, table: str) -> int:
+        # SQLite's choice without AUTOINCREMENT, one past the largest rowid
+        return max(self.tables[table].keys(), default=0) + 1
+
+    def _replace(self, table: str, rows: Sequence[tuple[int, list]]) -> None:
+        # Writes rows over the given rowids only if no unique key would clash
+        taken = self._taken(table)
+        replaced = {rowid for rowid, _ in rows}
+        keys = set()
+        for _, row in rows:
+            key = self._rowid(table, row)
+            if key in keys or (key in taken and taken[key] not in replaced):
+                raise sqlite3.IntegrityError(f"UNIQUE constraint failed: {table}")
+            keys.add(key)
+        for rowid, _ in rows:
+            self._discard(table, rowid)
+        for rowid, row in rows:
+            # An id column is the rowid itself
+            self._store(table, rowid if table in PRIMARY_KEYS else row[0], row)
+
+    def insert(self, table: str, row: Mapping[str, Any]) -> Union[int, None]:
+        for column in row.keys():
+            if column not in self.positions[table]:
+                raise sqlite3.OperationalError(
+                    f"table {table} has no column named {column}"
+                )
+        defaults = DEFAULTS.get(table, {})
+        values = [row.get(column, defaults.get(column)) for column in TABLES[table]]
+        rowid = self._next_rowid(table)
+        if table not in PRIMARY_KEYS:
+            if values[0] is None:
+                values[0] = rowid
+            rowid = values[0]
+        if self._rowid(table, values) in self._taken(table):
+            raise sqlite3.IntegrityError(f"UNIQUE constraint failed: {table}")
+        self._store(table, rowid, self._triggered(table, values))
+        return rowid
+
+    def select(
+        self, table: str, filters: Union[Mapping[str, Any], Iterable] = ()
+    ) -> list[tuple]:
+        return [tuple(row) for _, row in self._matching(table, filters)]
+
+    def select_mapped(
+        self,
+        mapping: str,
+        filters: Union[Mapping[str, Any], Iterable],
+        column: str,
+        table: str,
+    ) -> list[tuple[tuple, tuple]]:
+        position = self.positions[mapping][column]
+        rows = self.tables[table]
+        return [
+            (tuple(row), tuple(rows[row[position]]))
+            for _, row in self._matching(mapping, filters)
+            if row[position] in rows
+        ]
+
+    def update(
+        self,
+        table: str,
+        filters: Union[Mapping[str, Any], Iterable],
+        set_map: Mapping[str, Any],
+    ) -> list[tuple]:
+        positions = self.positions[table]
+        returned = []
+        rows = []
+        for rowid, row in self._matching(table, filters):
+            new = list(row)
+            for column, value in set_map.items():
+                new[positions[column]] = value
+            returned.append(tuple(new))
+            # Every row is triggered before any is written, RAISE(ROLLBACK)
+            # undoes the whole statement
+            rows.append((rowid, self._triggered(table, new)))
+        self._replace(table, rows)
+        # RETURNING reports rows before the AFTER triggers changed them
+        return returned
+
+    def save(
+        self, updates: Iterable[tuple[str, Sequence[str], Sequence[Sequence[Any]]]]
+    ) -> None:
+        staged: dict[str, list[tuple[int, list]]] = {}
+        for table, fields, rows in updates:
+            positions = self.positions[table]
+            for *values, rowid in rows:
+                if rowid not in self.tables[table]:
+                    continue
+                new = list(self.tables[table][rowid])
+                for field, value in zip(fields, values):
+                    new[positions[field]] = value
+                staged.setdefault(table, []).append(
+                    (rowid, self._triggered(table, new))
+                )
+        for table, rows in staged.items():
+            self._replace(table, rows)
+
+    def delete(self, table: str, filters: Union[Mapping[str, Any], Iterable]) -> int:
+        rowids = [rowid for rowid, _ in self._matching(table, filters)]
+        # DatabaseInstantiator._series_triggers
+        if table == "series" and -1 in rowids:
+            raise sqlite3.IntegrityError("cannot delete series with ID -1")
+        for rowid in rowids:
+            self._discard(table, rowid)
+        return len(rowids)
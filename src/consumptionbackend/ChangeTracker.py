@@ -0,0 +1,78 @@
+# General Imports
+from __future__ import annotations
+import sqlite3
+import threading
+from collections.abc import Callable, Iterable, Mapping
+from typing import Union
+
+
+class ChangeTracker:
+    GENERATIONS_NAME = "table_generations"
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._connection: Union[sqlite3.Connection, None] = None
+        self._data_version: Union[int, None] = None
+        self._total_changes: Union[int, None] = None
+        self._generations: Mapping[str, int] = {}
+        self._subscribers: list[tuple[Callable[[set[str]], None], set[str]]] = []
+
+    def subscribe(
+        self,
+        callback: Callable[[set[str]], None],
+        tables: Union[Iterable[str], None] = None,
+    ) -> None:
+        with self._lock:
+            self._subscribers.append(
+                (callback, set(tables) if tables is not None else None)
+            )
+
+    def unsubscribe(self, callback: Callable[[set[str]], None]) -> None:
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s[0] != callback]
+
+    @staticmethod
+    def data_version(db: sqlite3.Connection) -> int:
+        cur = db.cursor()
+        cur.execute("PRAGMA data_version")
+        return cur.fetchone()[0]
+
+    @classmethod
+    def generations(cls, db: sqlite3.Connection) -> Mapping[str, int]:
+        cur = db.cursor()
+        cur.execute(f"SELECT name, generation FROM {cls.GENERATIONS_NAME}")
+        return dict(cur.fetchall())
+
+    def poll(self, connection: sqlite3.Connection, db: sqlite3.Connection) -> set[str]:
+        # connection is the raw handle used for identity, db may wrap it
+        with self._lock:
+            # data_version moves on commits by other connections, total_changes
+            # on writes made through this one
+            data_version = self.data_version(db)
+            total_changes = connection.total_changes
+            if (
+                connection is self._connection
+                and data_version == self._data_version
+                and total_changes == self._total_changes
+            ):
+                return set()
+            generations = self.generations(db)
+            if connection is self._connection:
+                changed = {
+                    table
+                    for table, generation in generations.items()
+                    if self._generations.get(table) != generation
+                }
+            else:
+                # A different connection may be a different database entirely
+                changed = set(generations)
+            self._connection = connection
+            self._data_version = data_version
+            self._total_changes = total_changes
+            self._generations = generations
+            subscribers = list(self._subscribers)
+        for callback, tables in subscribers:
+            relevant = changed if tables is None else changed & tables
+            if relevant:
+                callback(relevant)
+        return changed
@@ -1,21 +1,57 @@
 # General Imports
 from __future__ import annotations
+import json
 import logging
+import math
+from array import array
 from typing import Union, Any
 from datetime import datetime
-from collections.abc import Sequence, Mapping
+from collections.abc import Sequence, Mapping, Iterable
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 # Consumption Imports
 from . import Database
 from . import Personnel as pers
 from . import Series as ser
 from .Status import Status
+from .Libraries import combined_name
+from .Backend import SqliteBackend, AllOf, Like, NoCase, where_sql
 
 
 class Consumable(Database.DatabaseEntity):
     DB_NAME = "consumables"
     DB_PERSONNEL_MAPPING_NAME = "consumable_personnel"
     DB_TAG_MAPPING_NAME = "consumable_tags"
+    DB_COLUMNS = (
+        "series_id",
+        "name",
+        "type",
+        "status",
+        "parts",
+        "max_parts",
+        "completions",
+        "rating",
+        "start_date",
+        "end_date",
+    )
+    # array typecodes for Consumable.columns, nullable columns use NaN
+    COLUMN_TYPECODES = {
+        "id": "q",
+        "series_id": "q",
+        "status": "b",
+        "parts": "q",
+        "completions": "q",
+        "max_parts": "d",
+        "rating": "d",
+        "start_date": "d",
+        "end_date": "d",
+    }
+    # Score added by each shared credit, tag and series in Consumable.related
+    RELATED_WEIGHTS = {"personnel": 3.0, "tags": 1.0, "series": 2.0}
 
     def __init__(
         self,
@@ -44,6 +80,8 @@ class Consumable(Database.DatabaseEntity):
         self.start_date = start_date
         self.end_date = end_date
         self._enforce_constraints()
+        # Values filled in by the constraints are part of construction
+        self._mark_clean()
 
     def _enforce_constraints(self) -> None:
         # Convert status to Enum
@@ -65,6 +103,16 @@ class Consumable(Database.DatabaseEntity):
         if self.status == Status.COMPLETED and self.max_parts is None:
             self.max_parts = self.parts
 
+    def _prepare_save(self) -> None:
+        # Mirror the update triggers so the saved row matches this entity
+        self.type = self.type.upper()
+        self._enforce_constraints()
+
+    def _column_value(self, field: str) -> Any:
+        if field == "status":
+            return self.status.value
+        return super()._column_value(field)
+
     def get_series(self) -> ser.Series:
         return ser.Series.find(id=self.series_id)[0]
 
@@ -75,20 +123,24 @@ class Consumable(Database.DatabaseEntity):
             logging.getLogger(__name__).info(f"SET_SERIES#{self.id},{series.id}")
 
     def get_tags(self) -> Sequence[str]:
-        cur = self.handler.get_db().cursor()
-        sql = f"""SELECT tag FROM {Consumable.DB_TAG_MAPPING_NAME} 
-                WHERE consumable_id = ?"""
-        cur.execute(sql, [self.id])
-        return list(map(lambda x: x[0], cur.fetchall()))
+        rows = self.handler.get_backend().select(
+            Consumable.DB_TAG_MAPPING_NAME, {"consumable_id": self.id}
+        )
+        return [row[1] for row in rows]
+
+    @classmethod
+    def _get_tags_sql(cls) -> str:
+        return SqliteBackend.select_sql(
+            Consumable.DB_TAG_MAPPING_NAME, {"consumable_id": None}
+        )[0]
 
     def add_tag(self, tag: str, do_log: bool = True) -> bool:
         tag = tag.strip().lower()
         if tag in self.get_tags():
             return False
-        cur = self.handler.get_db().cursor()
-        sql = f"INSERT INTO {Consumable.DB_TAG_MAPPING_NAME} (consumable_id, tag) values (?,?)"
-        cur.execute(sql, [self.id, tag])
-        self.handler.get_db().commit()
+        self.handler.get_backend().insert(
+            Consumable.DB_TAG_MAPPING_NAME, {"consumable_id": self.id, "tag": tag}
+        )
         # Logging
         if do_log:
             logging.getLogger(__name__).info(f"ADD_TAG#{self.id},'{tag}'")
@@ -96,11 +148,9 @@ class Consumable(Database.DatabaseEntity):
 
     def remove_tag(self, tag: str, do_log: bool = True) -> bool:
         tag = tag.strip().lower()
-        cur = self.handler.get_db().cursor()
-        sql = f"""DELETE FROM {Consumable.DB_TAG_MAPPING_NAME} 
-                WHERE consumable_id = ? AND tag = ?"""
-        cur.execute(sql, [self.id, tag])
-        self.handler.get_db().commit()
+        self.handler.get_backend().delete(
+            Consumable.DB_TAG_MAPPING_NAME, {"consumable_id": self.id, "tag": tag}
+        )
         # Logging
         if do_log:
             logging.getLogger(__name__).info(f"REMOVE_TAG#{self.id},'{tag}'")
@@ -109,27 +159,34 @@ class Consumable(Database.DatabaseEntity):
     def get_personnel(self) -> Sequence[pers.Personnel]:
         if self.id is None:
             raise ValueError("Cannot find Personnel for Consumable without ID.")
-        cur = self.handler.get_db().cursor()
-        sql = f"""SELECT * FROM {Consumable.DB_PERSONNEL_MAPPING_NAME} 
-                    LEFT JOIN {pers.Personnel.DB_NAME} 
-                    ON {Consumable.DB_PERSONNEL_MAPPING_NAME}.personnel_id = {pers.Personnel.DB_NAME}.id
-                    WHERE consumable_id = ?
-                """
-        cur.execute(sql, [self.id])
-        rows = cur.fetchall()
+        rows = self.handler.get_backend().select_mapped(
+            Consumable.DB_PERSONNEL_MAPPING_NAME,
+            {"consumable_id": self.id},
+            "personnel_id",
+            pers.Personnel.DB_NAME,
+        )
         personnel = []
-        for row in rows:
+        for credit, row in rows:
             personnel.append(
                 pers.Personnel(
-                    id=row[3],
-                    first_name=row[4],
-                    last_name=row[5],
-                    pseudonym=row[6],
-                    role=row[2],
+                    id=row[0],
+                    first_name=row[1],
+                    last_name=row[2],
+                    pseudonym=row[3],
+                    role=credit[2],
                 )
             )
         return personnel
 
+    @classmethod
+    def _get_personnel_sql(cls) -> str:
+        return SqliteBackend.select_mapped_sql(
+            Consumable.DB_PERSONNEL_MAPPING_NAME,
+            {"consumable_id": None},
+            "personnel_id",
+            pers.Personnel.DB_NAME,
+        )[0]
+
     def add_personnel(self, personnel: pers.Personnel, do_log: bool = True) -> bool:
         if self.id is None:
             raise ValueError("Cannot assign Personnel to Consumable without ID.")
@@ -139,10 +196,14 @@ class Consumable(Database.DatabaseEntity):
             raise ValueError(
                 "Cannot assign Personnel to Consumable without assigned role."
             )
-        cur = self.handler.get_db().cursor()
-        sql = f"INSERT INTO {self.DB_PERSONNEL_MAPPING_NAME} (personnel_id, consumable_id, role) VALUES (?,?,?)"
-        cur.execute(sql, [personnel.id, self.id, personnel.role])
-        self.handler.get_db().commit()
+        self.handler.get_backend().insert(
+            self.DB_PERSONNEL_MAPPING_NAME,
+            {
+                "personnel_id": personnel.id,
+                "consumable_id": self.id,
+                "role": personnel.role,
+            },
+        )
         # Logging
         if do_log:
             logging.getLogger(__name__).info(
@@ -159,11 +220,14 @@ class Consumable(Database.DatabaseEntity):
             raise ValueError(
                 "Cannot remove Personnel from Consumable without assigned role."
             )
-        cur = self.handler.get_db().cursor()
-        sql = f"""DELETE FROM {self.DB_PERSONNEL_MAPPING_NAME} 
-                WHERE personnel_id = ? AND consumable_id = ? AND role = ?"""
-        cur.execute(sql, [personnel.id, self.id, personnel.role])
-        self.handler.get_db().commit()
+        self.handler.get_backend().delete(
+            self.DB_PERSONNEL_MAPPING_NAME,
+            {
+                "personnel_id": personnel.id,
+                "consumable_id": self.id,
+                "role": personnel.role,
+            },
+        )
         # Logging
         if do_log:
             logging.getLogger(__name__).info(
@@ -171,6 +235,58 @@ class Consumable(Database.DatabaseEntity):
             )
         return True
 
+    def related(
+        self, limit: int = 10, weights: Union[Mapping[str, float], None] = None
+    ) -> Sequence[tuple[Consumable, float]]:
+        if self.id is None:
+            raise ValueError(
+                "Cannot find related Consumables for Consumable without ID."
+            )
+        weights = {**Consumable.RELATED_WEIGHTS, **(weights or {})}
+        for key in weights.keys():
+            if key not in Consumable.RELATED_WEIGHTS:
+                raise ValueError(f"Improper key provided in related weights: {key}")
+        cur = self.handler.get_db().cursor()
+        cur.execute(*self._related_sql(self.id, weights, limit))
+        return [
+            (Consumable._seq_to_consumable(row[:-1]), row[-1]) for row in cur.fetchall()
+        ]
+
+    @classmethod
+    def _related_sql(
+        cls, id: int, weights: Mapping[str, float], limit: int
+    ) -> tuple[str, list]:
+        # Every shared credit, tag and series is one weighted row, summed per
+        # candidate. A person credited in several roles counts once.
+        sql = f"""WITH overlap(id, score) AS (
+                    SELECT consumable_id, ? FROM (
+                        SELECT DISTINCT other.consumable_id, other.personnel_id
+                        FROM {Consumable.DB_PERSONNEL_MAPPING_NAME} AS mine
+                        JOIN {Consumable.DB_PERSONNEL_MAPPING_NAME} AS other
+                            ON other.personnel_id = mine.personnel_id
+                        WHERE mine.consumable_id = ? AND other.consumable_id != ?
+                    )
+                    UNION ALL
+                    SELECT other.consumable_id, ?
+                    FROM {Consumable.DB_TAG_MAPPING_NAME} AS mine
+                    JOIN {Consumable.DB_TAG_MAPPING_NAME} AS other ON other.tag = mine.tag
+                    WHERE mine.consumable_id = ? AND other.consumable_id != ?
+                    UNION ALL
+                    SELECT other.id, ?
+                    FROM {Consumable.DB_NAME} AS mine
+                    JOIN {Consumable.DB_NAME} AS other ON other.series_id = mine.series_id
+                    WHERE mine.id = ? AND mine.series_id != -1 AND other.id != ?
+                )
+                SELECT {Consumable.DB_NAME}.*, SUM(overlap.score) AS score
+                FROM overlap JOIN {Consumable.DB_NAME} ON {Consumable.DB_NAME}.id = overlap.id
+                GROUP BY overlap.id
+                ORDER BY score DESC, overlap.id
+                LIMIT ?"""
+        values = []
+        for key in ["personnel", "tags", "series"]:
+            values.extend([weights[key], id, id])
+        return sql, values + [limit]
+
     @classmethod
     def _assert_attrs(cls, d: Mapping[str, Any], tags: bool = True) -> None:
         attrs = {
@@ -210,6 +326,10 @@ class Consumable(Database.DatabaseEntity):
             end_date=seq[10],
         )
 
+    @classmethod
+    def _seq_to_entity(cls, seq: Sequence[Any]) -> Consumable:
+        return cls._seq_to_consumable(seq)
+
     @classmethod
     def _consumable_to_seq(cls, cons: Consumable) -> Sequence[Any]:
         return [
@@ -227,31 +347,141 @@ class Consumable(Database.DatabaseEntity):
         ]
 
     @classmethod
-    def _filter_by_tags(cls, tags: Sequence[str]) -> str:
-        templating = ",".join(["?" for _ in tags])
-        sql = f"""SELECT * FROM {Consumable.DB_NAME} 
-            WHERE id IN 
-                (SELECT consumable_id 
-                    FROM {Consumable.DB_TAG_MAPPING_NAME} 
-                    WHERE tag IN ({templating})
-                    GROUP BY consumable_id
-                    HAVING COUNT(*) = {len(tags)}
+    def _filters(cls, where_map: Mapping[str, Any]) -> list[tuple[str, Any]]:
+        filters = []
+        for key, value in where_map.items():
+            if key == "tags":
+                filters.append(
+                    (
+                        "id",
+                        AllOf(
+                            Consumable.DB_TAG_MAPPING_NAME,
+                            "consumable_id",
+                            "tag",
+                            value,
+                        ),
+                    )
                 )
-            """
-        return sql
+            elif key == "name":
+                filters.append((key, Like(value)))
+            elif key == "type":
+                filters.append((key, NoCase(value)))
+            elif key == "status" and isinstance(value, Status):
+                filters.append((key, value.value))
+            else:
+                filters.append((key, value))
+        return filters
 
     @classmethod
-    def new(cls, do_log: bool = True, **kwargs) -> Consumable:
+    def _where(
+        cls, where_map: Mapping[str, Any], across: bool = False
+    ) -> tuple[str, list]:
+        return where_sql(cls._filters(where_map), across=across)
+
+    @classmethod
+    def _find_sql(cls, **kwargs) -> tuple[str, list]:
+        return SqliteBackend.select_sql(cls.DB_NAME, cls._filters(kwargs))
+
+    @classmethod
+    def _find_across_sql(
+        cls, libraries: Union[Sequence[str], None] = None, **kwargs
+    ) -> tuple[str, list]:
+        where, values = cls._where(kwargs, across=True)
+        if libraries is not None:
+            where += f" AND library IN ({','.join('?' for _ in libraries)})"
+            values.extend(libraries)
+        sql = f"""SELECT * FROM {combined_name(cls.DB_NAME)}
+                WHERE {where} ORDER BY library, id"""
+        return sql, values
+
+    @classmethod
+    def _update_sql(
+        cls, where_map: Mapping[str, Any], set_map: Mapping[str, Any]
+    ) -> tuple[str, list]:
+        return SqliteBackend.update_sql(
+            cls.DB_NAME, cls._filters(where_map), cls._set_values(set_map)
+        )
+
+    @classmethod
+    def _set_values(cls, set_map: Mapping[str, Any]) -> Mapping[str, Any]:
+        # Stored as _set_sql would write them
+        values = {}
+        for key, value in set_map.items():
+            if key == "type":
+                values[key] = value.upper()
+            elif key == "status" and isinstance(value, Status):
+                values[key] = value.value
+            else:
+                values[key] = value
+        return values
+
+    @classmethod
+    def _set_sql(cls, set_map: Mapping[str, Any]) -> tuple[str, list]:
+        set_placeholders = []
+        values = []
+        for key, value in set_map.items():
+            if key == "type":
+                set_placeholders.append(f"{key} = upper(?)")
+                values.append(value)
+            elif key == "status" and isinstance(value, Status):
+                set_placeholders.append(f"{key} = ?")
+                values.append(value.value)
+            else:
+                set_placeholders.append(f"{key} = ?")
+                values.append(value)
+        return ", ".join(set_placeholders), values
+
+    @classmethod
+    def _delete_sql(cls, **kwargs) -> tuple[str, list]:
+        return SqliteBackend.delete_sql(cls.DB_NAME, cls._filters(kwargs))
+
+    @classmethod
+    def columns(
+        cls,
+        fields: Sequence[str],
+        as_numpy: Union[bool, None] = None,
+        batch_size: int = 10000,
+        **kwargs,
+    ) -> Mapping[str, Any]:
+        for field in fields:
+            if field not in cls.COLUMN_TYPECODES:
+                raise ValueError(f"Cannot fetch column for Consumable: {field}")
+        if as_numpy is None:
+            as_numpy = numpy is not None
+        elif as_numpy and numpy is None:
+            raise RuntimeError("NumPy is not installed.")
         cls._assert_attrs(kwargs)
+        where, values = cls._where(kwargs)
         cur = cls.handler.get_db().cursor()
+        cur.execute(
+            f"SELECT {', '.join(fields)} FROM {cls.DB_NAME} WHERE {where}", values
+        )
+        columns = [array(cls.COLUMN_TYPECODES[field]) for field in fields]
+        nullable = [cls.COLUMN_TYPECODES[field] == "d" for field in fields]
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for i, column in enumerate(zip(*rows)):
+                if nullable[i]:
+                    column = [math.nan if x is None else x for x in column]
+                columns[i].extend(column)
+        if as_numpy:
+            # Shares the array buffers rather than copying them
+            return {
+                field: numpy.frombuffer(column, dtype=column.typecode)
+                for field, column in zip(fields, columns)
+            }
+        return dict(zip(fields, columns))
+
+    @classmethod
+    def new(cls, do_log: bool = True, **kwargs) -> Consumable:
+        cls._assert_attrs(kwargs)
         consumable = Consumable(**kwargs)
-        sql = f"""INSERT INTO {cls.DB_NAME} 
-                (id, series_id, name, type, status, parts, max_parts, completions, rating, start_date, end_date)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?)
-            """
-        cur.execute(sql, cls._consumable_to_seq(consumable))
-        cls.handler.get_db().commit()
-        consumable.id = cur.lastrowid
+        consumable.id = cls.handler.get_backend().insert(
+            cls.DB_NAME,
+            dict(zip(("id",) + cls.DB_COLUMNS, cls._consumable_to_seq(consumable))),
+        )
         # Logging
         if do_log:
             logging.getLogger(__name__).info(f"NEW_CONSUMABLE#{consumable._csv_str()}")
@@ -260,38 +490,26 @@ class Consumable(Database.DatabaseEntity):
     @classmethod
     def find(cls, **kwargs) -> Sequence[Consumable]:
         cls._assert_attrs(kwargs)
-        cur = cls.handler.get_db().cursor()
-        where = ["true"]
-        if "tags" in kwargs:
-            values = kwargs["tags"]
-            db_name = cls._filter_by_tags(values)
-            del kwargs["tags"]
-        else:
-            values = []
-            db_name = Consumable.DB_NAME
-
-        for key, value in kwargs.items():
-            if key == "name":
-                where.append(f"upper({key}) LIKE upper(?)")
-                values.append(f"%{value}%")
-            elif key == "type":
-                where.append(f"upper({key}) = upper(?)")
-                values.append(value)
-            elif key == "status" and isinstance(value, Status):
-                where.append(f"{key} = ?")
-                values.append(value.value)
-            else:
-                where.append(f"{key} = ?")
-                values.append(value)
-
-        sql = f"SELECT * FROM ({db_name}) WHERE {' AND '.join(where)}"
-        cur.execute(sql, values)
-        rows = cur.fetchall()
+        rows = cls.handler.get_backend().select(cls.DB_NAME, cls._filters(kwargs))
         consumables = []
         for row in rows:
             consumables.append(cls._seq_to_consumable(row))
         return consumables
 
+    @classmethod
+    def find_across(
+        cls, libraries: Union[Sequence[str], None] = None, **kwargs
+    ) -> Sequence[tuple[str, Consumable]]:
+        cls._assert_attrs(kwargs)
+        cur = cls.handler.get_combined_db().cursor()
+        cur.execute(*cls._find_across_sql(libraries, **kwargs))
+        found = []
+        for row in cur.fetchall():
+            consumable = cls._seq_to_consumable(row[1:])
+            consumable._library = row[0]
+            found.append((row[0], consumable))
+        return found
+
     @classmethod
     def update(
         cls,
@@ -303,47 +521,10 @@ class Consumable(Database.DatabaseEntity):
             raise ValueError("Set map cannot be empty.")
         cls._assert_attrs(where_map)
         cls._assert_attrs(set_map)
-        old_consumables = {c.id: c for c in cls.find(**where_map.copy())}
-        cur = cls.handler.get_db().cursor()
-        if "tags" in where_map:
-            values = where_map["tags"]
-            db_name = cls._filter_by_tags(values)
-            del where_map["tags"]
-        else:
-            values = []
-            db_name = Consumable.DB_NAME
-
-        set_placeholders = []
-        for key, value in set_map.items():
-            if key == "type":
-                set_placeholders.append(f"{key} = upper(?)")
-                values.append(value)
-            elif key == "status" and isinstance(value, Status):
-                set_placeholders.append(f"{key} = ?")
-                values.append(value.value)
-            else:
-                set_placeholders.append(f"{key} = ?")
-                values.append(value)
-
-        where_placeholders = ["true"]
-        for key, value in where_map.items():
-            if key == "name":
-                where_placeholders.append(f"upper({key}) LIKE upper(?)")
-                values.append(f"%{value}%")
-            elif key == "type":
-                where_placeholders.append(f"upper({key}) = upper(?)")
-                values.append(value)
-            elif key == "status" and isinstance(value, Status):
-                where_placeholders.append(f"{key} = ?")
-                values.append(value.value)
-            else:
-                where_placeholders.append(f"{key} = ?")
-                values.append(value)
-
-        sql = f"UPDATE {db_name} SET {', '.join(set_placeholders)} WHERE {' AND '.join(where_placeholders)} RETURNING *"
-        cur.execute(sql, values)
-        rows = cur.fetchall()
-        cls.handler.get_db().commit()
+        old_consumables = {c.id: c for c in cls.find(**where_map)}
+        rows = cls.handler.get_backend().update(
+            cls.DB_NAME, cls._filters(where_map), cls._set_values(set_map)
+        )
         consumables = []
         for row in rows:
             new_consumable = cls._seq_to_consumable(row)
@@ -359,40 +540,307 @@ class Consumable(Database.DatabaseEntity):
     @classmethod
     def delete(cls, do_log: bool = True, **kwargs) -> bool:
         cls._assert_attrs(kwargs)
-        old_consumables = cls.find(**kwargs.copy())
-        cur = cls.handler.get_db().cursor()
-        where = ["true"]
-        if "tags" in where:
-            values = where["tags"]
-            db_name = cls._filter_by_tags(values)
-            del where["tags"]
-        else:
-            values = []
-            db_name = Consumable.DB_NAME
-
-        for key, value in kwargs.items():
-            if key == "name":
-                where.append(f"upper({key}) LIKE upper(?)")
-                values.append(f"%{value}%")
-            elif key == "type":
-                where.append(f"upper({key}) = upper(?)")
-                values.append(value)
-            elif key == "status" and isinstance(value, Status):
-                where.append(f"{key} = ?")
-                values.append(value.value)
-            else:
-                where.append(f"{key} = ?")
-                values.append(value)
-
-        sql = f"DELETE FROM {db_name} WHERE {' AND '.join(where)}"
-        cur.execute(sql, values)
-        cls.handler.get_db().commit()
+        old_consumables = cls.find(**kwargs)
+        cls.handler.get_backend().delete(cls.DB_NAME, cls._filters(kwargs))
         if do_log:
             logger = logging.getLogger(__name__)
             for consumable in old_consumables:
                 logger.info(f"DELETE_CONSUMABLE#{consumable._csv_str()}")
         return True
 
+    @classmethod
+    def _batch_sql(
+        cls, where_map: Mapping[str, Any], columns: str, after: int, chunk_size: int
+    ) -> tuple[str, list]:
+        # Keyset pages by id, rows an update stops matching are already behind
+        where, values = cls._where(where_map)
+        sql = f"""SELECT {columns} FROM {cls.DB_NAME}
+                WHERE {where} AND id > ? ORDER BY id LIMIT ?"""
+        return sql, values + [after, chunk_size]
+
+    @classmethod
+    def _chunked(
+        cls,
+        where_map: Mapping[str, Any],
+        set_map: Union[Mapping[str, Any], None],
+        chunk_size: int,
+        do_log: bool,
+        batches: Union[list[Sequence[Consumable]], None] = None,
+    ) -> int:
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be positive.")
+        cls._assert_attrs(where_map)
+        set_sql, set_values = None, []
+        if set_map is not None:
+            if len(set_map) == 0:
+                raise ValueError("Set map cannot be empty.")
+            cls._assert_attrs(set_map, tags=False)
+            set_sql, set_values = cls._set_sql(set_map)
+        logger = logging.getLogger(__name__)
+        db = cls.handler.get_db()
+        cur = db.cursor()
+        # Every batch lands in one transaction, as the unchunked calls do,
+        # one the caller opened is theirs to commit or roll back
+        started = not db.in_transaction
+        if started:
+            cur.execute("BEGIN")
+        after = -(2**63)
+        count = 0
+        try:
+            while True:
+                # Old rows are only read when they are logged or returned
+                full = do_log or set_sql is None
+                cur.execute(
+                    *cls._batch_sql(where_map, "*" if full else "id", after, chunk_size)
+                )
+                rows = cur.fetchall()
+                if len(rows) == 0:
+                    break
+                ids = [row[0] for row in rows]
+                after = ids[-1]
+                ids_json = cls._ids_json(ids)
+                if set_sql is None:
+                    cur.execute(
+                        f"DELETE FROM {cls.DB_NAME} WHERE id IN (SELECT value FROM json_each(?))",
+                        [ids_json],
+                    )
+                    batch = [cls._seq_to_consumable(row) for row in rows]
+                    if do_log:
+                        for consumable in batch:
+                            logger.info(f"DELETE_CONSUMABLE#{consumable._csv_str()}")
+                else:
+                    cur.execute(
+                        f"""UPDATE {cls.DB_NAME} SET {set_sql}
+                            WHERE id IN (SELECT value FROM json_each(?)) RETURNING *""",
+                        set_values + [ids_json],
+                    )
+                    batch = cls._in_order(ids, cur.fetchall())
+                    if do_log:
+                        for old, new in zip(rows, batch):
+                            logger.info(
+                                f"UPDATE_CONSUMABLE#{cls._seq_to_consumable(old)._csv_str()}#{new._csv_str()}"
+                            )
+                count += len(batch)
+                # Only kept when asked for, counting needs one batch at a time
+                if batches is not None:
+                    batches.append(batch)
+            if started:
+                db.commit()
+        except BaseException:
+            if started:
+                db.rollback()
+            raise
+        return count
+
+    @classmethod
+    def iter_update(
+        cls,
+        where_map: Mapping[str, Any],
+        set_map: Mapping[str, Any],
+        chunk_size: int = 1000,
+        do_log: bool = True,
+    ) -> Sequence[Sequence[Consumable]]:
+        # Applied in full before returning, one list per batch
+        batches = []
+        cls._chunked(where_map, set_map, chunk_size, do_log, batches)
+        return batches
+
+    @classmethod
+    def update_chunked(
+        cls,
+        where_map: Mapping[str, Any],
+        set_map: Mapping[str, Any],
+        chunk_size: int = 1000,
+        do_log: bool = True,
+    ) -> int:
+        return cls._chunked(where_map, set_map, chunk_size, do_log)
+
+    @classmethod
+    def iter_delete(
+        cls, chunk_size: int = 1000, do_log: bool = True, **kwargs
+    ) -> Sequence[Sequence[Consumable]]:
+        batches = []
+        cls._chunked(kwargs, None, chunk_size, do_log, batches)
+        return batches
+
+    @classmethod
+    def delete_chunked(
+        cls, chunk_size: int = 1000, do_log: bool = True, **kwargs
+    ) -> int:
+        return cls._chunked(kwargs, None, chunk_size, do_log)
+
+    @classmethod
+    def upsert_many(
+        cls,
+        rows: Iterable[Mapping[str, Any]],
+        key: Sequence[str] = ("name", "type"),
+        chunk_size: int = 500,
+        do_log: bool = True,
+    ) -> Sequence[Consumable]:
+        consumables = [
+            cls._seq_to_consumable(row)
+            for row in cls._upsert_rows(rows, key, chunk_size)
+        ]
+        if do_log:
+            logger = logging.getLogger(__name__)
+            for consumable in consumables:
+                logger.info(f"UPSERT_CONSUMABLE#{consumable._csv_str()}")
+        return consumables
+
+    @classmethod
+    def _deltas(
+        cls, increments: Union[Mapping[int, int], Iterable[tuple[int, int]]]
+    ) -> tuple[list[int], str]:
+        if isinstance(increments, Mapping):
+            increments = increments.items()
+        pairs = [[int(id), int(amount)] for id, amount in increments]
+        if len(pairs) == 0:
+            raise ValueError("Increments cannot be empty.")
+        return [pair[0] for pair in pairs], json.dumps(pairs)
+
+    @classmethod
+    def _deltas_sql(cls) -> str:
+        # Repeated ids within a batch are summed into one change
+        return """SELECT json_extract(value, '$[0]') AS id,
+                    SUM(json_extract(value, '$[1]')) AS amount
+                FROM json_each(?) GROUP BY 1"""
+
+    @classmethod
+    def _increment_sql(cls, field: str) -> str:
+        if field == "parts":
+            # Never past max_parts when there is one, never below zero
+            value = "MAX(0, MIN(parts + deltas.amount, COALESCE(max_parts, parts + deltas.amount)))"
+        elif field == "completions":
+            value = "MAX(0, completions + deltas.amount)"
+        else:
+            raise ValueError(f"Cannot increment Consumable field: {field}")
+        return f"""UPDATE {cls.DB_NAME} SET {field} = {value}
+                FROM ({cls._deltas_sql()}) AS deltas
+                WHERE {cls.DB_NAME}.id = deltas.id
+                RETURNING *"""
+
+    @classmethod
+    def _advance_sql(cls, status: Union[Status, None]) -> tuple[str, list]:
+        values = []
+        if status is not None:
+            new_status = "?"
+            values.append(Status(status).value)
+        else:
+            # Finishing the last part completes, starting progress begins
+            new_status = f"""CASE
+                    WHEN max_parts IS NOT NULL AND new_parts >= max_parts THEN {Status.COMPLETED.value}
+                    WHEN status IN ({Status.PLANNING.value}, {Status.ON_HOLD.value}) AND new_parts > parts
+                        THEN {Status.IN_PROGRESS.value}
+                    ELSE status END"""
+        completed = Status.COMPLETED.value
+        # The values the update triggers would fill in are set here, so they do
+        # not fire again and RETURNING sees the final row
+        sql = f"""UPDATE {cls.DB_NAME} SET
+                    status = advanced.status,
+                    parts = advanced.parts,
+                    max_parts = CASE WHEN advanced.status = {completed} AND max_parts IS NULL
+                        THEN advanced.parts ELSE max_parts END,
+                    completions = CASE WHEN advanced.status = {completed} AND completions = 0
+                        THEN 1 ELSE completions END,
+                    start_date = CASE WHEN advanced.status = {Status.IN_PROGRESS.value} AND start_date IS NULL
+                        THEN strftime('%s') ELSE start_date END,
+                    end_date = CASE WHEN advanced.status = {completed} AND end_date IS NULL
+                        THEN strftime('%s') ELSE end_date END
+                FROM (
+                    SELECT id, status,
+                        CASE WHEN status = {completed} AND new_parts = 0
+                            THEN COALESCE(max_parts, 1) ELSE new_parts END AS parts
+                    FROM (
+                        SELECT id, max_parts, new_parts, {new_status} AS status
+                        FROM (
+                            SELECT {cls.DB_NAME}.*,
+                                MAX(0, MIN(parts + deltas.amount, COALESCE(max_parts, parts + deltas.amount))) AS new_parts
+                            FROM {cls.DB_NAME} JOIN ({cls._deltas_sql()}) AS deltas
+                                ON {cls.DB_NAME}.id = deltas.id
+                        )
+                    )
+                ) AS advanced
+                WHERE {cls.DB_NAME}.id = advanced.id
+                RETURNING *"""
+        return sql, values
+
+    @classmethod
+    def _run_increments(
+        cls, sql: str, values: list, ids: list[int], ids_json: str
+    ) -> Sequence[Consumable]:
+        db = cls.handler.get_db()
+        cur = db.cursor()
+        try:
+            cur.execute(sql, values + [ids_json])
+            consumables = cls._in_order(ids, cur.fetchall())
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        return consumables
+
+    @classmethod
+    def increment_many(
+        cls,
+        increments: Union[Mapping[int, int], Iterable[tuple[int, int]]],
+        field: str = "parts",
+        do_log: bool = True,
+    ) -> Sequence[Consumable]:
+        ids, ids_json = cls._deltas(increments)
+        consumables = cls._run_increments(cls._increment_sql(field), [], ids, ids_json)
+        if do_log:
+            logger = logging.getLogger(__name__)
+            for consumable in consumables:
+                logger.info(f"INCREMENT_CONSUMABLE#{field}#{consumable._csv_str()}")
+        return consumables
+
+    @classmethod
+    def advance_many(
+        cls,
+        increments: Union[Mapping[int, int], Iterable[tuple[int, int]]],
+        status: Union[Status, int, None] = None,
+        do_log: bool = True,
+    ) -> Sequence[Consumable]:
+        ids, ids_json = cls._deltas(increments)
+        sql, values = cls._advance_sql(status)
+        consumables = cls._run_increments(sql, values, ids, ids_json)
+        if do_log:
+            logger = logging.getLogger(__name__)
+            for consumable in consumables:
+                logger.info(f"ADVANCE_CONSUMABLE#{consumable._csv_str()}")
+        return consumables
+
+    def _increment_self(self, consumables: Sequence[Consumable]) -> Consumable:
+        if len(consumables) == 0:
+            raise ValueError(f"Consumable with ID {self.id} does not exist.")
+        return consumables[0]
+
+    def increment_parts(self, amount: int = 1, do_log: bool = True) -> Consumable:
+        if self.id is None:
+            raise ValueError("Cannot increment Consumable that does not have an ID.")
+        return self._increment_self(
+            self.increment_many([(self.id, amount)], "parts", do_log=do_log)
+        )
+
+    def increment_completions(self, amount: int = 1, do_log: bool = True) -> Consumable:
+        if self.id is None:
+            raise ValueError("Cannot increment Consumable that does not have an ID.")
+        return self._increment_self(
+            self.increment_many([(self.id, amount)], "completions", do_log=do_log)
+        )
+
+    def advance(
+        self,
+        parts: int = 1,
+        status: Union[Status, int, None] = None,
+        do_log: bool = True,
+    ) -> Consumable:
+        if self.id is None:
+            raise ValueError("Cannot advance Consumable that does not have an ID.")
+        return self._increment_self(
+            self.advance_many([(self.id, parts)], status=status, do_log=do_log)
+        )
+
     def update_self(self, set_map: Mapping[str, Any]) -> Consumable:
         if self.id is None:
             raise ValueError("Cannot update Consumable that does not have an ID.")
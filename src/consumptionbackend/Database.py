@@ -4,38 +4,794 @@ from pathlib import Path
 import os
 from abc import abstractmethod, ABC
 from typing import Union, Any
+import copy
 import json
+import logging
 import sqlite3
-from collections.abc import Sequence, Mapping
+import weakref
+from contextlib import contextmanager
+from collections.abc import Sequence, Mapping, Callable, Iterable
 
 # Consumption Imports
-from .config_handling import CONFIG_PATH
+from .config_handling import CONFIG_PATH, get_config, write_config
 from .Status import Status
+from .Instrumentation import Instrumentation
+from .ResultCache import ResultCache
+from .WorkingCopy import WorkingCopy
+from .ChangeTracker import ChangeTracker
+from .Libraries import LibrarySet
+from .Backend import Backend, SqliteBackend
+from . import maintenance
+
+# Bumped whenever DatabaseInstantiator gains new tables, triggers or indexes so
+# existing databases are brought up to date by update_script.
+SCHEMA_VERSION = 10
+# Tables whose writes bump a generation counter, see ChangeTracker
+TRACKED_TABLES = (
+    "series",
+    "personnel",
+    "consumables",
+    "consumable_tags",
+    "consumable_personnel",
+)
+# Tables the result cache may keep reads of, each with the tracked tables whose
+# generations move whenever it changes
+CACHEABLE_TABLES = {
+    **{table: (table,) for table in TRACKED_TABLES},
+    "series_stats": ("series", "consumables"),
+    "personnel_trigrams": ("personnel",),
+    "series_trigrams": ("series",),
+    "trigram_positions": (),
+    "consumable_events": ("consumables",),
+}
+# Consumable columns whose changes are appended to consumable_events, stored
+# by position in place of the name
+EVENT_FIELDS = ("status", "parts", "completions")
+# Name text indexed for fuzzy lookups and the columns it is built from, {row}
+# is replaced by the row alias
+TRIGRAM_NAMES = {
+    "personnel": (
+        "trim(replace(ifnull({row}first_name, '') || ' ' || ifnull({row}pseudonym, '') || ' ' || ifnull({row}last_name, ''), '  ', ' '))",
+        "first_name, last_name, pseudonym",
+    ),
+    "series": ("ifnull({row}name, '')", "name"),
+}
+# Numbers 1..n, triggers cannot use recursive CTEs to split names
+TRIGRAM_POSITIONS_NAME = "trigram_positions"
+TRIGRAM_MAX_LENGTH = 256
+# Bound parameters allowed in one statement since SQLite 3.32
+MAX_VARIABLES = 32766
+
+
+def _trigrams_sql(text: str, id: Union[str, None] = None, source: str = "") -> str:
+    # Each word is padded like pg_trgm, two spaces before and one after, the
+    # gaps this leaves between words only form trigrams ending in two spaces
+    return f"""SELECT DISTINCT substr(padded, n, 3){", id" if id else ""}
+                FROM (
+                    SELECT '  ' || replace(lower({text}), ' ', '   ') || ' ' AS padded
+                        {f", {id} AS id" if id else ""}
+                    {source}
+                ), {TRIGRAM_POSITIONS_NAME}
+                WHERE n <= length(padded) - 2 AND substr(padded, n + 1, 2) != '  '"""
+
+
+def _table_trigrams_sql(table: str, row: str, source: str = "") -> str:
+    name, _ = TRIGRAM_NAMES[table]
+    return _trigrams_sql(name.format(row=row + "."), f"{row}.id", source)
 
 
 class DatabaseHandler:
     DB_CONNECTION: sqlite3.Connection = None
+    INSTRUMENTATION: Union[Instrumentation, None] = None
+    RESULT_CACHE: Union[ResultCache, None] = None
+    WORKING_COPY: Union[WorkingCopy, None] = None
+    # The on-disk connection while a working copy is being served
+    DISK_CONNECTION: Union[sqlite3.Connection, None] = None
+    CHANGE_TRACKER: ChangeTracker = ChangeTracker()
+    # Entities with unsaved attribute changes, held weakly so dropping an
+    # entity discards its changes
+    DIRTY_ENTITIES: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+    # Rows written between scheduled maintenance runs, None to disable
+    MAINTENANCE_WRITES: Union[int, None] = None
+    MAINTENANCE_ON_CLOSE: bool = False
+    # Connection total_changes when maintenance last ran
+    MAINTENANCE_MARK: int = 0
+    LAST_MAINTENANCE: Union[Mapping[str, int], None] = None
+    LIBRARIES: LibrarySet = LibrarySet()
+    # Library the entity API is using, None for the one at DB_PATH
+    ACTIVE_LIBRARY: Union[str, None] = None
+    # The DB_PATH connection while another library is active
+    DEFAULT_CONNECTION: Union[sqlite3.Connection, None] = None
+    # Storage behind the entity API, SQLite through get_db unless replaced
+    BACKEND: Union[Backend, None] = None
 
     def __init__(self) -> None:
         raise RuntimeError("Class cannot be used outside of a static context.")
 
+    @classmethod
+    def _assert_sqlite(cls) -> None:
+        # Series stats, events, generations and trigrams are kept by SQLite
+        # triggers, other backends have nothing to serve them from
+        if cls.BACKEND is not None and not isinstance(cls.BACKEND, SqliteBackend):
+            raise RuntimeError("Only available with the SQLite backend.")
+
     @classmethod
     def get_db(cls) -> sqlite3.Connection:
+        cls._assert_sqlite()
         if not DatabaseHandler.DB_CONNECTION:
             with open(CONFIG_PATH, "r") as f:
                 cfg = json.load(f)
                 DB_PATH = Path(os.path.expanduser(cfg["DB_PATH"]))
                 cls.DB_CONNECTION = sqlite3.connect(DB_PATH)
-        return cls.DB_CONNECTION
+        if cls._maintenance_due():
+            cls.maintain()
+        db = cls.DB_CONNECTION
+        if cls.INSTRUMENTATION is not None:
+            db = cls.INSTRUMENTATION.wrap(db)
+        if cls.RESULT_CACHE is not None:
+            # Outermost, so hits never reach the instrumented cursor
+            db = cls.RESULT_CACHE.wrap(db, cls.DB_CONNECTION)
+        return db
+
+    @classmethod
+    def get_backend(cls) -> Backend:
+        if cls.BACKEND is None:
+            cls.BACKEND = SqliteBackend(cls.get_db)
+        return cls.BACKEND
+
+    @classmethod
+    def use_backend(cls, backend: Union[Backend, None]) -> None:
+        # None goes back to SQLite
+        if cls.WORKING_COPY is not None:
+            raise RuntimeError("Cannot switch backends while loaded into memory.")
+        cls.BACKEND = backend
+
+    @classmethod
+    def get_db_path(cls) -> Union[Path, None]:
+        if cls.WORKING_COPY is not None:
+            return cls.WORKING_COPY.disk_path
+        cur = cls.get_db().cursor()
+        cur.execute("PRAGMA database_list")
+        for row in cur.fetchall():
+            if row[1] == "main":
+                # In-memory and temporary databases have no file
+                return Path(row[2]) if row[2] else None
+        return None
+
+    @classmethod
+    def load_into_memory(
+        cls,
+        persist_interval: Union[float, None] = None,
+        pages: int = 256,
+        step_sleep: float = 0.0,
+    ) -> WorkingCopy:
+        if cls.WORKING_COPY is not None:
+            raise RuntimeError("Database is already loaded into memory.")
+        path = cls.get_db_path()
+        if path is None:
+            raise RuntimeError("Cannot load a database without a file into memory.")
+        disk = cls.DB_CONNECTION
+        disk.commit()
+        working_copy = WorkingCopy(
+            path, persist_interval=persist_interval, pages=pages, step_sleep=step_sleep
+        )
+        working_copy.load(disk)
+        cls.WORKING_COPY = working_copy
+        cls.DISK_CONNECTION = disk
+        cls.DB_CONNECTION = working_copy.memory
+        return working_copy
+
+    @classmethod
+    def persist(cls, force: bool = False) -> bool:
+        if cls.WORKING_COPY is None:
+            raise RuntimeError("Database is not loaded into memory.")
+        cls.WORKING_COPY.memory.commit()
+        return cls.WORKING_COPY.persist(force=force)
+
+    @classmethod
+    def unload_from_memory(cls, persist: bool = True) -> None:
+        if cls.WORKING_COPY is None:
+            raise RuntimeError("Database is not loaded into memory.")
+        cls.WORKING_COPY.memory.commit()
+        cls.WORKING_COPY.close(persist=persist)
+        cls.DB_CONNECTION = cls.DISK_CONNECTION
+        cls.WORKING_COPY = None
+        cls.DISK_CONNECTION = None
+
+    @classmethod
+    def flush(
+        cls, entities: Union[Iterable[DatabaseEntity], None] = None, do_log: bool = True
+    ) -> int:
+        if entities is None:
+            # Entities never stored have nothing to update, new() stores them
+            entities = [
+                entity
+                for entity in cls.DIRTY_ENTITIES.values()
+                if entity.id is not None
+            ]
+        # One batch per library, entity type and set of changed columns, ids
+        # repeat across libraries so entities go back to the one they came from
+        libraries: dict[Union[str, None], dict[tuple, list[DatabaseEntity]]] = {}
+        for entity in entities:
+            if entity.id is None:
+                raise ValueError(
+                    f"Cannot save {entity.__class__.__name__} that does not have an ID."
+                )
+            entity._prepare_save()
+            fields = entity.dirty_fields()
+            if len(fields) > 0:
+                groups = libraries.setdefault(entity._library, {})
+                groups.setdefault((entity.__class__, fields), []).append(entity)
+        saved = 0
+        for library, groups in libraries.items():
+            with cls.library(library):
+                cls.get_backend().save(
+                    [
+                        (
+                            entity_cls.DB_NAME,
+                            fields,
+                            [entity._save_params(fields) for entity in group],
+                        )
+                        for (entity_cls, fields), group in groups.items()
+                    ]
+                )
+            for (_, fields), group in groups.items():
+                for entity in group:
+                    if do_log:
+                        entity._log_save(fields)
+                    entity._mark_clean()
+                    saved += 1
+        return saved
+
+    @classmethod
+    def schedule_maintenance(
+        cls, writes: Union[int, None] = None, on_close: bool = True
+    ) -> None:
+        if writes is not None and writes < 1:
+            raise ValueError("Maintenance must be scheduled after at least one write.")
+        cls.MAINTENANCE_WRITES = writes
+        cls.MAINTENANCE_ON_CLOSE = on_close
+        if cls.DB_CONNECTION is not None:
+            cls.MAINTENANCE_MARK = cls.DB_CONNECTION.total_changes
+
+    @classmethod
+    def _maintenance_due(cls) -> bool:
+        # Only between transactions, and never on the in-memory working copy
+        # whose file is rewritten on persist anyway
+        return (
+            cls.MAINTENANCE_WRITES is not None
+            and cls.WORKING_COPY is None
+            and not cls.DB_CONNECTION.in_transaction
+            and cls.DB_CONNECTION.total_changes - cls.MAINTENANCE_MARK
+            >= cls.MAINTENANCE_WRITES
+        )
+
+    @classmethod
+    def maintain(
+        cls,
+        analysis_limit: int = maintenance.ANALYSIS_LIMIT,
+        vacuum_pages: Union[int, None] = None,
+        do_log: bool = True,
+    ) -> Mapping[str, int]:
+        if cls.WORKING_COPY is not None:
+            raise RuntimeError("Cannot maintain a database loaded into memory.")
+        # Marked first, get_db would otherwise start another run
+        cls.MAINTENANCE_MARK = cls.DB_CONNECTION.total_changes
+        cls.LAST_MAINTENANCE = maintenance.maintain(
+            cls.get_db(),
+            analysis_limit=analysis_limit,
+            vacuum_pages=vacuum_pages,
+            do_log=do_log,
+        )
+        cls.MAINTENANCE_MARK = cls.DB_CONNECTION.total_changes
+        return cls.LAST_MAINTENANCE
+
+    @classmethod
+    def enable_incremental_vacuum(cls) -> bool:
+        if cls.WORKING_COPY is not None:
+            raise RuntimeError("Cannot maintain a database loaded into memory.")
+        # Rebuilds the whole file, so only ever run when asked for
+        return maintenance.enable_incremental_vacuum(cls.get_db(), vacuum=True)
+
+    @classmethod
+    def close(cls) -> None:
+        if cls.WORKING_COPY is not None:
+            cls.unload_from_memory()
+        if cls.ACTIVE_LIBRARY is not None:
+            cls.use_library(None)
+        cls.LIBRARIES.close()
+        if cls.DB_CONNECTION is None:
+            return
+        if cls.MAINTENANCE_ON_CLOSE:
+            cls.maintain()
+        if cls.INSTRUMENTATION is not None:
+            # Statistics are kept, the next connection is wrapped on use
+            cls.INSTRUMENTATION.unwrap()
+        cls.DB_CONNECTION.commit()
+        cls.DB_CONNECTION.close()
+        cls.DB_CONNECTION = None
+        cls.MAINTENANCE_MARK = 0
+
+    @classmethod
+    def add_library(cls, name: str, path: Union[str, Path]) -> None:
+        cls.LIBRARIES.add(name, path)
+        try:
+            connection = cls.LIBRARIES.connection(name)
+            cur = connection.cursor()
+            cur.execute("PRAGMA user_version")
+            if cur.fetchone()[0] < SCHEMA_VERSION:
+                # Created or brought up to date like the default library
+                previous = cls.DB_CONNECTION
+                cls.DB_CONNECTION = connection
+                try:
+                    DatabaseInstantiator.run()
+                finally:
+                    cls.DB_CONNECTION = previous
+        except BaseException:
+            cls.LIBRARIES.remove(name)
+            raise
+
+    @classmethod
+    def remove_library(cls, name: str) -> None:
+        if cls.ACTIVE_LIBRARY == name:
+            raise RuntimeError("Cannot remove the library in use.")
+        cls.LIBRARIES.remove(name)
+
+    @classmethod
+    def load_libraries(cls) -> Sequence[str]:
+        for name, path in get_config().get("LIBRARIES", {}).items():
+            if name not in cls.LIBRARIES.paths:
+                cls.add_library(name, path)
+        return cls.LIBRARIES.names()
+
+    @classmethod
+    def save_libraries(cls) -> None:
+        config = get_config()
+        config["LIBRARIES"] = cls.LIBRARIES.to_config()
+        write_config(config)
+
+    @classmethod
+    def use_library(cls, name: Union[str, None]) -> None:
+        if name == cls.ACTIVE_LIBRARY:
+            return
+        if cls.WORKING_COPY is not None:
+            raise RuntimeError("Cannot switch libraries while loaded into memory.")
+        connection = None if name is None else cls.LIBRARIES.connection(name)
+        if cls.ACTIVE_LIBRARY is None:
+            cls.DEFAULT_CONNECTION = cls.DB_CONNECTION
+        if name is None:
+            cls.DB_CONNECTION = cls.DEFAULT_CONNECTION
+            cls.DEFAULT_CONNECTION = None
+        else:
+            cls.DB_CONNECTION = connection
+        cls.ACTIVE_LIBRARY = name
+
+    @classmethod
+    @contextmanager
+    def library(cls, name: Union[str, None]):
+        previous = cls.ACTIVE_LIBRARY
+        cls.use_library(name)
+        try:
+            yield
+        finally:
+            cls.use_library(previous)
+
+    @classmethod
+    def get_combined_db(cls) -> sqlite3.Connection:
+        # Every library attached read only, with all_<table> views over them
+        return cls.LIBRARIES.combined()
+
+    @classmethod
+    def data_version(cls) -> int:
+        return ChangeTracker.data_version(cls.get_db())
+
+    @classmethod
+    def generations(cls) -> Mapping[str, int]:
+        return ChangeTracker.generations(cls.get_db())
+
+    @classmethod
+    def subscribe(
+        cls,
+        callback: Callable[[set[str]], None],
+        tables: Union[Iterable[str], None] = None,
+    ) -> None:
+        # Changes are read from table_generations, which no other backend keeps
+        cls._assert_sqlite()
+        cls.CHANGE_TRACKER.subscribe(callback, tables)
+
+    @classmethod
+    def unsubscribe(cls, callback: Callable[[set[str]], None]) -> None:
+        cls.CHANGE_TRACKER.unsubscribe(callback)
+
+    @classmethod
+    def check_for_changes(cls) -> set[str]:
+        db = cls.get_db()
+        return cls.CHANGE_TRACKER.poll(cls.DB_CONNECTION, db)
+
+    @classmethod
+    def enable_instrumentation(
+        cls,
+        slow_query_ms: float = 100.0,
+        slow_log_size: int = 100,
+        samples: int = 1024,
+    ) -> Instrumentation:
+        cls.disable_instrumentation()
+        cls.INSTRUMENTATION = Instrumentation(
+            slow_query_ms=slow_query_ms, slow_log_size=slow_log_size, samples=samples
+        )
+        return cls.INSTRUMENTATION
+
+    @classmethod
+    def disable_instrumentation(cls) -> None:
+        if cls.INSTRUMENTATION is not None:
+            cls.INSTRUMENTATION.unwrap()
+            cls.INSTRUMENTATION = None
+
+    @classmethod
+    def query_stats(cls) -> Mapping[str, Any]:
+        if cls.INSTRUMENTATION is None:
+            raise RuntimeError("Instrumentation has not been enabled.")
+        return cls.INSTRUMENTATION.snapshot()
+
+    @classmethod
+    def enable_cache(
+        cls,
+        max_bytes: int = 16 * 1024 * 1024,
+        max_entry_rows: int = 10000,
+        check_external: bool = True,
+    ) -> ResultCache:
+        if max_bytes < 1 or max_entry_rows < 1:
+            raise ValueError("Cache limits must be positive.")
+        cls.RESULT_CACHE = ResultCache(
+            CACHEABLE_TABLES,
+            max_bytes=max_bytes,
+            max_entry_rows=max_entry_rows,
+            check_external=check_external,
+        )
+        return cls.RESULT_CACHE
+
+    @classmethod
+    def disable_cache(cls) -> None:
+        cls.RESULT_CACHE = None
+
+    @classmethod
+    def cache_stats(cls) -> Mapping[str, Any]:
+        if cls.RESULT_CACHE is None:
+            raise RuntimeError("Result cache has not been enabled.")
+        return cls.RESULT_CACHE.snapshot()
 
 
 class DatabaseEntity(ABC):
     handler: DatabaseHandler = DatabaseHandler
+    DB_NAME: str = None
+    # Side table of name trigrams for fuzzy_find, see TRIGRAM_NAMES
+    DB_TRIGRAMS_NAME: str = None
+    # Attributes stored in columns of DB_NAME, the ones save() writes
+    DB_COLUMNS: tuple[str, ...] = ()
 
     def __init__(self, *args, id: Union[int, None] = None) -> None:
         super().__init__()
+        # Column name to the value it had when the entity was last clean
+        self._dirty: dict[str, Any] = {}
         # None if not presently in the database, else the internal db id.
         self.id = id
+        # Library the entity was read from or created in, see flush
+        self._library = self.handler.ACTIVE_LIBRARY
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # First assignments happen in __init__ and are not changes
+        if name in self.DB_COLUMNS and name in self.__dict__:
+            if name not in self._dirty:
+                self._dirty[name] = self.__dict__[name]
+                self.handler.DIRTY_ENTITIES[id(self)] = self
+        super().__setattr__(name, value)
+
+    def dirty_fields(self) -> tuple[str, ...]:
+        return tuple(
+            field
+            for field in self.DB_COLUMNS
+            if field in self._dirty and getattr(self, field) != self._dirty[field]
+        )
+
+    def is_dirty(self) -> bool:
+        return len(self.dirty_fields()) > 0
+
+    def _mark_clean(self) -> None:
+        self._dirty.clear()
+        self.handler.DIRTY_ENTITIES.pop(id(self), None)
+
+    def _prepare_save(self) -> None:
+        pass
+
+    def _column_value(self, field: str) -> Any:
+        return getattr(self, field)
+
+    def _save_params(self, fields: Sequence[str]) -> list:
+        return [self._column_value(field) for field in fields] + [self.id]
+
+    def _log_save(self, fields: Sequence[str]) -> None:
+        # Rebuild the old state from the remembered values, no read needed
+        old = copy.copy(self)
+        for field in fields:
+            old.__dict__[field] = self._dirty[field]
+        logging.getLogger(self.__class__.__module__).info(
+            f"UPDATE_{self.__class__.__name__.upper()}#{old._csv_str()}#{self._csv_str()}"
+        )
+
+    def save(self, do_log: bool = True) -> bool:
+        return self.handler.flush([self], do_log=do_log) == 1
+
+    @classmethod
+    def _fuzzy_rows(
+        cls, name: str, limit: int, min_similarity: float
+    ) -> list[Sequence[Any]]:
+        if not 0 <= min_similarity <= 1:
+            raise ValueError("Minimum similarity must be between 0 and 1.")
+        name = " ".join(name.split())
+        trigrams = cls.DB_TRIGRAMS_NAME
+        # Similarity is the Dice coefficient 2s / (q + c) of s shared trigrams,
+        # as c >= s a candidate needs s >= m * q / (2 - m) to reach m, which
+        # is checked before any candidate is counted
+        sql = f"""WITH query(trigram) AS (
+                    {_trigrams_sql("?")}
+                ),
+                candidates(id, shared) AS (
+                    SELECT t.id, COUNT(*) FROM query
+                    JOIN {trigrams} AS t ON t.trigram = query.trigram
+                    GROUP BY t.id
+                    HAVING COUNT(*) >= ? * (SELECT COUNT(*) FROM query) / (2.0 - ?)
+                ),
+                scored(id, similarity) AS (
+                    SELECT id, 2.0 * shared / (
+                        (SELECT COUNT(*) FROM query)
+                        + (SELECT COUNT(*) FROM {trigrams} WHERE id = candidates.id)
+                    )
+                    FROM candidates
+                )
+                SELECT {cls.DB_NAME}.*, scored.similarity FROM scored
+                JOIN {cls.DB_NAME} ON {cls.DB_NAME}.id = scored.id
+                WHERE scored.similarity >= ?
+                ORDER BY scored.similarity DESC, {cls.DB_NAME}.id
+                LIMIT ?"""
+        cur = cls.handler.get_db().cursor()
+        cur.execute(sql, [name, min_similarity, min_similarity, min_similarity, limit])
+        return cur.fetchall()
+
+    @classmethod
+    @abstractmethod
+    def _seq_to_entity(cls, seq: Sequence[Any]) -> DatabaseEntity:
+        pass
+
+    @classmethod
+    def _set_sql(cls, set_map: Mapping[str, Any]) -> tuple[str, list]:
+        return ", ".join(f"{key} = ?" for key in set_map.keys()), list(set_map.values())
+
+    @classmethod
+    def _ids_json(cls, ids: Sequence[int]) -> str:
+        # One JSON parameter expanded by json_each, no bound-parameter limit
+        # and nothing written to stage the ids
+        return json.dumps([int(entity_id) for entity_id in ids])
+
+    @classmethod
+    def _rows_by_ids(cls, ids_json: str) -> list[Sequence[Any]]:
+        cur = cls.handler.get_db().cursor()
+        cur.execute(
+            f"""SELECT {cls.DB_NAME}.* FROM json_each(?) AS staged
+                JOIN {cls.DB_NAME} ON {cls.DB_NAME}.id = staged.value
+                ORDER BY staged.key""",
+            [ids_json],
+        )
+        return cur.fetchall()
+
+    @classmethod
+    def _in_order(
+        cls, ids: Sequence[int], rows: Iterable[Sequence[Any]]
+    ) -> list[DatabaseEntity]:
+        by_id = {row[0]: row for row in rows}
+        # dict.fromkeys drops repeated ids but keeps their first position
+        return [
+            cls._seq_to_entity(by_id[entity_id])
+            for entity_id in dict.fromkeys(ids)
+            if entity_id in by_id
+        ]
+
+    @classmethod
+    def find_by_ids(cls, ids: Iterable[int]) -> Sequence[DatabaseEntity]:
+        ids = list(ids)
+        return cls._in_order(ids, cls._rows_by_ids(cls._ids_json(ids)))
+
+    @classmethod
+    def update_by_ids(
+        cls, ids: Iterable[int], set_map: Mapping[str, Any], do_log: bool = True
+    ) -> Sequence[DatabaseEntity]:
+        if len(set_map) == 0:
+            raise ValueError("Set map cannot be empty.")
+        for key in set_map.keys():
+            if key not in cls.DB_COLUMNS:
+                raise ValueError(
+                    f"Improper key provided in attribute mapping for {cls.__name__}: {key}"
+                )
+        ids = list(ids)
+        db = cls.handler.get_db()
+        cur = db.cursor()
+        set_sql, values = cls._set_sql(set_map)
+        try:
+            ids_json = cls._ids_json(ids)
+            old_entities = (
+                cls._in_order(ids, cls._rows_by_ids(ids_json)) if do_log else []
+            )
+            cur.execute(
+                f"""UPDATE {cls.DB_NAME} SET {set_sql}
+                    WHERE id IN (SELECT value FROM json_each(?)) RETURNING *""",
+                values + [ids_json],
+            )
+            entities = cls._in_order(ids, cur.fetchall())
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        if do_log:
+            logger = logging.getLogger(cls.__module__)
+            new_entities = {entity.id: entity for entity in entities}
+            for old in old_entities:
+                logger.info(
+                    f"UPDATE_{cls.__name__.upper()}#{old._csv_str()}#{new_entities[old.id]._csv_str()}"
+                )
+        return entities
+
+    @classmethod
+    def delete_by_ids(cls, ids: Iterable[int], do_log: bool = True) -> bool:
+        ids = list(ids)
+        db = cls.handler.get_db()
+        cur = db.cursor()
+        try:
+            ids_json = cls._ids_json(ids)
+            old_entities = (
+                cls._in_order(ids, cls._rows_by_ids(ids_json)) if do_log else []
+            )
+            cur.execute(
+                f"DELETE FROM {cls.DB_NAME} WHERE id IN (SELECT value FROM json_each(?))",
+                [ids_json],
+            )
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        if do_log:
+            logger = logging.getLogger(cls.__module__)
+            for old in old_entities:
+                logger.info(f"DELETE_{cls.__name__.upper()}#{old._csv_str()}")
+        return True
+
+    @classmethod
+    def _upsert_match_sql(cls, key: Sequence[str]) -> str:
+        cur = cls.handler.get_db().cursor()
+        cur.execute(f"PRAGMA table_info({cls.DB_NAME})")
+        notnull = {row[1]: row[3] for row in cur.fetchall()}
+        # Nullable keys compare as '', so a missing pseudonym matches NULL,
+        # the same expressions as the upsert indexes of DatabaseInstantiator
+        # json_each has columns of its own, e.g. type
+        columns = [f"{cls.DB_NAME}.{column}" for column in key]
+        target = [
+            column if notnull[name] else f"ifnull({column}, '')"
+            for name, column in zip(key, columns)
+        ]
+        on = " AND ".join(
+            f"{expression} = json_extract(staged.value, '$[{i}]')"
+            for i, expression in enumerate(target)
+        )
+        return f"""SELECT staged.key, {cls.DB_NAME}.id FROM json_each(?) AS staged
+                JOIN {cls.DB_NAME} ON {on}"""
+
+    @classmethod
+    def _upsert_matches(
+        cls, cur: sqlite3.Cursor, key: Sequence[str], keys: Sequence[tuple]
+    ) -> dict[int, int]:
+        cur.execute(cls._upsert_match_sql(key), [json.dumps(keys)])
+        matches: dict[int, int] = {}
+        for index, id in cur.fetchall():
+            if index in matches:
+                raise ValueError(
+                    f"Cannot upsert {cls.__name__} by {', '.join(key)} while duplicates exist."
+                )
+            matches[index] = id
+        return matches
+
+    @classmethod
+    def _upsert_rows(
+        cls, rows: Iterable[Mapping[str, Any]], key: Sequence[str], chunk_size: int
+    ) -> list[Sequence[Any]]:
+        key = tuple(key)
+        if len(key) == 0 or any(column not in cls.DB_COLUMNS for column in key):
+            raise ValueError(f"Improper upsert key for {cls.__name__}: {key}")
+        # Rows repeating a key are merged, later attributes winning, as a row
+        # must not be inserted and then updated in one call
+        merged: dict[tuple, dict[str, Any]] = {}
+        for row in rows:
+            for column in row.keys():
+                if column not in cls.DB_COLUMNS:
+                    raise ValueError(
+                        f"Improper key provided in attribute mapping for {cls.__name__}: {column}"
+                    )
+            # Key attributes left out take their defaults, e.g. no pseudonym
+            if not any(column in row for column in key):
+                raise ValueError(f"Upsert row has no key attributes: {row}")
+            entity = cls(**row)
+            key_values = tuple(
+                "" if value is None else value
+                for value in (entity._column_value(column) for column in key)
+            )
+            merged[key_values] = {**merged.get(key_values, {}), **row}
+        width = len(cls.DB_COLUMNS)
+        chunk_size = max(1, min(chunk_size, MAX_VARIABLES // width))
+        placeholder = f"({','.join('?' * width)})"
+        db = cls.handler.get_db()
+        cur = db.cursor()
+        results = []
+        # A transaction the caller opened is theirs to commit or roll back
+        started = not db.in_transaction
+        if started:
+            cur.execute("BEGIN")
+        try:
+            keys = list(merged.keys())
+            matches = cls._upsert_matches(cur, key, keys)
+            # Inserts write every column, existing rows only the given ones.
+            # Existing rows take a plain UPDATE, as an UPSERT's DO UPDATE
+            # would override the OR IGNORE of inserts in the triggers
+            inserts: list[Any] = []
+            updates: dict[tuple[str, ...], list[list[Any]]] = {}
+            for index, row in enumerate(merged.values()):
+                entity = cls(**row)
+                if index not in matches:
+                    inserts.extend(
+                        entity._column_value(column) for column in cls.DB_COLUMNS
+                    )
+                    continue
+                updated = tuple(
+                    column
+                    for column in cls.DB_COLUMNS
+                    if column in row and column not in key
+                )
+                updates.setdefault(updated, []).append(
+                    [matches[index]]
+                    + [entity._column_value(column) for column in updated]
+                )
+            for updated, values in updates.items():
+                for start in range(0, len(values), chunk_size):
+                    staged = json.dumps(values[start : start + chunk_size])
+                    if len(updated) == 0:
+                        cur.execute(
+                            f"""SELECT * FROM {cls.DB_NAME} WHERE id IN
+                                (SELECT json_extract(value, '$[0]') FROM json_each(?))""",
+                            [staged],
+                        )
+                    else:
+                        set_sql = ", ".join(
+                            f"{column} = json_extract(staged.value, '$[{i + 1}]')"
+                            for i, column in enumerate(updated)
+                        )
+                        cur.execute(
+                            f"""UPDATE {cls.DB_NAME} SET {set_sql}
+                                FROM json_each(?) AS staged
+                                WHERE {cls.DB_NAME}.id = json_extract(staged.value, '$[0]')
+                                RETURNING *""",
+                            [staged],
+                        )
+                    results.extend(cur.fetchall())
+            for start in range(0, len(inserts), chunk_size * width):
+                chunk = inserts[start : start + chunk_size * width]
+                sql = f"""INSERT INTO {cls.DB_NAME} ({', '.join(cls.DB_COLUMNS)})
+                        VALUES {', '.join([placeholder] * (len(chunk) // width))}
+                        RETURNING *"""
+                cur.execute(sql, chunk)
+                results.extend(cur.fetchall())
+            if started:
+                db.commit()
+        except BaseException:
+            if started:
+                db.rollback()
+            raise
+        return results
 
     @classmethod
     @abstractmethod
@@ -72,9 +828,30 @@ class DatabaseInstantiator:
 
     @classmethod
     def run(cls):
+        # New files only, existing ones are switched over by update_script
+        maintenance.enable_incremental_vacuum(DatabaseHandler.get_db())
         cls.series_table()
         cls.personnel_table()
         cls.consumable_table()
+        cls.series_stats_table()
+        cls.timeline_table()
+        cls.events_table()
+        cls.generations_table()
+        cls.trigram_tables()
+        cls.set_schema_version(SCHEMA_VERSION)
+
+    @classmethod
+    def get_schema_version(cls) -> int:
+        cur = DatabaseHandler.get_db().cursor()
+        cur.execute("PRAGMA user_version")
+        return cur.fetchone()[0]
+
+    @classmethod
+    def set_schema_version(cls, version: int) -> None:
+        DatabaseHandler.get_db().cursor().execute(
+            f"PRAGMA user_version = {int(version)}"
+        )
+        DatabaseHandler.get_db().commit()
 
     @classmethod
     def consumable_table(cls):
@@ -121,8 +898,55 @@ class DatabaseInstantiator:
         DatabaseHandler.get_db().cursor().execute(sql)
         DatabaseHandler.get_db().cursor().execute(sql_personnel_mapping)
         DatabaseHandler.get_db().cursor().execute(sql_tag_mapping)
+        cls._consumable_indexes()
         cls._consumable_triggers()
 
+    @classmethod
+    def _consumable_indexes(cls):
+        cur = DatabaseHandler.get_db().cursor()
+        # Filters generated by Consumable.find, see query_plans
+        # Also serve the MIN(start_date) and MAX(end_date) series_stats
+        # recomputes on delete, which would otherwise walk the whole series
+        cur.execute("DROP INDEX IF EXISTS consumables_series_id")
+        cur.execute(
+            """CREATE INDEX IF NOT EXISTS consumables_series_start_date
+                ON consumables (series_id, start_date)"""
+        )
+        cur.execute(
+            """CREATE INDEX IF NOT EXISTS consumables_series_end_date
+                ON consumables (series_id, end_date)"""
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS consumables_type ON consumables (upper(type))"
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS consumables_status ON consumables (status)"
+        )
+        # Existing rows looked up by the default key of Consumable.upsert_many
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS consumables_name_type ON consumables (name, type)"
+        )
+        # Date ranges for the timeline
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS consumables_end_date ON consumables (end_date)"
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS consumables_start_date ON consumables (start_date)"
+        )
+        # Tag filtering looks up by tag, personnel lookups by consumable
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS consumable_tags_tag ON consumable_tags (tag, consumable_id)"
+        )
+        cur.execute(
+            """CREATE INDEX IF NOT EXISTS consumable_personnel_consumable_id
+                ON consumable_personnel (consumable_id)"""
+        )
+        # Personnel.aggregate filtered by role, grouped by personnel
+        cur.execute(
+            """CREATE INDEX IF NOT EXISTS consumable_personnel_role
+                ON consumable_personnel (role, personnel_id, consumable_id)"""
+        )
+
     @classmethod
     def _consumable_triggers(cls):
         cur = DatabaseHandler.get_db().cursor()
@@ -288,7 +1112,13 @@ class DatabaseInstantiator:
             last_name TEXT,
             pseudonym TEXT
         )"""
-        DatabaseHandler.get_db().cursor().execute(sql)
+        cur = DatabaseHandler.get_db().cursor()
+        cur.execute(sql)
+        # Existing rows looked up by the default key of Personnel.upsert_many
+        cur.execute(
+            """CREATE INDEX IF NOT EXISTS personnel_names ON personnel
+                (ifnull(first_name, ''), ifnull(last_name, ''), ifnull(pseudonym, ''))"""
+        )
 
     @classmethod
     def series_table(cls):
@@ -298,6 +1128,10 @@ class DatabaseInstantiator:
             name TEXT
         )"""
         cur.execute(sql)
+        # Existing rows looked up by the default key of Series.upsert_many
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS series_name ON series (ifnull(name, ''))"
+        )
         # None Series must be in database
         cur.execute("SELECT * FROM series WHERE id = -1")
         if len(cur.fetchall()) == 0:
@@ -320,3 +1154,363 @@ class DatabaseInstantiator:
                 END
         """
         )
+
+    @classmethod
+    def series_stats_table(cls):
+        cur = DatabaseHandler.get_db().cursor()
+        cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'series_stats'"
+        )
+        exists = cur.fetchone() is not None
+        status_columns = ",\n".join(
+            f"{status.name.lower()} INTEGER NOT NULL DEFAULT 0" for status in Status
+        )
+        sql = f"""CREATE TABLE IF NOT EXISTS series_stats(
+            series_id INTEGER PRIMARY KEY NOT NULL,
+            consumables INTEGER NOT NULL DEFAULT 0,
+            {status_columns},
+            rating_sum REAL NOT NULL DEFAULT 0,
+            rating_count INTEGER NOT NULL DEFAULT 0,
+            first_start_date REAL,
+            last_end_date REAL
+            )"""
+        cur.execute(sql)
+        cls._series_stats_triggers()
+        if not exists:
+            cls.rebuild_series_stats()
+
+    @classmethod
+    def rebuild_series_stats(cls):
+        status_columns = ", ".join(status.name.lower() for status in Status)
+        status_sums = ", ".join(
+            f"ifnull(SUM(consumables.status = {status.value}), 0)" for status in Status
+        )
+        cur = DatabaseHandler.get_db().cursor()
+        cur.execute("DELETE FROM series_stats")
+        cur.execute(
+            f"""
+            INSERT INTO series_stats
+                (series_id, consumables, {status_columns}, rating_sum, rating_count, first_start_date, last_end_date)
+                SELECT ids.series_id, COUNT(consumables.id), {status_sums},
+                    ifnull(SUM(consumables.rating), 0), COUNT(consumables.rating),
+                    MIN(consumables.start_date), MAX(consumables.end_date)
+                FROM (SELECT id AS series_id FROM series UNION SELECT series_id FROM consumables) AS ids
+                LEFT JOIN consumables ON consumables.series_id = ids.series_id
+                GROUP BY ids.series_id
+        """
+        )
+        DatabaseHandler.get_db().commit()
+
+    @classmethod
+    def _series_stats_triggers(cls):
+        cur = DatabaseHandler.get_db().cursor()
+
+        def adjust(row: str, sign: str) -> str:
+            status_sets = ", ".join(
+                f"{status.name.lower()} = {status.name.lower()} {sign} ({row}.status = {status.value})"
+                for status in Status
+            )
+            return f"""consumables = consumables {sign} 1,
+                        {status_sets},
+                        rating_sum = rating_sum {sign} ifnull({row}.rating, 0),
+                        rating_count = rating_count {sign} ({row}.rating IS NOT NULL)"""
+
+        def recompute_dates(row: str) -> str:
+            return f"""first_start_date = (SELECT MIN(start_date) FROM consumables WHERE series_id = {row}.series_id),
+                        last_end_date = (SELECT MAX(end_date) FROM consumables WHERE series_id = {row}.series_id)"""
+
+        # Series rows are created and removed alongside their series
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS series_stats_on_series_insert
+                AFTER INSERT ON series
+                BEGIN
+                    INSERT OR IGNORE INTO series_stats (series_id) VALUES (NEW.id);
+                END
+        """
+        )
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS series_stats_on_series_delete
+                AFTER DELETE ON series
+                BEGIN
+                    DELETE FROM series_stats WHERE series_id = OLD.id;
+                END
+        """
+        )
+        # Incrementally maintain counts, dates only widen on insert
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS series_stats_on_consumable_insert
+                AFTER INSERT ON consumables
+                BEGIN
+                    INSERT OR IGNORE INTO series_stats (series_id) VALUES (NEW.series_id);
+                    UPDATE series_stats SET {adjust("NEW", "+")},
+                        first_start_date = coalesce(min(first_start_date, NEW.start_date), first_start_date, NEW.start_date),
+                        last_end_date = coalesce(max(last_end_date, NEW.end_date), last_end_date, NEW.end_date)
+                        WHERE series_id = NEW.series_id;
+                END
+        """
+        )
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS series_stats_on_consumable_update
+                AFTER UPDATE OF series_id, status, rating, start_date, end_date ON consumables
+                FOR EACH ROW
+                BEGIN
+                    UPDATE series_stats SET {adjust("OLD", "-")}
+                        WHERE series_id = OLD.series_id;
+                    INSERT OR IGNORE INTO series_stats (series_id) VALUES (NEW.series_id);
+                    UPDATE series_stats SET {adjust("NEW", "+")}
+                        WHERE series_id = NEW.series_id;
+                    UPDATE series_stats SET {recompute_dates("OLD")}
+                        WHERE series_id = OLD.series_id;
+                    UPDATE series_stats SET {recompute_dates("NEW")}
+                        WHERE series_id = NEW.series_id AND NEW.series_id <> OLD.series_id;
+                END
+        """
+        )
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS series_stats_on_consumable_delete
+                AFTER DELETE ON consumables
+                BEGIN
+                    UPDATE series_stats SET {adjust("OLD", "-")}, {recompute_dates("OLD")}
+                        WHERE series_id = OLD.series_id;
+                END
+        """
+        )
+
+    @classmethod
+    def timeline_table(cls):
+        cur = DatabaseHandler.get_db().cursor()
+        cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'timeline_dirty'"
+        )
+        exists = cur.fetchone() is not None
+        # Completions per month (YYYY-MM of end_date) and type
+        cur.execute(
+            """CREATE TABLE IF NOT EXISTS timeline_buckets(
+                bucket TEXT NOT NULL,
+                type TEXT NOT NULL,
+                completions INTEGER NOT NULL DEFAULT 0,
+                rating_sum REAL NOT NULL DEFAULT 0,
+                rating_count INTEGER NOT NULL DEFAULT 0,
+                days_sum REAL NOT NULL DEFAULT 0,
+                days_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket, type)
+            ) WITHOUT ROWID"""
+        )
+        # Months whose buckets must be recomputed on the next refresh
+        cur.execute(
+            """CREATE TABLE IF NOT EXISTS timeline_dirty(
+                bucket TEXT PRIMARY KEY NOT NULL
+            ) WITHOUT ROWID"""
+        )
+        cls._timeline_triggers()
+        if not exists:
+            cur.execute(
+                """INSERT OR IGNORE INTO timeline_dirty
+                    SELECT DISTINCT strftime('%Y-%m', end_date, 'unixepoch')
+                    FROM consumables WHERE end_date IS NOT NULL"""
+            )
+            DatabaseHandler.get_db().commit()
+
+    @classmethod
+    def _timeline_triggers(cls):
+        cur = DatabaseHandler.get_db().cursor()
+
+        def mark(row: str) -> str:
+            return f"""INSERT OR IGNORE INTO timeline_dirty
+                        SELECT strftime('%Y-%m', {row}.end_date, 'unixepoch')
+                        WHERE {row}.end_date IS NOT NULL;"""
+
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS timeline_dirty_on_insert
+                AFTER INSERT ON consumables
+                WHEN NEW.end_date IS NOT NULL
+                BEGIN
+                    {mark("NEW")}
+                END
+        """
+        )
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS timeline_dirty_on_update
+                AFTER UPDATE OF type, status, rating, start_date, end_date ON consumables
+                FOR EACH ROW
+                WHEN OLD.end_date IS NOT NULL OR NEW.end_date IS NOT NULL
+                BEGIN
+                    {mark("OLD")}
+                    {mark("NEW")}
+                END
+        """
+        )
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS timeline_dirty_on_delete
+                AFTER DELETE ON consumables
+                WHEN OLD.end_date IS NOT NULL
+                BEGIN
+                    {mark("OLD")}
+                END
+        """
+        )
+
+    @classmethod
+    def events_table(cls):
+        cur = DatabaseHandler.get_db().cursor()
+        # Append only, history starts when the table is created
+        cur.execute(
+            """CREATE TABLE IF NOT EXISTS consumable_events(
+                timestamp INTEGER NOT NULL,
+                consumable_id INTEGER NOT NULL,
+                field INTEGER NOT NULL,
+                old INTEGER,
+                new INTEGER
+            )"""
+        )
+        # Covering, per-item history and per-field time ranges never read the
+        # table itself
+        cur.execute(
+            """CREATE INDEX IF NOT EXISTS consumable_events_item
+                ON consumable_events (consumable_id, field, timestamp, old, new)"""
+        )
+        cur.execute(
+            """CREATE INDEX IF NOT EXISTS consumable_events_time
+                ON consumable_events (field, timestamp, consumable_id, old, new)"""
+        )
+        cls._events_triggers()
+
+    @classmethod
+    def _events_triggers(cls):
+        cur = DatabaseHandler.get_db().cursor()
+        for code, field in enumerate(EVENT_FIELDS):
+            # Values set on insert count from NULL, those left at their
+            # default are not recorded
+            cur.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS consumable_events_on_{field}_insert
+                    AFTER INSERT ON consumables
+                    WHEN NEW.{field} != 0
+                    BEGIN
+                        INSERT INTO consumable_events
+                            VALUES (CAST(strftime('%s') AS INTEGER), NEW.id, {code}, NULL, NEW.{field});
+                    END
+            """
+            )
+            # Fix-ups by the consumable triggers are recorded as their own events
+            cur.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS consumable_events_on_{field}_update
+                    AFTER UPDATE OF {field} ON consumables
+                    FOR EACH ROW
+                    WHEN OLD.{field} IS NOT NEW.{field}
+                    BEGIN
+                        INSERT INTO consumable_events
+                            VALUES (CAST(strftime('%s') AS INTEGER), NEW.id, {code}, OLD.{field}, NEW.{field});
+                    END
+            """
+            )
+
+    @classmethod
+    def generations_table(cls):
+        cur = DatabaseHandler.get_db().cursor()
+        cur.execute(
+            f"""CREATE TABLE IF NOT EXISTS {ChangeTracker.GENERATIONS_NAME}(
+                name TEXT PRIMARY KEY NOT NULL,
+                generation INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID"""
+        )
+        cur.executemany(
+            f"INSERT OR IGNORE INTO {ChangeTracker.GENERATIONS_NAME} (name) VALUES (?)",
+            [(table,) for table in TRACKED_TABLES],
+        )
+        DatabaseHandler.get_db().commit()
+        cls._generation_triggers()
+
+    @classmethod
+    def _generation_triggers(cls):
+        cur = DatabaseHandler.get_db().cursor()
+        for table in TRACKED_TABLES:
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                cur.execute(
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_generation_on_{event.lower()}
+                        AFTER {event} ON {table}
+                        BEGIN
+                            UPDATE {ChangeTracker.GENERATIONS_NAME}
+                                SET generation = generation + 1 WHERE name = '{table}';
+                        END
+                """
+                )
+
+    @classmethod
+    def trigram_tables(cls):
+        cur = DatabaseHandler.get_db().cursor()
+        cur.execute(
+            f"""CREATE TABLE IF NOT EXISTS {TRIGRAM_POSITIONS_NAME}(
+                n INTEGER PRIMARY KEY NOT NULL
+            )"""
+        )
+        cur.executemany(
+            f"INSERT OR IGNORE INTO {TRIGRAM_POSITIONS_NAME} (n) VALUES (?)",
+            [(n,) for n in range(1, TRIGRAM_MAX_LENGTH + 1)],
+        )
+        for table in TRIGRAM_NAMES:
+            trigrams = f"{table}_trigrams"
+            cur.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                [trigrams],
+            )
+            exists = cur.fetchone() is not None
+            cur.execute(
+                f"""CREATE TABLE IF NOT EXISTS {trigrams}(
+                    trigram TEXT NOT NULL,
+                    id INTEGER NOT NULL,
+                    PRIMARY KEY (trigram, id)
+                ) WITHOUT ROWID"""
+            )
+            # Removing and counting a row's trigrams look up by id
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {trigrams}_id ON {trigrams} (id)")
+            cls._trigram_triggers(table)
+            if not exists:
+                cur.execute(
+                    f"INSERT OR IGNORE INTO {trigrams} {_table_trigrams_sql(table, table, f'FROM {table}')}"
+                )
+        DatabaseHandler.get_db().commit()
+
+    @classmethod
+    def _trigram_triggers(cls, table: str):
+        cur = DatabaseHandler.get_db().cursor()
+        trigrams = f"{table}_trigrams"
+        _, columns = TRIGRAM_NAMES[table]
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {trigrams}_on_insert
+                AFTER INSERT ON {table}
+                BEGIN
+                    INSERT OR IGNORE INTO {trigrams} {_table_trigrams_sql(table, "NEW")};
+                END
+        """
+        )
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {trigrams}_on_update
+                AFTER UPDATE OF id, {columns} ON {table}
+                BEGIN
+                    DELETE FROM {trigrams} WHERE id = OLD.id;
+                    INSERT OR IGNORE INTO {trigrams} {_table_trigrams_sql(table, "NEW")};
+                END
+        """
+        )
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {trigrams}_on_delete
+                AFTER DELETE ON {table}
+                BEGIN
+                    DELETE FROM {trigrams} WHERE id = OLD.id;
+                END
+        """
+        )
@@ -0,0 +1,249 @@
+# General Imports
+from __future__ import annotations
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import deque, Counter
+from collections.abc import Mapping, Sequence, Iterator
+from typing import Any, Union
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NULL_LITERAL = re.compile(r"(?<=[(,=])\s*NULL\b", re.I)
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?(?![\w.])", re.I)
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    # Collapse literals and parameter lists so statements group by shape
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _NULL_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("?,...", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _percentile(ordered: Sequence[float], pct: float) -> float:
+    if len(ordered) == 0:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class QueryStats:
+    def __init__(self, samples: int) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.rows = 0
+        # Most recent latencies, in seconds, used for percentiles
+        self.latencies = deque(maxlen=samples)
+
+    def add(self, elapsed: float, rows: int) -> None:
+        self.count += 1
+        self.total += elapsed
+        self.rows += rows
+        self.latencies.append(elapsed)
+
+    def snapshot(self) -> Mapping[str, Any]:
+        ordered = sorted(self.latencies)
+        return {
+            "count": self.count,
+            "rows": self.rows,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total * 1000 / self.count if self.count else 0.0,
+            "p50_ms": _percentile(ordered, 50) * 1000,
+            "p95_ms": _percentile(ordered, 95) * 1000,
+            "p99_ms": _percentile(ordered, 99) * 1000,
+            "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+        }
+
+
+class Instrumentation:
+    def __init__(
+        self,
+        slow_query_ms: float = 100.0,
+        slow_log_size: int = 100,
+        samples: int = 1024,
+    ) -> None:
+        self.slow_query_ms = slow_query_ms
+        self.samples = samples
+        self._lock = threading.Lock()
+        self._queries: dict[str, QueryStats] = {}
+        self._traced = Counter()
+        self._slow = deque(maxlen=slow_log_size)
+        self._proxy: Union[InstrumentedConnection, None] = None
+
+    def wrap(self, connection: sqlite3.Connection) -> InstrumentedConnection:
+        if self._proxy is None or self._proxy.connection is not connection:
+            self.unwrap()
+            connection.set_trace_callback(self._trace)
+            self._proxy = InstrumentedConnection(connection, self)
+        return self._proxy
+
+    def unwrap(self) -> None:
+        if self._proxy is not None:
+            self._proxy.connection.set_trace_callback(None)
+            self._proxy = None
+
+    def _trace(self, statement: str) -> None:
+        # Called for every statement SQLite runs and again for each trigger
+        # program it fires, so counts here expose trigger amplification
+        with self._lock:
+            self._traced[normalize_sql(statement)] += 1
+
+    def record(self, sql: str, params: Any, elapsed: float, rows: int) -> None:
+        template = normalize_sql(sql)
+        with self._lock:
+            stats = self._queries.get(template)
+            if stats is None:
+                stats = self._queries[template] = QueryStats(self.samples)
+            stats.add(elapsed, rows)
+            if elapsed * 1000 >= self.slow_query_ms:
+                self._slow.append(
+                    {
+                        "sql": template,
+                        "params": repr(params),
+                        "ms": elapsed * 1000,
+                        "rows": rows,
+                        "at": time.time(),
+                    }
+                )
+                logging.getLogger(__name__).warning(
+                    f"SLOW_QUERY#{elapsed * 1000:.3f},{rows},'{template}'"
+                )
+
+    def snapshot(self) -> Mapping[str, Any]:
+        with self._lock:
+            return {
+                "queries": {
+                    template: stats.snapshot()
+                    for template, stats in sorted(
+                        self._queries.items(), key=lambda x: -x[1].total
+                    )
+                },
+                "traced": dict(self._traced.most_common()),
+                "slow": list(self._slow),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._queries.clear()
+            self._traced.clear()
+            self._slow.clear()
+
+
+class InstrumentedCursor:
+    def __init__(self, cursor: sqlite3.Cursor, instrumentation: Instrumentation):
+        self.cursor = cursor
+        self.instrumentation = instrumentation
+        self._pending = None
+
+    def _begin(self, sql: str, params: Any, elapsed: float) -> None:
+        self._finish()
+        self._pending = [sql, params, elapsed, 0]
+
+    def _finish(self) -> None:
+        if self._pending is not None:
+            self.instrumentation.record(*self._pending)
+            self._pending = None
+
+    def _fetched(self, elapsed: float, rows: int, done: bool) -> None:
+        if self._pending is not None:
+            self._pending[2] += elapsed
+            self._pending[3] += rows
+            if done:
+                self._finish()
+
+    def execute(self, sql: str, parameters: Any = ()) -> InstrumentedCursor:
+        start = time.perf_counter()
+        self.cursor.execute(sql, parameters)
+        self._begin(sql, parameters, time.perf_counter() - start)
+        if self.cursor.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> InstrumentedCursor:
+        start = time.perf_counter()
+        self.cursor.executemany(sql, seq_of_parameters)
+        self._begin(sql, None, time.perf_counter() - start)
+        self._finish()
+        return self
+
+    def executescript(self, sql_script: str) -> InstrumentedCursor:
+        start = time.perf_counter()
+        self.cursor.executescript(sql_script)
+        self._begin(sql_script, None, time.perf_counter() - start)
+        self._finish()
+        return self
+
+    def fetchone(self) -> Any:
+        start = time.perf_counter()
+        row = self.cursor.fetchone()
+        self._fetched(time.perf_counter() - start, 0 if row is None else 1, row is None)
+        return row
+
+    def fetchmany(self, size: int = None) -> list:
+        start = time.perf_counter()
+        if size is None:
+            rows = self.cursor.fetchmany()
+        else:
+            rows = self.cursor.fetchmany(size)
+        self._fetched(time.perf_counter() - start, len(rows), len(rows) == 0)
+        return rows
+
+    def fetchall(self) -> list:
+        start = time.perf_counter()
+        rows = self.cursor.fetchall()
+        self._fetched(time.perf_counter() - start, len(rows), True)
+        return rows
+
+    def close(self) -> None:
+        self._finish()
+        self.cursor.close()
+
+    def __iter__(self) -> Iterator:
+        return self
+
+    def __next__(self) -> Any:
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.cursor, name)
+
+    def __del__(self) -> None:
+        self._finish()
+
+
+class InstrumentedConnection:
+    def __init__(
+        self, connection: sqlite3.Connection, instrumentation: Instrumentation
+    ) -> None:
+        self.connection = connection
+        self.instrumentation = instrumentation
+
+    def cursor(self, *args) -> InstrumentedCursor:
+        return InstrumentedCursor(self.connection.cursor(*args), self.instrumentation)
+
+    def execute(self, sql: str, parameters: Any = ()) -> InstrumentedCursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> InstrumentedCursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script: str) -> InstrumentedCursor:
+        return self.cursor().executescript(sql_script)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.connection, name)
+
+    def __enter__(self) -> InstrumentedConnection:
+        self.connection.__enter__()
+        return self
+
+    def __exit__(self, *args) -> Any:
+        return self.connection.__exit__(*args)
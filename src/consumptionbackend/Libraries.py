@@ -0,0 +1,101 @@
+# General Imports
+from __future__ import annotations
+import os
+import re
+import sqlite3
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Union
+
+_NAME = re.compile(r"^[A-Za-z_]\w*$")
+# Schema names SQLite reserves in every connection
+RESERVED_NAMES = {"main", "temp"}
+# Tables combined across libraries, each as a view named all_<table>
+COMBINED_TABLES = (
+    "series",
+    "personnel",
+    "consumables",
+    "consumable_tags",
+    "consumable_personnel",
+)
+
+
+def combined_name(table: str) -> str:
+    return f"all_{table}"
+
+
+class LibrarySet:
+    def __init__(self) -> None:
+        self.paths: dict[str, Path] = {}
+        # One read-write connection per library, so writes to one file never
+        # wait on another's lock
+        self.connections: dict[str, sqlite3.Connection] = {}
+        self._combined: Union[sqlite3.Connection, None] = None
+
+    def add(self, name: str, path: Union[str, Path]) -> None:
+        if not _NAME.match(name) or name.lower() in RESERVED_NAMES:
+            raise ValueError(f"Improper library name: {name}")
+        if name in self.paths:
+            raise ValueError(f"Library already exists: {name}")
+        self.paths[name] = Path(os.path.expanduser(path))
+        self.close_combined()
+
+    def remove(self, name: str) -> None:
+        if name not in self.paths:
+            raise ValueError(f"Library does not exist: {name}")
+        self.close_combined()
+        connection = self.connections.pop(name, None)
+        if connection is not None:
+            connection.close()
+        del self.paths[name]
+
+    def names(self) -> Sequence[str]:
+        return list(self.paths)
+
+    def connection(self, name: str) -> sqlite3.Connection:
+        if name not in self.paths:
+            raise ValueError(f"Library does not exist: {name}")
+        if name not in self.connections:
+            self.connections[name] = sqlite3.connect(self.paths[name])
+        return self.connections[name]
+
+    def combined(self) -> sqlite3.Connection:
+        if len(self.paths) == 0:
+            raise RuntimeError("No libraries have been added.")
+        if self._combined is None:
+            db = sqlite3.connect(":memory:", uri=True)
+            limit = db.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+            if len(self.paths) > limit:
+                db.close()
+                raise RuntimeError(
+                    f"Cannot attach more than {limit} libraries to one connection."
+                )
+            cur = db.cursor()
+            for name, path in self.paths.items():
+                # Read only, combined queries never take a library's write lock
+                cur.execute(
+                    f'ATTACH DATABASE ? AS "{name}"',
+                    [f"{path.resolve().as_uri()}?mode=ro"],
+                )
+            for table in COMBINED_TABLES:
+                selects = " UNION ALL ".join(
+                    f"SELECT '{name}' AS library, * FROM \"{name}\".{table}"
+                    for name in self.paths
+                )
+                cur.execute(f"CREATE TEMP VIEW {combined_name(table)} AS {selects}")
+            self._combined = db
+        return self._combined
+
+    def close_combined(self) -> None:
+        if self._combined is not None:
+            self._combined.close()
+            self._combined = None
+
+    def close(self) -> None:
+        self.close_combined()
+        for connection in self.connections.values():
+            connection.close()
+        self.connections.clear()
+
+    def to_config(self) -> Mapping[str, str]:
+        return {name: str(path) for name, path in self.paths.items()}
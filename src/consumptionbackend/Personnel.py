@@ -1,16 +1,82 @@
 # General Imports
 from __future__ import annotations
 import logging
-from collections.abc import Mapping, Sequence
+from collections.abc import Iterable, Mapping, Sequence
 from typing import Union, Any
 
 # Personnel Imports
 from . import Database
 from . import Consumable as cons
+from .Status import Status
+from .Libraries import combined_name
+from .Backend import SqliteBackend, Like
+
+
+class PersonnelStats:
+    def __init__(
+        self,
+        role: Union[str, None] = None,
+        consumables: int = 0,
+        status_counts: Union[Mapping[Status, int], None] = None,
+        rating_sum: float = 0.0,
+        rating_count: int = 0,
+        first_activity: Union[float, None] = None,
+        last_activity: Union[float, None] = None,
+    ) -> None:
+        # None when counted across every role
+        self.role = role
+        self.consumables = consumables
+        self.status_counts = {status: 0 for status in Status}
+        if status_counts is not None:
+            self.status_counts.update(status_counts)
+        self.rating_sum = rating_sum
+        self.rating_count = rating_count
+        self.first_activity = first_activity
+        self.last_activity = last_activity
+
+    @property
+    def completed(self) -> int:
+        return self.status_counts[Status.COMPLETED]
+
+    def average_rating(self) -> float:
+        if self.rating_count == 0:
+            return 0.0
+        else:
+            return self.rating_sum / self.rating_count
+
+    @classmethod
+    def _seq_to_stats(cls, seq: Sequence[Any]) -> PersonnelStats:
+        statuses = list(Status)
+        return PersonnelStats(
+            role=seq[0],
+            consumables=seq[1],
+            status_counts={status: count for status, count in zip(statuses, seq[2:])},
+            rating_sum=seq[2 + len(statuses)],
+            rating_count=seq[3 + len(statuses)],
+            first_activity=seq[4 + len(statuses)],
+            last_activity=seq[5 + len(statuses)],
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__} | {self.completed}/{self.consumables} completed"
+        )
 
 
 class Personnel(Database.DatabaseEntity):
     DB_NAME = "personnel"
+    DB_TRIGRAMS_NAME = "personnel_trigrams"
+    # role belongs to the consumable mapping, not the personnel row
+    DB_COLUMNS = ("first_name", "last_name", "pseudonym")
+    # Orderings accepted by Personnel.aggregate
+    AGGREGATE_ORDERS = {
+        "consumables": "consumables",
+        "completed": f"status_{Status.COMPLETED.value}",
+        "average_rating": "rating_sum / NULLIF(rating_count, 0)",
+        "rating_count": "rating_count",
+        "first_activity": "first_activity",
+        "last_activity": "last_activity",
+    }
 
     def __init__(
         self,
@@ -30,21 +96,167 @@ class Personnel(Database.DatabaseEntity):
     def get_consumables(self) -> Sequence[cons.Consumable]:
         if self.id is None:
             raise ValueError("Cannot find Consumables for Personnel without ID.")
+        rows = self.handler.get_backend().select_mapped(
+            cons.Consumable.DB_PERSONNEL_MAPPING_NAME,
+            {"personnel_id": self.id},
+            "consumable_id",
+            cons.Consumable.DB_NAME,
+        )
+        # Once per consumable however many roles were credited
+        unique = {row[0]: row for _, row in rows}
+        return [
+            cons.Consumable._seq_to_consumable(row) for _, row in sorted(unique.items())
+        ]
+
+    @classmethod
+    def _get_consumables_sql(cls) -> str:
+        return SqliteBackend.select_mapped_sql(
+            cons.Consumable.DB_PERSONNEL_MAPPING_NAME,
+            {"personnel_id": None},
+            "consumable_id",
+            cons.Consumable.DB_NAME,
+        )[0]
+
+    def get_stats(self, role: Union[str, None] = None) -> PersonnelStats:
+        if self.id is None:
+            raise ValueError("Cannot find stats for Personnel without ID.")
         cur = self.handler.get_db().cursor()
-        sql = f"""SELECT * FROM {cons.Consumable.DB_NAME}
-                    WHERE id IN
-                        (
-                            SELECT DISTINCT consumable_id
-                            FROM {cons.Consumable.DB_PERSONNEL_MAPPING_NAME}
-                            WHERE personnel_id = ?
-                        )
-                """
-        cur.execute(sql, [self.id])
-        rows = cur.fetchall()
-        consumables = []
-        for row in rows:
-            consumables.append(cons.Consumable._seq_to_consumable(row))
-        return consumables
+        cur.execute(*self._aggregate_sql(personnel_id=self.id, role=role))
+        row = cur.fetchone()
+        if row is None:
+            return PersonnelStats(role=role)
+        return PersonnelStats._seq_to_stats(row[4:])
+
+    def get_role_stats(self) -> Mapping[str, PersonnelStats]:
+        if self.id is None:
+            raise ValueError("Cannot find stats for Personnel without ID.")
+        cur = self.handler.get_db().cursor()
+        cur.execute(*self._aggregate_sql(personnel_id=self.id, by_role=True))
+        return {row[4]: PersonnelStats._seq_to_stats(row[4:]) for row in cur.fetchall()}
+
+    @classmethod
+    def _aggregate_sql(
+        cls,
+        personnel_id: Union[int, None] = None,
+        role: Union[str, None] = None,
+        by_role: bool = False,
+        order_by: str = "consumables",
+        descending: bool = True,
+        limit: Union[int, None] = None,
+        across: bool = False,
+        libraries: Union[Sequence[str], None] = None,
+    ) -> tuple[str, list]:
+        if order_by not in cls.AGGREGATE_ORDERS:
+            raise ValueError(f"Improper aggregate ordering for Personnel: {order_by}")
+        where = ["true"]
+        values = []
+        if libraries is not None:
+            where.append(f"library IN ({','.join('?' for _ in libraries)})")
+            values.extend(libraries)
+        if personnel_id is not None:
+            where.append("personnel_id = ?")
+            values.append(personnel_id)
+        if role is not None:
+            where.append("role = ?")
+            values.append(role)
+        group = "personnel_id, role" if by_role else "personnel_id"
+        mapping_table = cons.Consumable.DB_PERSONNEL_MAPPING_NAME
+        consumable_table = cons.Consumable.DB_NAME
+        personnel_table = cls.DB_NAME
+        library = ""
+        if across:
+            # Combined views, where ids only identify a row within a library
+            group = f"library, {group}"
+            mapping_table = combined_name(mapping_table)
+            consumable_table = combined_name(consumable_table)
+            personnel_table = combined_name(personnel_table)
+            library = "credits.library, "
+        role_column = "credits.role" if by_role else "?"
+        role_values = [] if by_role else [role]
+        statuses = ", ".join(
+            f"SUM(c.status = {status.value}) AS status_{status.value}"
+            for status in Status
+        )
+        # Someone credited in several roles counts each consumable once unless
+        # grouped by role
+        sql = f"""SELECT {library}p.id, p.first_name, p.last_name, p.pseudonym,
+                    {role_column}, COUNT(*) AS consumables, {statuses},
+                    TOTAL(c.rating) AS rating_sum, COUNT(c.rating) AS rating_count,
+                    MIN(ifnull(c.start_date, c.end_date)) AS first_activity,
+                    MAX(ifnull(c.end_date, c.start_date)) AS last_activity
+                FROM (
+                    SELECT DISTINCT {group}, consumable_id
+                    FROM {mapping_table}
+                    WHERE {' AND '.join(where)}
+                ) AS credits
+                JOIN {consumable_table} AS c ON c.id = credits.consumable_id
+                    {"AND c.library = credits.library" if across else ""}
+                JOIN {personnel_table} AS p ON p.id = credits.personnel_id
+                    {"AND p.library = credits.library" if across else ""}
+                GROUP BY {', '.join(f'credits.{column}' for column in group.split(', '))}
+                ORDER BY {cls.AGGREGATE_ORDERS[order_by]} {'DESC' if descending else 'ASC'}, {library}p.id
+            """
+        values = role_values + values
+        if limit is not None:
+            sql += " LIMIT ?"
+            values.append(limit)
+        return sql, values
+
+    @classmethod
+    def aggregate(
+        cls,
+        role: Union[str, None] = None,
+        by_role: bool = False,
+        order_by: str = "consumables",
+        descending: bool = True,
+        limit: Union[int, None] = None,
+    ) -> Sequence[tuple[Personnel, PersonnelStats]]:
+        cur = cls.handler.get_db().cursor()
+        cur.execute(
+            *cls._aggregate_sql(
+                role=role,
+                by_role=by_role,
+                order_by=order_by,
+                descending=descending,
+                limit=limit,
+            )
+        )
+        results = []
+        for row in cur.fetchall():
+            personnel = cls._seq_to_personnel(row)
+            personnel.role = row[4]
+            results.append((personnel, PersonnelStats._seq_to_stats(row[4:])))
+        return results
+
+    @classmethod
+    def aggregate_across(
+        cls,
+        libraries: Union[Sequence[str], None] = None,
+        role: Union[str, None] = None,
+        by_role: bool = False,
+        order_by: str = "consumables",
+        descending: bool = True,
+        limit: Union[int, None] = None,
+    ) -> Sequence[tuple[str, Personnel, PersonnelStats]]:
+        cur = cls.handler.get_combined_db().cursor()
+        cur.execute(
+            *cls._aggregate_sql(
+                role=role,
+                by_role=by_role,
+                order_by=order_by,
+                descending=descending,
+                limit=limit,
+                across=True,
+                libraries=libraries,
+            )
+        )
+        results = []
+        for row in cur.fetchall():
+            personnel = cls._seq_to_personnel(row[1:])
+            personnel.role = row[5]
+            personnel._library = row[0]
+            results.append((row[0], personnel, PersonnelStats._seq_to_stats(row[5:])))
+        return results
 
     @classmethod
     def _assert_attrs(cls, d: Mapping[str, Any]) -> None:
@@ -55,33 +267,41 @@ class Personnel(Database.DatabaseEntity):
                     f"Improper key provided in attribute mapping for Personnel: {key}"
                 )
 
+    @classmethod
+    def _filters(cls, where_map: Mapping[str, Any]) -> list[tuple[str, Any]]:
+        return [
+            (
+                key,
+                Like(value)
+                if key in ["first_name", "last_name", "pseudonym"]
+                else value,
+            )
+            for key, value in where_map.items()
+        ]
+
     @classmethod
     def _seq_to_personnel(cls, seq: Sequence[Any]) -> Personnel:
         return Personnel(
             id=seq[0], first_name=seq[1], last_name=seq[2], pseudonym=seq[3]
         )
 
+    @classmethod
+    def _seq_to_entity(cls, seq: Sequence[Any]) -> Personnel:
+        return cls._seq_to_personnel(seq)
+
     @classmethod
     def new(cls, do_log: bool = True, **kwargs) -> Personnel:
         cls._assert_attrs(kwargs)
-        cur = cls.handler.get_db().cursor()
         personnel = Personnel(**kwargs)
-
-        sql = f"""INSERT INTO {cls.DB_NAME}
-                (id, first_name, last_name, pseudonym)
-                VALUES (?,?,?,?)
-            """
-        cur.execute(
-            sql,
-            [
-                personnel.id,
-                personnel.first_name,
-                personnel.last_name,
-                personnel.pseudonym,
-            ],
+        personnel.id = cls.handler.get_backend().insert(
+            cls.DB_NAME,
+            {
+                "id": personnel.id,
+                "first_name": personnel.first_name,
+                "last_name": personnel.last_name,
+                "pseudonym": personnel.pseudonym,
+            },
         )
-        cls.handler.get_db().commit()
-        personnel.id = cur.lastrowid
         # Logging
         if do_log:
             logging.getLogger(__name__).info(f"NEW_CONSUMABLE#{personnel._csv_str()}")
@@ -90,20 +310,7 @@ class Personnel(Database.DatabaseEntity):
     @classmethod
     def find(cls, **kwargs) -> Sequence[Personnel]:
         cls._assert_attrs(kwargs)
-        cur = cls.handler.get_db().cursor()
-        where = ["true"]
-        values = []
-        for key, value in kwargs.items():
-            if key in ["first_name", "last_name", "pseudonym"]:
-                where.append(f"upper({key}) LIKE upper(?)")
-                values.append(f"%{value}%")
-            else:
-                where.append(f"{key} = ?")
-                values.append(value)
-
-        sql = f"SELECT * FROM {cls.DB_NAME} WHERE {' AND '.join(where)}"
-        cur.execute(sql, values)
-        rows = cur.fetchall()
+        rows = cls.handler.get_backend().select(cls.DB_NAME, cls._filters(kwargs))
         personnel = []
         for row in rows:
             personnel.append(cls._seq_to_personnel(row))
@@ -121,27 +328,9 @@ class Personnel(Database.DatabaseEntity):
         cls._assert_attrs(where_map)
         cls._assert_attrs(set_map)
         old_personnel = {p.id: p for p in cls.find(**where_map.copy())}
-        cur = cls.handler.get_db().cursor()
-        values = []
-
-        set_placeholders = []
-        for key, value in set_map.items():
-            set_placeholders.append(f"{key} = ?")
-            values.append(value)
-
-        where_placeholders = ["true"]
-        for key, value in where_map.items():
-            if key in ["first_name", "last_name", "pseudonym"]:
-                where_placeholders.append(f"upper({key}) LIKE upper(?)")
-                values.append(f"%{value}%")
-            else:
-                where_placeholders.append(f"{key} = ?")
-                values.append(value)
-
-        sql = f"UPDATE {cls.DB_NAME} SET {', '.join(set_placeholders)} WHERE {' AND '.join(where_placeholders)} RETURNING *"
-        cur.execute(sql, values)
-        rows = cur.fetchall()
-        cls.handler.get_db().commit()
+        rows = cls.handler.get_backend().update(
+            cls.DB_NAME, cls._filters(where_map), set_map
+        )
         personnel = []
         for row in rows:
             new_pers = cls._seq_to_personnel(row)
@@ -157,20 +346,7 @@ class Personnel(Database.DatabaseEntity):
     def delete(cls, do_log: bool = True, **kwargs) -> bool:
         cls._assert_attrs(kwargs)
         old_personnel = cls.find(**kwargs.copy())
-        cur = cls.handler.get_db().cursor()
-        where = ["true"]
-        values = []
-        for key, value in kwargs.items():
-            if key in ["first_name", "last_name", "pseudonym"]:
-                where.append(f"upper({key}) LIKE upper(?)")
-                values.append(f"%{value}%")
-            else:
-                where.append(f"{key} = ?")
-                values.append(value)
-
-        sql = f"DELETE FROM {cls.DB_NAME} WHERE {' AND '.join(where)}"
-        cur.execute(sql, values)
-        cls.handler.get_db().commit()
+        cls.handler.get_backend().delete(cls.DB_NAME, cls._filters(kwargs))
         # Logging
         if do_log:
             logger = logging.getLogger(__name__)
@@ -178,6 +354,33 @@ class Personnel(Database.DatabaseEntity):
                 logger.info(f"DELETE_PERSONNEL#{pers._csv_str()}")
         return True
 
+    @classmethod
+    def upsert_many(
+        cls,
+        rows: Iterable[Mapping[str, Any]],
+        key: Sequence[str] = ("first_name", "last_name", "pseudonym"),
+        chunk_size: int = 500,
+        do_log: bool = True,
+    ) -> Sequence[Personnel]:
+        personnel = [
+            cls._seq_to_personnel(row)
+            for row in cls._upsert_rows(rows, key, chunk_size)
+        ]
+        if do_log:
+            logger = logging.getLogger(__name__)
+            for pers in personnel:
+                logger.info(f"UPSERT_PERSONNEL#{pers._csv_str()}")
+        return personnel
+
+    @classmethod
+    def fuzzy_find(
+        cls, name: str, limit: int = 10, min_similarity: float = 0.3
+    ) -> Sequence[tuple[Personnel, float]]:
+        return [
+            (cls._seq_to_personnel(row[:-1]), row[-1])
+            for row in cls._fuzzy_rows(name, limit, min_similarity)
+        ]
+
     def update_self(self, set_map: Mapping[str, Any]) -> Personnel:
         if self.id is None:
             raise ValueError("Cannot update Personnel that does not have an ID.")
@@ -0,0 +1,327 @@
+# General Imports
+from __future__ import annotations
+import re
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence, Iterator
+from typing import Any, Union
+
+# Consumption Imports
+from .ChangeTracker import ChangeTracker
+
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+_WRITE = re.compile(r"\b(INSERT|UPDATE|DELETE|REPLACE)\b", re.I)
+
+
+def _rows_size(rows: Sequence[Any]) -> int:
+    # Rough footprint of a result, the list, its tuples and their values
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+class CacheEntry:
+    def __init__(
+        self,
+        rows: list,
+        description: Any,
+        generations: tuple[int, ...],
+        size: int,
+    ) -> None:
+        self.rows = rows
+        self.description = description
+        self.generations = generations
+        self.size = size
+
+
+class ResultCache:
+    def __init__(
+        self,
+        tables: Mapping[str, Sequence[str]],
+        max_bytes: int = 16 * 1024 * 1024,
+        max_entry_rows: int = 10000,
+        check_external: bool = True,
+    ) -> None:
+        # Table name to the tracked tables whose generations cover it
+        self.tables = tables
+        self.max_bytes = max_bytes
+        self.max_entry_rows = max_entry_rows
+        # Also notice commits by other connections, costs a PRAGMA per read
+        self.check_external = check_external
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+        # Statement to the tracked tables it reads, None if it cannot be cached
+        self._dependencies: dict[str, Union[tuple[str, ...], None]] = {}
+        self._connection: Union[sqlite3.Connection, None] = None
+        self._schema_tables: set[str] = set()
+        self._schema_version: Union[int, None] = None
+        self._total_changes: Union[int, None] = None
+        self._data_version: Union[int, None] = None
+        self._generations: Mapping[str, int] = {}
+        self._proxy: Union[CachedConnection, None] = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.uncacheable = 0
+
+    def wrap(self, connection: Any, raw: sqlite3.Connection) -> CachedConnection:
+        # connection may already be wrapped by Instrumentation, raw is the
+        # sqlite3 handle used for generations and identity
+        if (
+            self._proxy is None
+            or self._proxy.connection is not connection
+            or self._proxy.raw is not raw
+        ):
+            self._proxy = CachedConnection(connection, raw, self)
+        return self._proxy
+
+    def dependencies(
+        self, raw: sqlite3.Connection, sql: str
+    ) -> Union[tuple[str, ...], None]:
+        with self._lock:
+            self._use_connection(raw)
+            # Tables created or dropped since change what statements read
+            cur = raw.cursor()
+            cur.execute("PRAGMA schema_version")
+            if cur.fetchone()[0] != self._schema_version:
+                self._read_schema(raw)
+            dependencies = self._dependencies.get(sql, False)
+            if dependencies is not False:
+                return dependencies
+            words = _WORD.findall(sql)
+            dependencies = None
+            if (
+                len(words) > 0
+                and words[0].upper() in ("SELECT", "WITH")
+                and not _WRITE.search(sql)
+            ):
+                read = set(words) & self._schema_tables
+                # Tables without generations, timeline buckets filled in on
+                # read for one, make a result unsafe to keep
+                if len(read) > 0 and read <= self.tables.keys():
+                    dependencies = tuple(
+                        sorted(
+                            {source for table in read for source in self.tables[table]}
+                        )
+                    )
+            self._dependencies[sql] = dependencies
+            return dependencies
+
+    def _use_connection(self, raw: sqlite3.Connection) -> None:
+        if raw is self._connection:
+            return
+        # A different connection may be a different database entirely
+        self._connection = raw
+        self._total_changes = None
+        self._read_schema(raw)
+
+    def _read_schema(self, raw: sqlite3.Connection) -> None:
+        # Entries go too, a table dropped and created again restarts its
+        # generations
+        self._entries.clear()
+        self._dependencies.clear()
+        self.bytes = 0
+        self._total_changes = None
+        cur = raw.cursor()
+        cur.execute("PRAGMA schema_version")
+        self._schema_version = cur.fetchone()[0]
+        cur.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")
+        self._schema_tables = {row[0] for row in cur.fetchall()}
+
+    def _current_generations(self, raw: sqlite3.Connection) -> Mapping[str, int]:
+        self._use_connection(raw)
+        total_changes = raw.total_changes
+        data_version = ChangeTracker.data_version(raw) if self.check_external else None
+        if total_changes != self._total_changes or data_version != self._data_version:
+            self._generations = ChangeTracker.generations(raw)
+            self._total_changes = total_changes
+            self._data_version = data_version
+        return self._generations
+
+    def lookup(
+        self, raw: sqlite3.Connection, key: tuple, dependencies: tuple[str, ...]
+    ) -> tuple[Union[CacheEntry, None], tuple[int, ...]]:
+        with self._lock:
+            current = self._current_generations(raw)
+            generations = tuple(current.get(table, -1) for table in dependencies)
+            entry = self._entries.get(key)
+            if entry is not None and entry.generations == generations:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry, generations
+            if entry is not None:
+                self._remove(key)
+                self.invalidations += 1
+            self.misses += 1
+            return None, generations
+
+    def store(self, key: tuple, entry: CacheEntry) -> None:
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.bytes += entry.size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: tuple) -> None:
+        self.bytes -= self._entries.pop(key).size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._dependencies.clear()
+            self.bytes = 0
+            self._connection = None
+
+    def snapshot(self) -> Mapping[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "uncacheable": self.uncacheable,
+            }
+
+
+class CachedCursor:
+    def __init__(self, cursor: Any, raw: sqlite3.Connection, cache: ResultCache):
+        self.cursor = cursor
+        self.raw = raw
+        self.cache = cache
+        # Rows served from memory, then whatever is left on cursor
+        self._rows: Union[Iterator, None] = None
+        self._description = None
+
+    def execute(self, sql: str, parameters: Any = ()) -> CachedCursor:
+        self._rows = None
+        sql = _WHITESPACE.sub(" ", sql).strip()
+        dependencies = self.cache.dependencies(self.raw, sql)
+        # Reads inside a transaction may see writes that are rolled back
+        if dependencies is None or self.raw.in_transaction:
+            self.cache.uncacheable += 1
+            self.cursor.execute(sql, parameters)
+            return self
+        if isinstance(parameters, Mapping):
+            params = tuple(sorted(parameters.items()))
+        else:
+            params = tuple(parameters)
+        key = (sql, params)
+        entry, generations = self.cache.lookup(self.raw, key, dependencies)
+        if entry is not None:
+            self._rows = iter(entry.rows)
+            self._description = entry.description
+            return self
+        self.cursor.execute(sql, parameters)
+        rows = self.cursor.fetchmany(self.cache.max_entry_rows + 1)
+        self._description = self.cursor.description
+        if len(rows) <= self.cache.max_entry_rows:
+            self.cache.store(
+                key,
+                CacheEntry(rows, self._description, generations, _rows_size(rows)),
+            )
+        self._rows = iter(rows)
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> CachedCursor:
+        self._rows = None
+        self.cursor.executemany(sql, seq_of_parameters)
+        return self
+
+    def executescript(self, sql_script: str) -> CachedCursor:
+        self._rows = None
+        self.cursor.executescript(sql_script)
+        return self
+
+    @property
+    def description(self) -> Any:
+        if self._rows is not None:
+            return self._description
+        return self.cursor.description
+
+    def fetchone(self) -> Any:
+        if self._rows is None:
+            return self.cursor.fetchone()
+        row = next(self._rows, None)
+        if row is None:
+            self._rows = None
+            return self.cursor.fetchone()
+        return row
+
+    def fetchmany(self, size: int = None) -> list:
+        if size is None:
+            size = self.cursor.arraysize
+        if self._rows is None:
+            return self.cursor.fetchmany(size)
+        rows = []
+        while len(rows) < size:
+            row = self.fetchone()
+            if row is None:
+                break
+            rows.append(row)
+        return rows
+
+    def fetchall(self) -> list:
+        if self._rows is None:
+            return self.cursor.fetchall()
+        rows = list(self._rows)
+        self._rows = None
+        return rows + self.cursor.fetchall()
+
+    def __iter__(self) -> Iterator:
+        return self
+
+    def __next__(self) -> Any:
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.cursor, name)
+
+
+class CachedConnection:
+    def __init__(
+        self, connection: Any, raw: sqlite3.Connection, cache: ResultCache
+    ) -> None:
+        self.connection = connection
+        self.raw = raw
+        self.cache = cache
+
+    def cursor(self, *args) -> CachedCursor:
+        return CachedCursor(self.connection.cursor(*args), self.raw, self.cache)
+
+    def execute(self, sql: str, parameters: Any = ()) -> CachedCursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> CachedCursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script: str) -> CachedCursor:
+        return self.cursor().executescript(sql_script)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.connection, name)
+
+    def __enter__(self) -> CachedConnection:
+        self.connection.__enter__()
+        return self
+
+    def __exit__(self, *args) -> Any:
+        return self.connection.__exit__(*args)
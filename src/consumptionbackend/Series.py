@@ -1,20 +1,83 @@
 # General Imports
 from __future__ import annotations
 import logging
-from collections.abc import Mapping, Sequence
+from collections.abc import Iterable, Mapping, Sequence
 from typing import Union, Any
 
 # Consumption Imports
 from . import Database
 from . import Consumable as cons
+from .Status import Status
+from .Backend import Like, where_sql
+
+
+class SeriesStats:
+    def __init__(
+        self,
+        consumables: int = 0,
+        status_counts: Union[Mapping[Status, int], None] = None,
+        rating_sum: float = 0.0,
+        rating_count: int = 0,
+        first_start_date: Union[float, None] = None,
+        last_end_date: Union[float, None] = None,
+    ) -> None:
+        self.consumables = consumables
+        self.status_counts = {status: 0 for status in Status}
+        if status_counts is not None:
+            self.status_counts.update(status_counts)
+        self.rating_sum = rating_sum
+        self.rating_count = rating_count
+        self.first_start_date = first_start_date
+        self.last_end_date = last_end_date
+
+    @property
+    def completed(self) -> int:
+        return self.status_counts[Status.COMPLETED]
+
+    def average_rating(self) -> float:
+        if self.rating_count == 0:
+            return 0.0
+        else:
+            return self.rating_sum / self.rating_count
+
+    @classmethod
+    def _seq_to_stats(cls, seq: Sequence[Any]) -> SeriesStats:
+        # Series without a stats row have no consumables
+        if seq[0] is None:
+            return SeriesStats()
+        statuses = list(Status)
+        return SeriesStats(
+            consumables=seq[1],
+            status_counts={status: count for status, count in zip(statuses, seq[2:])},
+            rating_sum=seq[2 + len(statuses)],
+            rating_count=seq[3 + len(statuses)],
+            first_start_date=seq[4 + len(statuses)],
+            last_end_date=seq[5 + len(statuses)],
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__} | {self.completed}/{self.consumables} completed"
+        )
 
 
 class Series(Database.DatabaseEntity):
     DB_NAME = "series"
-
-    def __init__(self, *args, id: Union[int, None] = None, name: str = "") -> None:
+    DB_TRIGRAMS_NAME = "series_trigrams"
+    DB_STATS_NAME = "series_stats"
+    DB_COLUMNS = ("name",)
+
+    def __init__(
+        self,
+        *args,
+        id: Union[int, None] = None,
+        name: str = "",
+        stats: Union[SeriesStats, None] = None,
+    ) -> None:
         super().__init__(*args, id=id)
         self.name = name
+        # Only populated when found with_stats
+        self.stats = stats
 
     def get_consumables(self) -> Sequence[cons.Consumable]:
         if self.id is None:
@@ -30,47 +93,58 @@ class Series(Database.DatabaseEntity):
                     f"Improper key provided in attribute mapping for Series: {key}"
                 )
 
+    @classmethod
+    def _filters(cls, where_map: Mapping[str, Any]) -> list[tuple[str, Any]]:
+        return [
+            (key, Like(value) if key == "name" else value)
+            for key, value in where_map.items()
+        ]
+
     @classmethod
     def _seq_to_series(cls, seq: Sequence[Any]) -> Series:
         return Series(id=seq[0], name=seq[1])
 
+    @classmethod
+    def _seq_to_entity(cls, seq: Sequence[Any]) -> Series:
+        return cls._seq_to_series(seq)
+
     @classmethod
     def new(cls, do_log: bool = True, **kwargs) -> Series:
         cls._assert_attrs(kwargs)
-        cur = cls.handler.get_db().cursor()
         series = Series(**kwargs)
-
-        sql = f"""INSERT INTO {cls.DB_NAME} 
-                (id, name)
-                VALUES (?,?)
-            """
-        cur.execute(sql, [series.id, series.name])
-        cls.handler.get_db().commit()
-        series.id = cur.lastrowid
+        series.id = cls.handler.get_backend().insert(
+            cls.DB_NAME, {"id": series.id, "name": series.name}
+        )
         if do_log:
             logging.getLogger(__name__).info(f"NEW_SERIES#{series._csv_str()}")
         return series
 
     @classmethod
-    def find(cls, **kwargs) -> Sequence[Series]:
+    def find(cls, with_stats: bool = False, **kwargs) -> Sequence[Series]:
         cls._assert_attrs(kwargs)
-        cur = cls.handler.get_db().cursor()
-        where = ["true"]
-        values = []
-        for key, value in kwargs.items():
-            if key == "name":
-                where.append(f"upper({key}) LIKE upper(?)")
-                values.append(f"%{value}%")
-            else:
-                where.append(f"{key} = ?")
-                values.append(value)
-
-        sql = f"SELECT * FROM {cls.DB_NAME} WHERE {' AND '.join(where)}"
-        cur.execute(sql, values)
-        rows = cur.fetchall()
+        if with_stats:
+            # series_stats is kept by SQLite triggers, there is no backend
+            # equivalent
+            where, values = where_sql(
+                [(f"{cls.DB_NAME}.{key}", value) for key, value in cls._filters(kwargs)]
+            )
+            sql = f"""SELECT {cls.DB_NAME}.id, {cls.DB_NAME}.name, {cls.DB_STATS_NAME}.*
+                    FROM {cls.DB_NAME}
+                    LEFT JOIN {cls.DB_STATS_NAME}
+                    ON {cls.DB_STATS_NAME}.series_id = {cls.DB_NAME}.id
+                    WHERE {where}
+                """
+            cur = cls.handler.get_db().cursor()
+            cur.execute(sql, values)
+            rows = cur.fetchall()
+        else:
+            rows = cls.handler.get_backend().select(cls.DB_NAME, cls._filters(kwargs))
         series = []
         for row in rows:
-            series.append(cls._seq_to_series(row))
+            ser = cls._seq_to_series(row)
+            if with_stats:
+                ser.stats = SeriesStats._seq_to_stats(row[2:])
+            series.append(ser)
         return series
 
     @classmethod
@@ -85,27 +159,9 @@ class Series(Database.DatabaseEntity):
         cls._assert_attrs(where_map)
         cls._assert_attrs(set_map)
         old_series = {s.id: s for s in cls.find(**where_map.copy())}
-        cur = cls.handler.get_db().cursor()
-        values = []
-
-        set_placeholders = []
-        for key, value in set_map.items():
-            set_placeholders.append(f"{key} = ?")
-            values.append(value)
-
-        where_placeholders = ["true"]
-        for key, value in where_map.items():
-            if key == "name":
-                where_placeholders.append(f"upper({key}) LIKE upper(?)")
-                values.append(f"%{value}%")
-            else:
-                where_placeholders.append(f"{key} = ?")
-                values.append(value)
-
-        sql = f"UPDATE {cls.DB_NAME} SET {', '.join(set_placeholders)} WHERE {' AND '.join(where_placeholders)} RETURNING *"
-        cur.execute(sql, values)
-        rows = cur.fetchall()
-        cls.handler.get_db().commit()
+        rows = cls.handler.get_backend().update(
+            cls.DB_NAME, cls._filters(where_map), set_map
+        )
         series = []
         for row in rows:
             new_ser = cls._seq_to_series(row)
@@ -120,26 +176,39 @@ class Series(Database.DatabaseEntity):
     def delete(cls, do_log: bool = True, **kwargs) -> bool:
         cls._assert_attrs(kwargs)
         old_series = cls.find(**kwargs.copy())
-        cur = cls.handler.get_db().cursor()
-        where = ["true"]
-        values = []
-        for key, value in kwargs.items():
-            if key == "name":
-                where.append(f"upper({key}) LIKE upper(?)")
-                values.append(f"%{value}%")
-            else:
-                where.append(f"{key} = ?")
-                values.append(value)
-
-        sql = f"DELETE FROM {cls.DB_NAME} WHERE {' AND '.join(where)}"
-        cur.execute(sql, values)
-        cls.handler.get_db().commit()
+        cls.handler.get_backend().delete(cls.DB_NAME, cls._filters(kwargs))
         if do_log:
             logger = logging.getLogger(__name__)
             for ser in old_series:
                 logger.info(f"DELETE_SERIES#{ser._csv_str()}")
         return True
 
+    @classmethod
+    def upsert_many(
+        cls,
+        rows: Iterable[Mapping[str, Any]],
+        key: Sequence[str] = ("name",),
+        chunk_size: int = 500,
+        do_log: bool = True,
+    ) -> Sequence[Series]:
+        series = [
+            cls._seq_to_series(row) for row in cls._upsert_rows(rows, key, chunk_size)
+        ]
+        if do_log:
+            logger = logging.getLogger(__name__)
+            for ser in series:
+                logger.info(f"UPSERT_SERIES#{ser._csv_str()}")
+        return series
+
+    @classmethod
+    def fuzzy_find(
+        cls, name: str, limit: int = 10, min_similarity: float = 0.3
+    ) -> Sequence[tuple[Series, float]]:
+        return [
+            (cls._seq_to_series(row[:-1]), row[-1])
+            for row in cls._fuzzy_rows(name, limit, min_similarity)
+        ]
+
     def update_self(self, set_map: Mapping[str, Any]) -> Series:
         if self.id is None:
             raise ValueError("Cannot update Series that does not have an ID.")
@@ -0,0 +1,109 @@
+# General Imports
+from __future__ import annotations
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Union
+
+# Consumption Imports
+from .backup_handling import stepped_backup
+
+
+class WorkingCopy:
+    def __init__(
+        self,
+        disk_path: Path,
+        persist_interval: Union[float, None] = None,
+        pages: int = 256,
+        step_sleep: float = 0.0,
+    ) -> None:
+        self.disk_path = disk_path
+        self.persist_interval = persist_interval
+        self.pages = pages
+        self.step_sleep = step_sleep
+        # Shared with the persistence thread
+        self.memory = sqlite3.connect(":memory:", check_same_thread=False)
+        # Kept open so PRAGMA data_version can tell other writers from ours
+        self.disk: Union[sqlite3.Connection, None] = None
+        self._disk_version: Union[tuple[int, int], None] = None
+        self._lock = threading.Lock()
+        self._persisted_changes = 0
+        self._stop = threading.Event()
+        self._thread: Union[threading.Thread, None] = None
+        # Why the persistence thread stopped early, if it did
+        self.persist_error: Union[RuntimeError, None] = None
+
+    def load(self, disk: sqlite3.Connection) -> None:
+        stepped_backup(disk, self.memory, pages=self.pages, step_sleep=self.step_sleep)
+        self._persisted_changes = self.memory.total_changes
+        self.disk = sqlite3.connect(self.disk_path, check_same_thread=False)
+        self._disk_version = self._read_disk_version()
+        if self.persist_interval is not None:
+            self._thread = threading.Thread(
+                target=self._run, name="consumption-persist", daemon=True
+            )
+            self._thread.start()
+
+    def is_dirty(self) -> bool:
+        return self.memory.total_changes != self._persisted_changes
+
+    def _read_disk_version(self) -> tuple[int, int]:
+        cur = self.disk.cursor()
+        cur.execute("PRAGMA data_version")
+        return cur.fetchone()[0], os.stat(self.disk_path).st_mtime_ns
+
+    def has_external_changes(self) -> bool:
+        with self._lock:
+            return self._read_disk_version() != self._disk_version
+
+    def persist(self, force: bool = False) -> bool:
+        # The whole in-memory database is copied over the file, so refuse
+        # when anything else has written to it since load or the last persist
+        with self._lock:
+            if not force and not self.is_dirty():
+                return False
+            if self._read_disk_version() != self._disk_version:
+                raise RuntimeError(
+                    f"Database file was changed by another connection: {self.disk_path}"
+                )
+            changes = self.memory.total_changes
+            stepped_backup(
+                self.memory, self.disk, pages=self.pages, step_sleep=self.step_sleep
+            )
+            self._persisted_changes = changes
+            self._disk_version = self._read_disk_version()
+        logging.getLogger(__name__).debug(f"PERSIST#'{self.disk_path}'")
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.persist_interval):
+            # Left for the next interval, copying now would persist half of
+            # a transaction the main thread has not finished
+            if self.memory.in_transaction:
+                continue
+            try:
+                self.persist()
+            except RuntimeError as e:
+                # Another writer changed the file, every retry would fail the
+                # same way, persist() or close() report it from here on
+                self.persist_error = e
+                logging.getLogger(__name__).error(
+                    f"Stopped persisting working copy: {e}"
+                )
+                return
+            except sqlite3.Error:
+                logging.getLogger(__name__).exception("Failed to persist working copy.")
+
+    def close(self, persist: bool = True) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if persist:
+            self.persist()
+        self.memory.close()
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
@@ -1,4 +1,8 @@
+import os
+
 from . import setup_script
 
-setup_script.setup()
+# Clients of a running daemon leave setup to it, see client.py
+if not os.environ.get("CONSUMPTION_SKIP_SETUP"):
+    setup_script.setup()
 # print("Init Ran")
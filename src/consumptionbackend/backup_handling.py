@@ -0,0 +1,120 @@
+# General Imports
+import argparse
+import logging
+import sqlite3
+import time
+from collections.abc import Callable, Sequence
+from datetime import datetime
+from pathlib import Path
+from typing import Union
+
+# Consumption Imports
+from .config_handling import CONSUMPTION_PATH
+
+BACKUP_PATH = CONSUMPTION_PATH / "backups"
+BACKUP_PREFIX = "consumption-"
+BACKUP_SUFFIX = ".db"
+
+
+def stepped_backup(
+    source: sqlite3.Connection,
+    target: sqlite3.Connection,
+    pages: int = 256,
+    step_sleep: float = 0.0,
+    progress: Union[Callable[[int, int, int], object], None] = None,
+) -> None:
+    # Copying a bounded number of pages per step releases the locks between
+    # steps, sleeping there gives other connections room to run.
+    def on_step(status: int, remaining: int, total: int) -> None:
+        if progress is not None:
+            progress(status, remaining, total)
+        if step_sleep > 0 and remaining > 0:
+            time.sleep(step_sleep)
+
+    source.backup(target, pages=pages, progress=on_step)
+
+
+def quick_check(path: Path) -> Sequence[str]:
+    db = sqlite3.connect(path)
+    try:
+        cur = db.cursor()
+        cur.execute("PRAGMA quick_check")
+        return [row[0] for row in cur.fetchall()]
+    finally:
+        db.close()
+
+
+def list_backups(directory: Path = BACKUP_PATH) -> Sequence[Path]:
+    # Oldest first, the timestamped names sort chronologically
+    return sorted(Path(directory).glob(f"{BACKUP_PREFIX}*{BACKUP_SUFFIX}"))
+
+
+def rotate_backups(directory: Path = BACKUP_PATH, keep: int = 5) -> Sequence[Path]:
+    if keep < 1:
+        raise ValueError("At least one backup must be kept.")
+    removed = list(list_backups(directory))[:-keep]
+    for path in removed:
+        path.unlink()
+    return removed
+
+
+def backup(
+    directory: Path = BACKUP_PATH,
+    keep: int = 5,
+    pages: int = 256,
+    step_sleep: float = 0.0,
+    progress: Union[Callable[[int, int, int], object], None] = None,
+) -> Path:
+    from .Database import DatabaseHandler
+
+    if keep < 1:
+        raise ValueError("At least one backup must be kept.")
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    path = directory / f"{BACKUP_PREFIX}{stamp}{BACKUP_SUFFIX}"
+    partial = path.with_name(path.name + ".partial")
+    # The handler's own connection, the working copy when one is loaded, so
+    # its writes between steps do not restart the copy
+    source = DatabaseHandler.get_db()
+    source = getattr(source, "connection", source)
+    source.commit()
+    target = sqlite3.connect(partial)
+    try:
+        stepped_backup(
+            source, target, pages=pages, step_sleep=step_sleep, progress=progress
+        )
+    finally:
+        target.close()
+    result = quick_check(partial)
+    if result != ["ok"]:
+        partial.unlink()
+        raise RuntimeError(f"Backup failed quick_check: {'; '.join(result)}")
+    partial.rename(path)
+    removed = rotate_backups(directory, keep)
+    logging.getLogger(__name__).info(f"BACKUP#'{path}',{len(removed)}")
+    return path
+
+
+def main(argv: Union[Sequence[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Back up the consumption database while it is in use."
+    )
+    parser.add_argument("--dir", type=Path, default=BACKUP_PATH)
+    parser.add_argument("--keep", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=256)
+    parser.add_argument("--sleep", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    def report(status: int, remaining: int, total: int) -> None:
+        print(f"\r{total - remaining}/{total} pages", end="", flush=True)
+
+    path = backup(
+        args.dir,
+        keep=args.keep,
+        pages=args.pages,
+        step_sleep=args.sleep,
+        progress=report,
+    )
+    print(f"\n{path}")
+    return 0
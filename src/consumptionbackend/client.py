@@ -0,0 +1,87 @@
+# General Imports
+import itertools
+import json
+import socket
+from pathlib import Path
+from typing import Any
+
+# Consumption Imports
+from .daemon import SOCKET_PATH, METHODS, ERRORS, encode, decode, dumps, entity_classes
+
+
+class Client:
+    # Exposes Consumable, Series and Personnel with the package API, every
+    # call is answered by a running daemon
+    def __init__(self, socket_path: Path = SOCKET_PATH) -> None:
+        self.socket_path = Path(socket_path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(str(self.socket_path))
+        self._file = self._socket.makefile("rwb")
+        self._ids = itertools.count()
+        self.classes = {
+            name: self._remote_class(cls) for name, cls in entity_classes().items()
+        }
+        self.Consumable = self.classes["Consumable"]
+        self.Series = self.classes["Series"]
+        self.Personnel = self.classes["Personnel"]
+
+    def _remote_class(self, cls: type) -> type:
+        class_methods, instance_methods = METHODS[cls.__name__]
+        namespace = {}
+        for name in class_methods:
+            namespace[name] = classmethod(self._class_method(cls.__name__, name))
+        for name in instance_methods:
+            namespace[name] = self._instance_method(cls.__name__, name)
+        # A subclass so results still pass isinstance checks against the
+        # package classes and keep their attributes and formatting
+        return type(cls.__name__, (cls,), namespace)
+
+    def _class_method(self, cls_name: str, name: str):
+        def method(cls, *args, **kwargs):
+            return self.call(f"{cls_name}.{name}", None, args, kwargs)
+
+        return method
+
+    def _instance_method(self, cls_name: str, name: str):
+        def method(entity, *args, **kwargs):
+            return self.call(f"{cls_name}.{name}", entity, args, kwargs)
+
+        return method
+
+    def _build(self, name: str, attrs: dict[str, Any]) -> Any:
+        return self.classes[name](**attrs)
+
+    def call(self, method: str, entity: Any, args: tuple, kwargs: dict) -> Any:
+        request = {
+            "id": next(self._ids),
+            "method": method,
+            "params": {
+                "self": encode(entity) if entity is not None else None,
+                "args": encode(list(args)),
+                "kwargs": encode(kwargs),
+            },
+        }
+        self._file.write(dumps(request))
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise RuntimeError("Daemon closed the connection.")
+        response = json.loads(line)
+        if "error" in response:
+            error = ERRORS.get(response["error"]["type"], RuntimeError)
+            raise error(response["error"]["message"])
+        if entity is not None and response.get("self") is not None:
+            # Take on the daemon's view of the entity, including it being
+            # clean after a save
+            entity.__dict__.update(decode(response["self"], self._build).__dict__)
+        return decode(response["result"], self._build)
+
+    def close(self) -> None:
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,284 @@
+# General Imports
+import argparse
+import json
+import logging
+import os
+import socketserver
+import sqlite3
+import threading
+from collections.abc import Callable, Iterator, Mapping
+from pathlib import Path
+from typing import Union, Any
+
+# Consumption Imports
+from .config_handling import CONSUMPTION_PATH, get_config
+from .Status import Status
+
+SOCKET_PATH = CONSUMPTION_PATH / "daemon.sock"
+# Prepared statements kept by the warm connection, sqlite3 defaults to 128
+CACHED_STATEMENTS = 512
+# Methods callable over the socket, per class (classmethods, instance methods)
+METHODS = {
+    "Consumable": (
+        {
+            "new",
+            "find",
+            "update",
+            "delete",
+            "upsert_many",
+            "find_by_ids",
+            "update_by_ids",
+            "delete_by_ids",
+            "increment_many",
+            "advance_many",
+            "update_chunked",
+            "delete_chunked",
+        },
+        {
+            "get_series",
+            "set_series",
+            "get_tags",
+            "add_tag",
+            "remove_tag",
+            "get_personnel",
+            "add_personnel",
+            "remove_personnel",
+            "related",
+            "increment_parts",
+            "increment_completions",
+            "advance",
+            "update_self",
+            "delete_self",
+            "save",
+        },
+    ),
+    "Series": (
+        {
+            "new",
+            "find",
+            "update",
+            "delete",
+            "upsert_many",
+            "fuzzy_find",
+            "find_by_ids",
+            "update_by_ids",
+            "delete_by_ids",
+        },
+        {"get_consumables", "update_self", "delete_self", "save"},
+    ),
+    "Personnel": (
+        {
+            "new",
+            "find",
+            "update",
+            "delete",
+            "upsert_many",
+            "fuzzy_find",
+            "find_by_ids",
+            "update_by_ids",
+            "delete_by_ids",
+        },
+        {"get_consumables", "update_self", "delete_self", "save"},
+    ),
+}
+# Exceptions re-raised as themselves by the client, anything else becomes a
+# RuntimeError
+ERRORS = {
+    error.__name__: error
+    for error in (ValueError, RuntimeError, TypeError, KeyError, IndexError)
+}
+
+
+def entity_classes() -> Mapping[str, type]:
+    from .Consumable import Consumable
+    from .Series import Series
+    from .Personnel import Personnel
+
+    return {"Consumable": Consumable, "Series": Series, "Personnel": Personnel}
+
+
+def encode(value: Any) -> Any:
+    from .Database import DatabaseEntity
+    from .Series import SeriesStats
+
+    if isinstance(value, DatabaseEntity):
+        attrs = {
+            key: encode(val)
+            for key, val in value.__dict__.items()
+            if not key.startswith("_")
+        }
+        # Sent as the clean values plus unsaved changes so dirty tracking
+        # carries across
+        changes = {}
+        for field, original in value._dirty.items():
+            changes[field] = attrs[field]
+            attrs[field] = encode(original)
+        return {
+            "$entity": value.__class__.__name__,
+            "attrs": attrs,
+            "changes": changes,
+        }
+    if isinstance(value, Status):
+        return {"$status": value.value}
+    if isinstance(value, SeriesStats):
+        attrs = dict(value.__dict__)
+        attrs["status_counts"] = [
+            [status.value, count] for status, count in value.status_counts.items()
+        ]
+        return {"$stats": attrs}
+    if isinstance(value, tuple):
+        return {"$tuple": [encode(val) for val in value]}
+    if isinstance(value, Mapping):
+        return {key: encode(val) for key, val in value.items()}
+    if isinstance(value, (list, Iterator)):
+        return [encode(val) for val in value]
+    return value
+
+
+def decode(value: Any, factory: Callable[[str, Mapping[str, Any]], Any]) -> Any:
+    from .Series import SeriesStats
+
+    if isinstance(value, list):
+        return [decode(val, factory) for val in value]
+    if not isinstance(value, dict):
+        return value
+    if "$entity" in value:
+        entity = factory(value["$entity"], decode(value["attrs"], factory))
+        for field, val in decode(value["changes"], factory).items():
+            setattr(entity, field, val)
+        return entity
+    if "$status" in value:
+        return Status(value["$status"])
+    if "$stats" in value:
+        attrs = dict(value["$stats"])
+        attrs["status_counts"] = {
+            Status(status): count for status, count in attrs["status_counts"]
+        }
+        return SeriesStats(**attrs)
+    if "$tuple" in value:
+        return tuple(decode(val, factory) for val in value["$tuple"])
+    return {key: decode(val, factory) for key, val in value.items()}
+
+
+def dumps(message: Mapping[str, Any]) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        # One request per line until the client disconnects
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError:
+                self.wfile.write(
+                    dumps(
+                        {
+                            "id": None,
+                            "error": {"type": "ValueError", "message": "Bad request."},
+                        }
+                    )
+                )
+                continue
+            try:
+                with self.server.lock:
+                    response = {
+                        "id": request.get("id"),
+                        **dispatch(
+                            request.get("method", ""), request.get("params", {})
+                        ),
+                    }
+            except Exception as e:
+                response = {
+                    "id": request.get("id"),
+                    "error": {"type": e.__class__.__name__, "message": str(e)},
+                }
+            self.wfile.write(dumps(response))
+
+
+def dispatch(method: str, params: Mapping[str, Any]) -> Mapping[str, Any]:
+    classes = entity_classes()
+    cls_name, _, name = method.partition(".")
+    if cls_name not in METHODS:
+        raise ValueError(f"Unknown method: {method}")
+
+    def factory(entity_name: str, attrs: Mapping[str, Any]) -> Any:
+        if entity_name not in classes:
+            raise ValueError(f"Unknown entity: {entity_name}")
+        return classes[entity_name](**attrs)
+
+    entity = decode(params.get("self"), factory)
+    class_methods, instance_methods = METHODS[cls_name]
+    if entity is None and name in class_methods:
+        target = classes[cls_name]
+    elif isinstance(entity, classes[cls_name]) and name in instance_methods:
+        target = entity
+    else:
+        raise ValueError(f"Unknown method: {method}")
+    result = getattr(target, name)(
+        *decode(params.get("args", []), factory),
+        **decode(params.get("kwargs", {}), factory),
+    )
+    response = {"result": encode(result)}
+    if entity is not None:
+        # Instance methods can change the entity, save() marks it clean
+        response["self"] = encode(entity)
+    return response
+
+
+class Daemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # Every client gets a thread, requests still take turns on the single
+    # warm connection
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: Path = SOCKET_PATH,
+        db_path: Union[Path, None] = None,
+        cached_statements: int = CACHED_STATEMENTS,
+    ) -> None:
+        from .Database import DatabaseHandler, DatabaseInstantiator, SCHEMA_VERSION
+
+        socket_path = Path(socket_path)
+        if socket_path.exists():
+            socket_path.unlink()
+        if db_path is None:
+            db_path = Path(os.path.expanduser(get_config()["DB_PATH"]))
+        super().__init__(str(socket_path), RequestHandler)
+        self.socket_path = socket_path
+        self.lock = threading.Lock()
+        # Replaces the connection setup() opened on import
+        DatabaseHandler.close()
+        DatabaseHandler.DB_CONNECTION = sqlite3.connect(
+            db_path, cached_statements=cached_statements, check_same_thread=False
+        )
+        # New files and ones from older versions are brought up to date
+        if DatabaseInstantiator.get_schema_version() < SCHEMA_VERSION:
+            DatabaseInstantiator.run()
+        logging.getLogger(__name__).info(f"DAEMON_START#'{socket_path}','{db_path}'")
+
+    def server_close(self) -> None:
+        from .Database import DatabaseHandler
+
+        super().server_close()
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        with self.lock:
+            DatabaseHandler.close()
+        logging.getLogger(__name__).info(f"DAEMON_STOP#'{self.socket_path}'")
+
+
+def main(argv: Union[list[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Serve the consumption database over a Unix socket."
+    )
+    parser.add_argument("--socket", type=Path, default=SOCKET_PATH)
+    parser.add_argument("--db", type=Path, default=None)
+    parser.add_argument("--cached-statements", type=int, default=CACHED_STATEMENTS)
+    args = parser.parse_args(argv)
+    with Daemon(args.socket, args.db, args.cached_statements) as daemon:
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
@@ -0,0 +1,129 @@
+# General Imports
+from collections.abc import Mapping, Sequence
+from typing import Union, Any
+
+# Consumption Imports
+from .Database import DatabaseHandler, EVENT_FIELDS
+from .Status import Status
+
+EVENTS_NAME = "consumable_events"
+DAY = 86400
+# Open ends of a time range, the range stays in one indexed shape
+EARLIEST = -(2**63)
+LATEST = 2**63 - 1
+
+
+def _codes(fields: Union[Sequence[str], None]) -> list[int]:
+    if fields is None:
+        return list(range(len(EVENT_FIELDS)))
+    for field in fields:
+        if field not in EVENT_FIELDS:
+            raise ValueError(f"Field has no events: {field}")
+    return [EVENT_FIELDS.index(field) for field in fields]
+
+
+def _range(start: Union[float, None], end: Union[float, None]) -> list[float]:
+    start = EARLIEST if start is None else start
+    end = LATEST if end is None else end
+    if start > end:
+        raise ValueError("Start of the range must not be after its end.")
+    return [start, end]
+
+
+def _seq_to_event(seq: Sequence[Any]) -> tuple[int, int, str, Any, Any]:
+    timestamp, consumable_id, code, old, new = seq
+    field = EVENT_FIELDS[code]
+    if field == "status":
+        old = None if old is None else Status(old)
+        new = Status(new)
+    return timestamp, consumable_id, field, old, new
+
+
+def _events_sql(
+    start: Union[float, None] = None,
+    end: Union[float, None] = None,
+    fields: Union[Sequence[str], None] = None,
+    consumable_id: Union[int, None] = None,
+) -> tuple[str, list]:
+    codes = _codes(fields)
+    where = [
+        f"field IN ({','.join('?' for _ in codes)})",
+        "timestamp >= ? AND timestamp < ?",
+    ]
+    values = codes + _range(start, end)
+    if consumable_id is not None:
+        where.insert(0, "consumable_id = ?")
+        values.insert(0, consumable_id)
+    sql = f"""SELECT timestamp, consumable_id, field, old, new FROM {EVENTS_NAME}
+            WHERE {' AND '.join(where)}
+            ORDER BY timestamp, rowid"""
+    return sql, values
+
+
+def between(
+    start: Union[float, None] = None,
+    end: Union[float, None] = None,
+    fields: Union[Sequence[str], None] = None,
+) -> Sequence[tuple[int, int, str, Any, Any]]:
+    cur = DatabaseHandler.get_db().cursor()
+    cur.execute(*_events_sql(start, end, fields))
+    return [_seq_to_event(row) for row in cur.fetchall()]
+
+
+def history(
+    consumable_id: int,
+    fields: Union[Sequence[str], None] = None,
+    start: Union[float, None] = None,
+    end: Union[float, None] = None,
+) -> Sequence[tuple[int, int, str, Any, Any]]:
+    cur = DatabaseHandler.get_db().cursor()
+    cur.execute(*_events_sql(start, end, fields, consumable_id))
+    return [_seq_to_event(row) for row in cur.fetchall()]
+
+
+def _progress_sql(
+    group: str,
+    start: Union[float, None] = None,
+    end: Union[float, None] = None,
+    consumable_id: Union[int, None] = None,
+) -> tuple[str, list]:
+    # Only parts gained count, corrections downwards are not progress
+    where = "field = ? AND timestamp >= ? AND timestamp < ?"
+    values = [EVENT_FIELDS.index("parts")] + _range(start, end)
+    if consumable_id is not None:
+        where = f"consumable_id = ? AND {where}"
+        values.insert(0, consumable_id)
+    progress = "CASE WHEN new > ifnull(old, 0) THEN timestamp END"
+    sql = f"""SELECT {group}, SUM(max(new - ifnull(old, 0), 0)),
+                MIN({progress}), MAX({progress})
+            FROM {EVENTS_NAME}
+            WHERE {where}
+            GROUP BY 1 ORDER BY 1"""
+    return sql, values
+
+
+def parts_per_day(
+    start: Union[float, None] = None,
+    end: Union[float, None] = None,
+    consumable_id: Union[int, None] = None,
+) -> Sequence[tuple[str, int]]:
+    cur = DatabaseHandler.get_db().cursor()
+    cur.execute(
+        *_progress_sql("date(timestamp, 'unixepoch')", start, end, consumable_id)
+    )
+    return [(day, parts) for day, parts, _, _ in cur.fetchall() if parts > 0]
+
+
+def pace(
+    start: Union[float, None] = None,
+    end: Union[float, None] = None,
+    consumable_id: Union[int, None] = None,
+) -> Mapping[int, float]:
+    cur = DatabaseHandler.get_db().cursor()
+    cur.execute(*_progress_sql("consumable_id", start, end, consumable_id))
+    # Parts per day between the first and last progress, at least a day
+    return {
+        consumable_id: parts / max((last - first) / DAY, 1)
+        for consumable_id, parts, first, last in cur.fetchall()
+        if parts > 0
+    }
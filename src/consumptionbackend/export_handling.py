@@ -0,0 +1,138 @@
+# General Imports
+import csv
+import json
+from collections.abc import Iterator, Mapping, Sequence
+from typing import Any, TextIO
+
+# Consumption Imports
+from .Database import DatabaseHandler
+from .Consumable import Consumable
+from .Personnel import Personnel
+from .Series import Series
+from .Status import Status
+
+EXPORT_FORMATS = ("ndjson", "csv")
+CSV_FIELDS = [
+    "id",
+    "series_id",
+    "series",
+    "name",
+    "type",
+    "status",
+    "parts",
+    "max_parts",
+    "completions",
+    "rating",
+    "start_date",
+    "end_date",
+    "tags",
+    "personnel",
+]
+
+
+class _MergeCursor:
+    # Walks rows ordered by consumable id, handing out each id's group in turn
+
+    def __init__(self, rows: Iterator[Sequence[Any]]) -> None:
+        self.rows = rows
+        self.head = next(self.rows, None)
+
+    def take(self, consumable_id: int) -> list:
+        group = []
+        # Skip mappings whose consumable no longer exists
+        while self.head is not None and self.head[0] < consumable_id:
+            self.head = next(self.rows, None)
+        while self.head is not None and self.head[0] == consumable_id:
+            group.append(self.head)
+            self.head = next(self.rows, None)
+        return group
+
+
+def _cursor(sql: str, arraysize: int) -> Iterator[Sequence[Any]]:
+    cur = DatabaseHandler.get_db().cursor()
+    cur.execute(sql)
+    while True:
+        # Explicit size, arraysize would land on an instrumentation wrapper
+        rows = cur.fetchmany(arraysize)
+        if not rows:
+            return
+        yield from rows
+
+
+def iter_library(arraysize: int = 1000) -> Iterator[Mapping[str, Any]]:
+    consumables = _cursor(
+        f"""SELECT {Consumable.DB_NAME}.*, {Series.DB_NAME}.name
+            FROM {Consumable.DB_NAME}
+            LEFT JOIN {Series.DB_NAME} ON {Series.DB_NAME}.id = {Consumable.DB_NAME}.series_id
+            ORDER BY {Consumable.DB_NAME}.id""",
+        arraysize,
+    )
+    tags = _MergeCursor(
+        _cursor(
+            f"""SELECT consumable_id, tag FROM {Consumable.DB_TAG_MAPPING_NAME}
+                ORDER BY consumable_id, tag""",
+            arraysize,
+        )
+    )
+    personnel = _MergeCursor(
+        _cursor(
+            f"""SELECT mapping.consumable_id, mapping.role, {Personnel.DB_NAME}.*
+                FROM {Consumable.DB_PERSONNEL_MAPPING_NAME} AS mapping
+                JOIN {Personnel.DB_NAME} ON {Personnel.DB_NAME}.id = mapping.personnel_id
+                ORDER BY mapping.consumable_id""",
+            arraysize,
+        )
+    )
+    for row in consumables:
+        consumable_id = row[0]
+        yield {
+            "id": consumable_id,
+            "series_id": row[1],
+            "series": row[11],
+            "name": row[2],
+            "type": row[3],
+            "status": Status(row[4]).name,
+            "parts": row[5],
+            "max_parts": row[6],
+            "completions": row[7],
+            "rating": row[8],
+            "start_date": row[9],
+            "end_date": row[10],
+            "tags": [tag[1] for tag in tags.take(consumable_id)],
+            "personnel": [
+                {
+                    "id": credit[2],
+                    "first_name": credit[3],
+                    "last_name": credit[4],
+                    "pseudonym": credit[5],
+                    "role": credit[1],
+                }
+                for credit in personnel.take(consumable_id)
+            ],
+        }
+
+
+def _csv_row(record: Mapping[str, Any]) -> Mapping[str, Any]:
+    row = dict(record)
+    row["tags"] = ";".join(record["tags"])
+    # JSON keeps which name is which, "[Author] Mononym" cannot
+    row["personnel"] = json.dumps(record["personnel"])
+    return row
+
+
+def export_library(out: TextIO, format: str = "ndjson", arraysize: int = 1000) -> int:
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {format}")
+    count = 0
+    if format == "csv":
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for record in iter_library(arraysize):
+            writer.writerow(_csv_row(record))
+            count += 1
+    else:
+        for record in iter_library(arraysize):
+            out.write(json.dumps(record))
+            out.write("\n")
+            count += 1
+    return count
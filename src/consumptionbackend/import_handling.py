@@ -0,0 +1,363 @@
+# General Imports
+from __future__ import annotations
+import csv
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from typing import Any, TextIO, Union
+
+# Consumption Imports
+from .Database import DatabaseHandler
+from .Consumable import Consumable
+from .Personnel import Personnel
+from .Series import Series
+from .Status import Status
+
+IMPORT_FORMATS = ("ndjson", "json", "csv")
+# Matches Personnel.__str__, e.g. [Author] Ursula "UKL" Le Guin
+_CREDIT = re.compile(r"^\[(?P<role>[^\]]*)\]\s*(?P<name>.*)$")
+_PSEUDONYM = re.compile(r'^(?P<first>.*?)\s*"(?P<pseudonym>[^"]*)"\s*(?P<last>.*)$')
+
+
+class ImportProgress:
+    def __init__(self) -> None:
+        self.read = 0
+        self.written = 0
+        self.errors: list[tuple[int, str]] = []
+        self.started = time.perf_counter()
+        self.finished: Union[float, None] = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+    @property
+    def throughput(self) -> float:
+        # Written consumables per second
+        return self.written / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__} | {self.written}/{self.read} written, "
+            f"{len(self.errors)} errors, {self.throughput:.0f}/s"
+        )
+
+
+def _optional(value: Any, convert: Callable[[Any], Any]) -> Any:
+    if value is None or value == "":
+        return None
+    return convert(value)
+
+
+def _parse_status(value: Any) -> Status:
+    if value is None or value == "":
+        return Status.PLANNING
+    if isinstance(value, int) or str(value).strip().isdigit():
+        return Status(int(value))
+    return Status[str(value).strip().upper().replace(" ", "_")]
+
+
+def _parse_tags(value: Any) -> list[str]:
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        value = value.split(";")
+    return sorted({tag.strip().lower() for tag in value if tag.strip()})
+
+
+def _parse_credit(credit: Any) -> tuple:
+    if isinstance(credit, Mapping):
+        return (
+            credit.get("first_name") or None,
+            credit.get("last_name") or None,
+            credit.get("pseudonym") or None,
+            credit.get("role") or None,
+        )
+    match = _CREDIT.match(credit.strip())
+    if match is None:
+        raise ValueError(f"Credit has no role: {credit}")
+    role, name = match.group("role"), match.group("name")
+    pseudonym_match = _PSEUDONYM.match(name)
+    if pseudonym_match is not None:
+        first = pseudonym_match.group("first") or None
+        last = pseudonym_match.group("last") or None
+        pseudonym = pseudonym_match.group("pseudonym") or None
+        return first, last, pseudonym, role
+    first, _, last = name.partition(" ")
+    return first or None, last or None, None, role
+
+
+def _parse_personnel(value: Any) -> list[tuple]:
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        if value.strip().startswith(("[{", "[]")):
+            # As written by the CSV export
+            value = json.loads(value)
+        else:
+            value = [credit for credit in value.split(";") if credit.strip()]
+    credits = [_parse_credit(credit) for credit in value]
+    for credit in credits:
+        if not credit[3]:
+            raise ValueError("Cannot import Personnel without assigned role.")
+    return credits
+
+
+def _parse_record(record: Mapping[str, Any]) -> tuple:
+    consumable = Consumable(
+        name=str(record.get("name") or ""),
+        type=str(record.get("type") or ""),
+        status=_parse_status(record.get("status")),
+        parts=_optional(record.get("parts"), int) or 0,
+        max_parts=_optional(record.get("max_parts"), int),
+        completions=_optional(record.get("completions"), int) or 0,
+        rating=_optional(record.get("rating"), float),
+        start_date=_optional(record.get("start_date"), float),
+        end_date=_optional(record.get("end_date"), float),
+    )
+    if not consumable.name:
+        raise ValueError("Consumable must have a name.")
+    if (
+        consumable.start_date is not None
+        and consumable.end_date is not None
+        and consumable.start_date > consumable.end_date
+    ):
+        raise ValueError("end date must be after start date")
+    series = record.get("series")
+    if series in ("", "None"):
+        series = None
+    return (
+        Consumable._consumable_to_seq(consumable)[2:],
+        series,
+        _parse_tags(record.get("tags")),
+        _parse_personnel(record.get("personnel")),
+    )
+
+
+def _parse_chunk(chunk: Sequence[tuple[int, Union[str, Mapping[str, Any]]]]) -> list:
+    # Runs in worker processes, so only plain picklable values cross over
+    parsed = []
+    for line, record in chunk:
+        try:
+            if isinstance(record, str):
+                record = json.loads(record)
+            parsed.append((line, _parse_record(record), None))
+        except (ValueError, KeyError, TypeError) as e:
+            parsed.append((line, None, f"{e.__class__.__name__}: {e}"))
+    return parsed
+
+
+def _read(
+    source: TextIO, format: str
+) -> Iterator[tuple[int, Union[str, Mapping[str, Any]]]]:
+    if format == "csv":
+        # Line 1 is the header
+        yield from enumerate(csv.DictReader(source), start=2)
+    elif format == "json":
+        yield from enumerate(json.load(source), start=1)
+    else:
+        # Decoded by the parse workers
+        for line, text in enumerate(source, start=1):
+            if text.strip():
+                yield line, text
+
+
+class _Writer(threading.Thread):
+    # The only thread that writes, batching rows into large transactions
+
+    def __init__(
+        self,
+        path: str,
+        rows: queue.Queue,
+        progress: ImportProgress,
+        batch_size: int,
+        do_log: bool,
+        on_batch: Callable[[], None],
+    ) -> None:
+        super().__init__(name="consumption-import-writer", daemon=True)
+        self.path = path
+        self.rows = rows
+        self.progress = progress
+        self.batch_size = batch_size
+        self.do_log = do_log
+        self.on_batch = on_batch
+        self.error: Union[BaseException, None] = None
+
+    def run(self) -> None:
+        db = sqlite3.connect(self.path, isolation_level=None)
+        done = False
+        try:
+            self._load_maps(db)
+            batch = []
+            while not done:
+                row = self.rows.get()
+                done = row is None
+                if not done:
+                    batch.append(row)
+                if batch and (done or len(batch) >= self.batch_size):
+                    self._write(db, batch)
+                    batch = []
+        except BaseException as e:
+            self.error = e
+            # Keep draining so the producer never blocks on a full queue
+            while not done:
+                done = self.rows.get() is None
+        finally:
+            db.close()
+
+    def _load_maps(self, db: sqlite3.Connection) -> None:
+        cur = db.cursor()
+        cur.execute(f"SELECT name, id FROM {Series.DB_NAME}")
+        self.series = {name: id for name, id in cur.fetchall()}
+        cur.execute(
+            f"SELECT first_name, last_name, pseudonym, id FROM {Personnel.DB_NAME}"
+        )
+        self.personnel = {tuple(row[:3]): row[3] for row in cur.fetchall()}
+
+    @staticmethod
+    def _next_id(cur: sqlite3.Cursor, table: str) -> int:
+        cur.execute(f"SELECT ifnull(MAX(id), 0) + 1 FROM {table}")
+        return max(1, cur.fetchone()[0])
+
+    def _write(self, db: sqlite3.Connection, batch: list) -> None:
+        cur = db.cursor()
+        # Holding the write lock makes MAX(id) + n safe to hand out
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            new_series, new_personnel = [], []
+            next_series = self._next_id(cur, Series.DB_NAME)
+            next_personnel = self._next_id(cur, Personnel.DB_NAME)
+            next_consumable = self._next_id(cur, Consumable.DB_NAME)
+            consumables, tags, credits = [], [], []
+            for values, series, consumable_tags, consumable_credits in batch:
+                series_id = -1
+                if series is not None:
+                    series_id = self.series.get(series)
+                    if series_id is None:
+                        series_id = self.series[series] = next_series
+                        new_series.append((series_id, series))
+                        next_series += 1
+                consumable_id = next_consumable
+                next_consumable += 1
+                consumables.append((consumable_id, series_id, *values))
+                tags.extend((consumable_id, tag) for tag in consumable_tags)
+                for first, last, pseudonym, role in consumable_credits:
+                    key = (first, last, pseudonym)
+                    personnel_id = self.personnel.get(key)
+                    if personnel_id is None:
+                        personnel_id = self.personnel[key] = next_personnel
+                        new_personnel.append((personnel_id, *key))
+                        next_personnel += 1
+                    credits.append((personnel_id, consumable_id, role))
+            cur.executemany(
+                f"INSERT INTO {Series.DB_NAME} (id, name) VALUES (?,?)", new_series
+            )
+            cur.executemany(
+                f"""INSERT INTO {Personnel.DB_NAME} (id, first_name, last_name, pseudonym)
+                    VALUES (?,?,?,?)""",
+                new_personnel,
+            )
+            cur.executemany(
+                f"""INSERT INTO {Consumable.DB_NAME}
+                    (id, series_id, name, type, status, parts, max_parts, completions, rating, start_date, end_date)
+                    VALUES (?,?,?,?,?,?,?,?,?,?,?)""",
+                consumables,
+            )
+            cur.executemany(
+                f"INSERT OR IGNORE INTO {Consumable.DB_TAG_MAPPING_NAME} (consumable_id, tag) VALUES (?,?)",
+                tags,
+            )
+            cur.executemany(
+                f"""INSERT OR IGNORE INTO {Consumable.DB_PERSONNEL_MAPPING_NAME}
+                    (personnel_id, consumable_id, role) VALUES (?,?,?)""",
+                credits,
+            )
+            cur.execute("COMMIT")
+        except BaseException:
+            cur.execute("ROLLBACK")
+            # Forget names that were never committed
+            self._load_maps(db)
+            raise
+        self.progress.written += len(consumables)
+        if self.do_log:
+            logger = logging.getLogger(__name__)
+            for row in consumables:
+                logger.info(
+                    f"NEW_CONSUMABLE#{Consumable._seq_to_consumable(row)._csv_str()}"
+                )
+        self.on_batch()
+
+
+def import_library(
+    source: TextIO,
+    format: str = "ndjson",
+    workers: Union[int, None] = None,
+    chunk_size: int = 1000,
+    batch_size: int = 10000,
+    progress: Union[Callable[[ImportProgress], None], None] = None,
+    do_log: bool = True,
+) -> ImportProgress:
+    if format not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format: {format}")
+    path = DatabaseHandler.get_db_path()
+    if path is None or DatabaseHandler.WORKING_COPY is not None:
+        raise RuntimeError("Bulk import requires a database served from disk.")
+    # Anything pending on the handler's connection would block the writer
+    DatabaseHandler.get_db().commit()
+
+    status = ImportProgress()
+    report = (lambda: progress(status)) if progress is not None else (lambda: None)
+    rows = queue.Queue(maxsize=batch_size * 2)
+    writer = _Writer(str(path), rows, status, batch_size, do_log, report)
+    writer.start()
+
+    def handle(parsed: list) -> None:
+        for line, row, error in parsed:
+            if error is not None:
+                status.errors.append((line, error))
+            else:
+                rows.put(row)
+
+    def chunks() -> Iterator[list]:
+        chunk = []
+        for item in _read(source, format):
+            chunk.append(item)
+            status.read += 1
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    try:
+        if workers == 0:
+            for chunk in chunks():
+                handle(_parse_chunk(chunk))
+        else:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # Bounded in-flight work keeps memory flat and order stable
+                pending = deque()
+                for chunk in chunks():
+                    pending.append(pool.submit(_parse_chunk, chunk))
+                    if len(pending) >= workers * 2:
+                        handle(pending.popleft().result())
+                while pending:
+                    handle(pending.popleft().result())
+    finally:
+        rows.put(None)
+        writer.join()
+    status.finished = time.perf_counter()
+    if writer.error is not None:
+        raise writer.error
+    report()
+    return status
@@ -0,0 +1,65 @@
+# General Imports
+import logging
+import sqlite3
+from collections.abc import Mapping
+from typing import Union
+
+# Rows sampled per index by a bounded ANALYZE, see PRAGMA analysis_limit
+ANALYSIS_LIMIT = 1000
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def _pragma(db: sqlite3.Connection, name: str) -> int:
+    cur = db.cursor()
+    cur.execute(f"PRAGMA {name}")
+    return cur.fetchone()[0]
+
+
+def enable_incremental_vacuum(db: sqlite3.Connection, vacuum: bool = False) -> bool:
+    # Only takes effect before the first table is created, existing files
+    # have to be rebuilt by VACUUM to switch modes
+    if _pragma(db, "auto_vacuum") == AUTO_VACUUM_INCREMENTAL:
+        return False
+    db.commit()
+    db.cursor().execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+    if vacuum:
+        db.cursor().execute("VACUUM")
+    return _pragma(db, "auto_vacuum") == AUTO_VACUUM_INCREMENTAL
+
+
+def maintain(
+    db: sqlite3.Connection,
+    analysis_limit: int = ANALYSIS_LIMIT,
+    vacuum_pages: Union[int, None] = None,
+    do_log: bool = True,
+) -> Mapping[str, int]:
+    db.commit()
+    cur = db.cursor()
+    page_size = _pragma(db, "page_size")
+    pages_before = _pragma(db, "page_count")
+    free_before = _pragma(db, "freelist_count")
+    if _pragma(db, "auto_vacuum") == AUTO_VACUUM_INCREMENTAL:
+        # Each step frees one page, execute() would only take the first,
+        # without an argument every free page is released
+        cur.executescript(
+            "PRAGMA incremental_vacuum"
+            + (f"({int(vacuum_pages)})" if vacuum_pages is not None else "")
+        )
+    cur.execute(f"PRAGMA analysis_limit = {int(analysis_limit)}")
+    cur.execute("ANALYZE")
+    cur.execute("PRAGMA optimize")
+    db.commit()
+    pages_after = _pragma(db, "page_count")
+    result = {
+        "pages_before": pages_before,
+        "pages_after": pages_after,
+        "free_pages_before": free_before,
+        "free_pages_after": _pragma(db, "freelist_count"),
+        "reclaimed_pages": pages_before - pages_after,
+        "reclaimed_bytes": (pages_before - pages_after) * page_size,
+    }
+    if do_log:
+        logging.getLogger(__name__).info(
+            f"MAINTENANCE#{result['reclaimed_pages']},{result['reclaimed_bytes']},{result['free_pages_after']}"
+        )
+    return result
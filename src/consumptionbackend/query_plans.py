@@ -0,0 +1,221 @@
+# General Imports
+from __future__ import annotations
+import sqlite3
+from collections.abc import Sequence, Iterable
+from typing import Any
+
+# Consumption Imports
+from .Database import DatabaseHandler
+from .Consumable import Consumable
+from .Personnel import Personnel
+from .Series import Series
+from .Status import Status
+from . import events
+
+# Tables that must never be walked in full by a generated query
+WATCHED_TABLES = (
+    Consumable.DB_NAME,
+    Consumable.DB_TAG_MAPPING_NAME,
+    Consumable.DB_PERSONNEL_MAPPING_NAME,
+    events.EVENTS_NAME,
+)
+
+# A representative value for every filter Consumable.find accepts
+SAMPLE_FILTERS = {
+    "id": 1,
+    "series_id": 1,
+    "name": "abc",
+    "type": "NOVEL",
+    "status": Status.COMPLETED,
+    "parts": 1,
+    "max_parts": 1,
+    "completions": 1,
+    "rating": 5.0,
+    "start_date": 1000.0,
+    "end_date": 2000.0,
+    "tags": ["tag_a", "tag_b"],
+}
+
+# Filters that cannot use an index and are allowed to scan consumables:
+# substring matches, and columns not worth indexing on their own.
+SCANNING_FILTERS = {
+    "name",
+    "parts",
+    "max_parts",
+    "completions",
+    "rating",
+    "start_date",
+    "end_date",
+}
+
+
+class QueryShape:
+    def __init__(
+        self,
+        name: str,
+        sql: str,
+        values: Sequence[Any],
+        allowed_scans: Iterable[str] = (),
+    ) -> None:
+        self.name = name
+        self.sql = sql
+        self.values = values
+        self.allowed_scans = set(allowed_scans)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__} | {self.name}"
+
+
+def query_shapes() -> Sequence[QueryShape]:
+    shapes = [
+        QueryShape(
+            "Consumable.find()",
+            *Consumable._find_sql(),
+            allowed_scans=[Consumable.DB_NAME],
+        )
+    ]
+    for key, value in SAMPLE_FILTERS.items():
+        allowed = [Consumable.DB_NAME] if key in SCANNING_FILTERS else []
+        shapes.append(
+            QueryShape(
+                f"Consumable.find({key})",
+                *Consumable._find_sql(**{key: value}),
+                allowed_scans=allowed,
+            )
+        )
+        shapes.append(
+            QueryShape(
+                f"Consumable.update({key})",
+                *Consumable._update_sql({key: value}, {"rating": 1.0}),
+                allowed_scans=allowed,
+            )
+        )
+        shapes.append(
+            QueryShape(
+                f"Consumable.delete({key})",
+                *Consumable._delete_sql(**{key: value}),
+                allowed_scans=allowed,
+            )
+        )
+    shapes.append(
+        QueryShape(
+            "Consumable.find(type, tags)",
+            *Consumable._find_sql(type="NOVEL", tags=["tag_a"]),
+        )
+    )
+    shapes.append(
+        QueryShape(
+            "Consumable.upsert_many",
+            Consumable._upsert_match_sql(("name", "type")),
+            ['[["abc", "NOVEL"]]'],
+        )
+    )
+    shapes.append(QueryShape("Consumable.get_tags", Consumable._get_tags_sql(), [1]))
+    shapes.append(
+        QueryShape("Consumable.get_personnel", Consumable._get_personnel_sql(), [1])
+    )
+    shapes.append(
+        QueryShape(
+            "Consumable.related",
+            *Consumable._related_sql(1, Consumable.RELATED_WEIGHTS, 10),
+        )
+    )
+    shapes.append(
+        QueryShape("Personnel.get_consumables", Personnel._get_consumables_sql(), [1])
+    )
+    shapes.append(
+        QueryShape(
+            "Personnel.aggregate()",
+            *Personnel._aggregate_sql(),
+            allowed_scans=[Consumable.DB_PERSONNEL_MAPPING_NAME],
+        )
+    )
+    shapes.append(
+        QueryShape(
+            "Personnel.aggregate(role)",
+            *Personnel._aggregate_sql(role="Author", order_by="completed", limit=10),
+        )
+    )
+    shapes.append(
+        QueryShape(
+            "Personnel.get_role_stats",
+            *Personnel._aggregate_sql(personnel_id=1, by_role=True),
+        )
+    )
+    shapes.append(
+        QueryShape("events.between", *events._events_sql(1000, 2000, ["parts"]))
+    )
+    shapes.append(QueryShape("events.history", *events._events_sql(consumable_id=1)))
+    shapes.append(
+        QueryShape(
+            "events.parts_per_day",
+            *events._progress_sql("date(timestamp, 'unixepoch')", 1000, 2000),
+        )
+    )
+    shapes.append(
+        QueryShape(
+            "events.pace(consumable_id)",
+            *events._progress_sql("consumable_id", consumable_id=1),
+        )
+    )
+    return shapes
+
+
+def explain(db: sqlite3.Connection, shape: QueryShape) -> Sequence[str]:
+    cur = db.cursor()
+    cur.execute(f"EXPLAIN QUERY PLAN {shape.sql}", shape.values)
+    return [row[3] for row in cur.fetchall()]
+
+
+def full_scans(plan: Sequence[str]) -> set[str]:
+    scanned = set()
+    for detail in plan:
+        words = detail.split()
+        # e.g. "SCAN consumables" or "SCAN consumable_tags USING COVERING INDEX ..."
+        if len(words) >= 2 and words[0] == "SCAN" and words[1] in WATCHED_TABLES:
+            scanned.add(words[1])
+    return scanned
+
+
+def check_query_plans(db: sqlite3.Connection = None) -> Sequence[str]:
+    if db is None:
+        db = DatabaseHandler.get_db()
+    violations = []
+    for shape in query_shapes():
+        plan = explain(db, shape)
+        for table in sorted(full_scans(plan) - shape.allowed_scans):
+            violations.append(f"{shape.name} scans {table}: {' | '.join(plan)}")
+    return violations
+
+
+def seed(db: sqlite3.Connection, consumables: int = 200) -> None:
+    # Enough rows that the planner prefers indexes the way it would in use
+    cur = db.cursor()
+    cur.executemany(
+        f"INSERT INTO {Series.DB_NAME} (name) VALUES (?)",
+        [(f"series {i}",) for i in range(consumables // 10)],
+    )
+    cur.executemany(
+        f"INSERT INTO {Personnel.DB_NAME} (first_name, last_name) VALUES (?,?)",
+        [(f"first {i}", f"last {i}") for i in range(consumables // 5)],
+    )
+    cur.executemany(
+        f"""INSERT INTO {Consumable.DB_NAME} (series_id, name, type, status, parts)
+            VALUES (?,?,?,?,?)""",
+        [
+            (i % 20, f"consumable {i}", ("NOVEL", "TV", "FILM")[i % 3], i % 5, i)
+            for i in range(consumables)
+        ],
+    )
+    cur.execute(f"SELECT id FROM {Consumable.DB_NAME}")
+    ids = [row[0] for row in cur.fetchall()]
+    cur.executemany(
+        f"INSERT OR IGNORE INTO {Consumable.DB_TAG_MAPPING_NAME} (consumable_id, tag) VALUES (?,?)",
+        [(id, f"tag_{id % 7}") for id in ids] + [(id, "tag_a") for id in ids[::9]],
+    )
+    cur.executemany(
+        f"""INSERT OR IGNORE INTO {Consumable.DB_PERSONNEL_MAPPING_NAME}
+            (personnel_id, consumable_id, role) VALUES (?,?,?)""",
+        [(id % (consumables // 5) + 1, id, "Author") for id in ids],
+    )
+    db.commit()
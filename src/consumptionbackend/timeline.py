@@ -0,0 +1,104 @@
+# General Imports
+from collections.abc import Mapping, Sequence
+from typing import Union
+
+# Consumption Imports
+from .Database import DatabaseHandler
+from .Consumable import Consumable
+from .Status import Status
+
+BUCKETS_NAME = "timeline_buckets"
+DIRTY_NAME = "timeline_dirty"
+PERIODS = {"month": "bucket", "year": "substr(bucket, 1, 4)"}
+
+
+def refresh(full: bool = False) -> int:
+    cur = DatabaseHandler.get_db().cursor()
+    if full:
+        cur.execute(
+            f"""INSERT OR IGNORE INTO {DIRTY_NAME}
+                SELECT DISTINCT strftime('%Y-%m', end_date, 'unixepoch')
+                FROM {Consumable.DB_NAME} WHERE end_date IS NOT NULL
+                UNION SELECT bucket FROM {BUCKETS_NAME}"""
+        )
+    cur.execute(f"SELECT COUNT(*) FROM {DIRTY_NAME}")
+    dirty = cur.fetchone()[0]
+    if dirty == 0:
+        return 0
+    cur.execute(
+        f"DELETE FROM {BUCKETS_NAME} WHERE bucket IN (SELECT bucket FROM {DIRTY_NAME})"
+    )
+    # Each dirty month is a range lookup on the end_date index, the unary +
+    # keeps the planner from preferring the much wider status index
+    cur.execute(
+        f"""INSERT INTO {BUCKETS_NAME}
+                (bucket, type, completions, rating_sum, rating_count, days_sum, days_count)
+            SELECT dirty.bucket, upper(c.type), COUNT(*),
+                ifnull(SUM(c.rating), 0), COUNT(c.rating),
+                ifnull(SUM(c.end_date - c.start_date), 0) / 86400.0, COUNT(c.start_date)
+            FROM {DIRTY_NAME} AS dirty
+            JOIN {Consumable.DB_NAME} AS c
+                ON c.end_date >= CAST(strftime('%s', dirty.bucket || '-01') AS REAL)
+                AND c.end_date < CAST(strftime('%s', dirty.bucket || '-01', '+1 month') AS REAL)
+            WHERE +c.status = {Status.COMPLETED.value}
+            GROUP BY dirty.bucket, upper(c.type)"""
+    )
+    cur.execute(f"DELETE FROM {DIRTY_NAME}")
+    DatabaseHandler.get_db().commit()
+    return dirty
+
+
+def _type_filter(type: Union[str, None]) -> tuple[str, list]:
+    if type is None:
+        return "true", []
+    return "type = upper(?)", [type]
+
+
+def completions(
+    period: str = "month", type: Union[str, None] = None
+) -> Sequence[tuple[str, int]]:
+    if period not in PERIODS:
+        raise ValueError(f"Unsupported timeline period: {period}")
+    refresh()
+    where, values = _type_filter(type)
+    cur = DatabaseHandler.get_db().cursor()
+    cur.execute(
+        f"""SELECT {PERIODS[period]}, SUM(completions) FROM {BUCKETS_NAME}
+            WHERE {where} GROUP BY 1 ORDER BY 1""",
+        values,
+    )
+    return cur.fetchall()
+
+
+def average_days_to_finish() -> Mapping[str, float]:
+    refresh()
+    cur = DatabaseHandler.get_db().cursor()
+    cur.execute(
+        f"""SELECT type, SUM(days_sum) / SUM(days_count) FROM {BUCKETS_NAME}
+            GROUP BY type HAVING SUM(days_count) > 0 ORDER BY type"""
+    )
+    return dict(cur.fetchall())
+
+
+def rolling_rating(
+    months: int = 12, type: Union[str, None] = None
+) -> Sequence[tuple[str, float]]:
+    if months < 1:
+        raise ValueError("Rolling window must cover at least one month.")
+    refresh()
+    where, values = _type_filter(type)
+    cur = DatabaseHandler.get_db().cursor()
+    # RANGE over a month number so gaps without completions still count
+    cur.execute(
+        f"""SELECT bucket, SUM(rating_sum) OVER recent / SUM(rating_count) OVER recent
+            FROM (
+                SELECT bucket,
+                    CAST(substr(bucket, 1, 4) AS INTEGER) * 12 + CAST(substr(bucket, 6, 2) AS INTEGER) AS month,
+                    SUM(rating_sum) AS rating_sum, SUM(rating_count) AS rating_count
+                FROM {BUCKETS_NAME} WHERE {where} GROUP BY bucket
+            )
+            WINDOW recent AS (ORDER BY month RANGE BETWEEN {int(months) - 1} PRECEDING AND CURRENT ROW)
+            ORDER BY bucket""",
+        values,
+    )
+    return [(bucket, rating) for bucket, rating in cur.fetchall() if rating is not None]
@@ -1,5 +1,5 @@
 from .config_handling import get_config, write_config
-from .Database import DatabaseInstantiator, DatabaseHandler
+from .Database import DatabaseInstantiator, DatabaseHandler, SCHEMA_VERSION
 
 
 def update():
@@ -30,3 +30,9 @@ def update():
             DROP TABLE staff;
         """
         cur.executescript(script2)
+
+    # Bring tables, triggers and indexes up to the current schema
+    # Existing files keep their vacuum mode, switching rebuilds the whole file,
+    # see DatabaseHandler.enable_incremental_vacuum
+    if DatabaseInstantiator.get_schema_version() < SCHEMA_VERSION:
+        DatabaseInstantiator.run()
@@ -0,0 +1,182 @@
+from consumptionbackend.Personnel import Personnel
+from consumptionbackend.Series import Series
+from consumptionbackend.Consumable import Consumable
+from consumptionbackend.Database import DatabaseHandler, DatabaseInstantiator
+from consumptionbackend.Backend import MemoryBackend, AllOf, TABLES
+from consumptionbackend import events
+from consumptionbackend.Status import Status
+import random
+import sqlite3
+import time
+import unittest
+
+db = sqlite3.connect("testdb.db")
+DatabaseHandler.DB_CONNECTION = db
+
+
+class TestBackend(unittest.TestCase):
+    def setUp(self) -> None:
+        DatabaseHandler.DB_CONNECTION = db
+        DatabaseHandler.use_backend(None)
+        DatabaseInstantiator.run()
+
+    def tearDown(self) -> None:
+        DatabaseHandler.use_backend(None)
+        db = sqlite3.connect("testdb.db")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_NAME}")
+        db.cursor().execute(
+            f"DROP TABLE IF EXISTS {Consumable.DB_PERSONNEL_MAPPING_NAME}"
+        )
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_TAG_MAPPING_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_STATS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_TRIGRAMS_NAME}")
+
+    def _library(self) -> dict:
+        # The same calls on whichever backend is in use, returning what the
+        # entity API then reads back
+        series = Series.new(name="Earthsea")
+        author = Personnel.new(first_name="Ursula", last_name="Le Guin")
+        author.role = "Author"
+        books = [
+            Consumable.new(name="Wizard", type="novel", series_id=series.id),
+            Consumable.new(name="Tombs", type="Novel", status=Status.IN_PROGRESS),
+            Consumable.new(name="Shore", type="NOVEL", status=Status.COMPLETED),
+            Consumable.new(name="Tehanu", type="Novella", parts=2, max_parts=5),
+        ]
+        for book in books[:3]:
+            book.add_personnel(author)
+            book.add_tag("Fantasy")
+        books[0].add_tag("classic")
+        books[1].set_series(series)
+        books[3].rating = 7.5
+        books[3].save()
+        Consumable.update({"name": "tehanu"}, {"status": Status.COMPLETED})
+        Consumable.delete(name="shore")
+        books[2].remove_tag("fantasy")
+        return {
+            "novels": [c.name for c in Consumable.find(type="novel")],
+            "tagged": [c.name for c in Consumable.find(tags=["fantasy"])],
+            "both": [c.name for c in Consumable.find(tags=["fantasy", "classic"])],
+            "series": [c.name for c in series.get_consumables()],
+            "credits": [c.name for c in author.get_consumables()],
+            "personnel": [(p.last_name, p.role) for p in books[0].get_personnel()],
+            "people": [p.first_name for p in Personnel.find(last_name="guin")],
+            "tags": sorted(books[0].get_tags()),
+            "tehanu": Consumable.find(id=books[3].id)[0]._csv_str(),
+            "series_names": [s.name for s in Series.find()],
+        }
+
+    def test_parity(self):
+        on_sqlite = self._library()
+        DatabaseHandler.use_backend(MemoryBackend())
+        on_memory = self._library()
+        self.assertEqual(on_memory.pop("tehanu")[:-1], on_sqlite.pop("tehanu")[:-1])
+        self.assertEqual(on_memory, on_sqlite)
+        self.assertEqual(on_memory["both"], ["Wizard"])
+
+    def test_triggers(self):
+        # Random inserts and updates through both backends end in the same rows
+        rng = random.Random(7)
+        memory = MemoryBackend()
+        sqlite_backend = DatabaseHandler.get_backend()
+        now = time.time()
+
+        def row() -> dict:
+            return {
+                "name": "c",
+                "type": "T",
+                "status": rng.choice(list(Status)).value,
+                "parts": rng.choice([0, 0, 3]),
+                "max_parts": rng.choice([None, None, 5]),
+                "completions": rng.choice([0, 2]),
+                "start_date": rng.choice([None, now - 100, now + 10**6]),
+                "end_date": rng.choice([None, now - 10]),
+            }
+
+        for _ in range(200):
+            values = row()
+            outcomes = []
+            for backend in (sqlite_backend, memory):
+                try:
+                    outcomes.append(backend.insert(Consumable.DB_NAME, values))
+                except sqlite3.IntegrityError:
+                    outcomes.append("error")
+            self.assertEqual(outcomes[0], outcomes[1])
+        for _ in range(50):
+            changes = {key: value for key, value in row().items() if rng.random() < 0.3}
+            if len(changes) == 0:
+                continue
+            where = {"status": rng.choice(list(Status)).value}
+            outcomes = []
+            for backend in (sqlite_backend, memory):
+                try:
+                    outcomes.append(backend.update(Consumable.DB_NAME, where, changes))
+                except sqlite3.IntegrityError:
+                    outcomes.append("error")
+            self.assertEqual(outcomes[0], outcomes[1])
+
+        def normal(rows: list) -> list:
+            # Trigger-filled dates are the clock at the time, within a second
+            return [
+                tuple(round(v, -1) if isinstance(v, float) else v for v in row)
+                for row in rows
+            ]
+
+        self.assertEqual(
+            normal(memory.select(Consumable.DB_NAME)),
+            normal(sqlite_backend.select(Consumable.DB_NAME)),
+        )
+
+    def test_memory(self):
+        DatabaseHandler.use_backend(MemoryBackend())
+        self.assertRaises(RuntimeError, DatabaseHandler.get_db)
+        # Features kept by SQLite triggers refuse rather than go stale
+        self.assertRaises(RuntimeError, Series.find, with_stats=True)
+        self.assertRaises(RuntimeError, Series.fuzzy_find, "Earthsea")
+        self.assertRaises(RuntimeError, Personnel.fuzzy_find, "Le Guin")
+        self.assertRaises(RuntimeError, events.between)
+        self.assertRaises(RuntimeError, events.history, 1)
+        self.assertRaises(RuntimeError, events.pace)
+        self.assertRaises(RuntimeError, DatabaseHandler.generations)
+        self.assertRaises(RuntimeError, DatabaseHandler.check_for_changes)
+        self.assertRaises(RuntimeError, DatabaseHandler.subscribe, print)
+        self.assertRaises(RuntimeError, AllOf("t", "k", "v", [1]).test, 1)
+        self.assertRaises(sqlite3.IntegrityError, Series.delete, id=-1)
+        self.assertRaises(
+            sqlite3.IntegrityError,
+            Consumable.new,
+            name="a",
+            type="b",
+            start_date=2.0,
+            end_date=1.0,
+        )
+        self.assertEqual(Consumable.find(), [])
+        backend = DatabaseHandler.get_backend()
+        for i in range(100):
+            Consumable.new(name=str(i), type="even" if i % 2 == 0 else "odd")
+        odd = backend.indexes[Consumable.DB_NAME]["type"]["ODD"]
+        self.assertEqual(len(odd), 50)
+        Consumable.update({"type": "odd"}, {"type": "Even"})
+        self.assertNotIn("ODD", backend.indexes[Consumable.DB_NAME]["type"])
+        self.assertEqual(len(Consumable.find(type="EVEN")), 100)
+        self.assertEqual(
+            len(backend.select(Consumable.DB_NAME, {"name": "9"})),
+            1,
+        )
+        self.assertEqual(len(TABLES[Consumable.DB_NAME]), 11)
+        # Tags are unique per consumable like the primary key
+        consumable = Consumable.find(name="42")[0]
+        consumable.add_tag("x")
+        self.assertRaises(
+            sqlite3.IntegrityError,
+            backend.insert,
+            Consumable.DB_TAG_MAPPING_NAME,
+            {"consumable_id": consumable.id, "tag": "x"},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
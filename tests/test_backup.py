@@ -0,0 +1,57 @@
+from consumptionbackend.Personnel import Personnel
+from consumptionbackend.Series import Series
+from consumptionbackend.Consumable import Consumable
+from consumptionbackend.Database import DatabaseHandler, DatabaseInstantiator
+from consumptionbackend.backup_handling import backup, list_backups, quick_check
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+db = sqlite3.connect("testdb.db")
+DatabaseHandler.DB_CONNECTION = db
+
+
+class TestBackup(unittest.TestCase):
+    def setUp(self) -> None:
+        DatabaseHandler.DB_CONNECTION = db
+        DatabaseInstantiator.run()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+        db = sqlite3.connect("testdb.db")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_NAME}")
+        db.cursor().execute(
+            f"DROP TABLE IF EXISTS {Consumable.DB_PERSONNEL_MAPPING_NAME}"
+        )
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_STATS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_TRIGRAMS_NAME}")
+
+    def test_backup(self):
+        for i in range(20):
+            Consumable.new(name=f"Book {i}", type="Novel")
+        steps = []
+        path = backup(
+            Path(self.directory.name),
+            pages=1,
+            progress=lambda status, remaining, total: steps.append(remaining),
+        )
+        self.assertTrue(path.is_file())
+        self.assertGreater(len(steps), 1)
+        self.assertEqual(steps[-1], 0)
+        self.assertEqual(quick_check(path), ["ok"])
+        copy = sqlite3.connect(path)
+        cur = copy.cursor()
+        cur.execute(f"SELECT COUNT(*) FROM {Consumable.DB_NAME}")
+        self.assertEqual(cur.fetchone()[0], 20)
+        copy.close()
+
+    def test_rotation(self):
+        Consumable.new(name="Book", type="Novel")
+        paths = [backup(Path(self.directory.name), keep=2) for _ in range(4)]
+        self.assertEqual(list(list_backups(Path(self.directory.name))), paths[-2:])
+        self.assertRaises(ValueError, backup, Path(self.directory.name), keep=0)
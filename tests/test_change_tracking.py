@@ -0,0 +1,64 @@
+from consumptionbackend.Personnel import Personnel
+from consumptionbackend.Series import Series
+from consumptionbackend.Consumable import Consumable
+from consumptionbackend.Database import DatabaseHandler, DatabaseInstantiator
+from consumptionbackend.ChangeTracker import ChangeTracker
+import sqlite3
+import unittest
+
+db = sqlite3.connect("testdb.db")
+DatabaseHandler.DB_CONNECTION = db
+
+
+class TestChangeTracking(unittest.TestCase):
+    def setUp(self) -> None:
+        DatabaseHandler.DB_CONNECTION = db
+        DatabaseInstantiator.run()
+        DatabaseHandler.check_for_changes()
+
+    def tearDown(self) -> None:
+        db = sqlite3.connect("testdb.db")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_NAME}")
+        db.cursor().execute(
+            f"DROP TABLE IF EXISTS {Consumable.DB_PERSONNEL_MAPPING_NAME}"
+        )
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_TAG_MAPPING_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_STATS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {ChangeTracker.GENERATIONS_NAME}")
+
+    def test_local_changes(self):
+        notified = []
+        DatabaseHandler.subscribe(notified.append, [Series.DB_NAME])
+        try:
+            self.assertEqual(DatabaseHandler.check_for_changes(), set())
+            consumable = Consumable.new(name="tracked", type="Novel")
+            consumable.add_tag("tag")
+            self.assertEqual(
+                DatabaseHandler.check_for_changes(),
+                {Consumable.DB_NAME, Consumable.DB_TAG_MAPPING_NAME},
+            )
+            self.assertEqual(notified, [])
+            Series.new(name="tracked")
+            DatabaseHandler.check_for_changes()
+            self.assertEqual(notified, [{Series.DB_NAME}])
+        finally:
+            DatabaseHandler.unsubscribe(notified.append)
+
+    def test_external_changes(self):
+        version = DatabaseHandler.data_version()
+        other = sqlite3.connect("testdb.db")
+        other.cursor().execute(
+            f"INSERT INTO {Personnel.DB_NAME} (first_name) VALUES ('external')"
+        )
+        other.commit()
+        other.close()
+        self.assertNotEqual(DatabaseHandler.data_version(), version)
+        self.assertEqual(DatabaseHandler.check_for_changes(), {Personnel.DB_NAME})
+
+
+if __name__ == "__main__":
+    unittest.main()
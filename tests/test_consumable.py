@@ -2,6 +2,8 @@ from consumptionbackend.Personnel import Personnel
 from consumptionbackend.Series import Series
 from consumptionbackend.Consumable import Consumable
 from consumptionbackend.Database import DatabaseHandler, DatabaseInstantiator
+from consumptionbackend.Status import Status
+import math
 import sqlite3
 import unittest
 
@@ -19,8 +21,12 @@ class TestConsumable(unittest.TestCase):
         db.cursor().execute(
             f"DROP TABLE IF EXISTS {Consumable.DB_PERSONNEL_MAPPING_NAME}"
         )
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_TAG_MAPPING_NAME}")
         db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_NAME}")
         db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_STATS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_TRIGRAMS_NAME}")
 
     def test_new(self):
         d = {
@@ -88,6 +94,290 @@ class TestConsumable(unittest.TestCase):
         verify = Consumable.find(name="JKL")
         self.assertEqual(len(verify), 0)
 
+    def test_tags(self):
+        d = {"name": "MNO", "type": "Novel"}
+        tagged = [Consumable.new(**d), Consumable.new(**d)]
+        for consumable in tagged:
+            consumable.add_tag("Test_Tags")
+            consumable.add_tag("other")
+        tagged[1].add_tag("extra")
+        Consumable.new(**d).add_tag("other")
+        found = Consumable.find(tags=["test_tags", "other"])
+        self.assertEqual({c.id for c in found}, {c.id for c in tagged})
+        Consumable.update({"tags": ["extra"]}, {"parts": 3})
+        self.assertEqual(Consumable.find(id=tagged[1].id)[0].parts, 3)
+        self.assertEqual(Consumable.find(id=tagged[0].id)[0].parts, 0)
+        Consumable.delete(tags=["test_tags"])
+        self.assertEqual(len(Consumable.find(name="MNO")), 1)
+
+    def test_columns(self):
+        Consumable.new(name="PQR", type="Novel", status=4, parts=3, rating=8.5)
+        Consumable.new(name="PQR", type="Novel", status=1, parts=1)
+        Consumable.new(name="STU", type="Film", status=0, rating=2.0)
+        columns = Consumable.columns(
+            ["status", "parts", "rating"], as_numpy=False, name="PQR"
+        )
+        self.assertEqual(list(columns["status"]), [4, 1])
+        self.assertEqual(list(columns["parts"]), [3, 1])
+        self.assertEqual(columns["rating"][0], 8.5)
+        self.assertTrue(math.isnan(columns["rating"][1]))
+        with self.assertRaises(ValueError):
+            Consumable.columns(["name"])
+
+    def test_save(self):
+        consumable = Consumable.find(
+            id=Consumable.new(name="VWX", type="Novel", parts=2).id
+        )[0]
+        self.assertFalse(consumable.is_dirty())
+        self.assertFalse(consumable.save())
+        consumable.parts = 5
+        consumable.status = 4
+        self.assertEqual(consumable.dirty_fields(), ("status", "parts"))
+        self.assertTrue(consumable.save())
+        self.assertFalse(consumable.is_dirty())
+        verify = Consumable.find(id=consumable.id)[0]
+        self.assertTrue(verify._precise_eq(consumable))
+        self.assertEqual(verify.completions, 1)
+        consumable.name = "Other"
+        consumable.name = "VWX"
+        self.assertFalse(consumable.is_dirty())
+
+    def test_flush(self):
+        consumables = [Consumable.new(name=name, type="Film") for name in "ABC"]
+        series = Series.new(name="YZ")
+        consumables[0].rating = 3.0
+        consumables[1].rating = 4.0
+        consumables[2].name = "D"
+        series.name = "YZ2"
+        self.assertEqual(DatabaseHandler.flush(), 4)
+        self.assertEqual(DatabaseHandler.flush(), 0)
+        self.assertEqual(Consumable.find(id=consumables[1].id)[0].rating, 4.0)
+        self.assertEqual(Consumable.find(id=consumables[2].id)[0].name, "D")
+        self.assertEqual(Series.find(id=series.id)[0].name, "YZ2")
+        with self.assertRaises(ValueError):
+            Consumable(name="New").save()
+
+    def test_flush_unsaved(self):
+        stored = Consumable.new(name="Stored", type="Film")
+        unsaved = Consumable(name="Unsaved", type="Film")
+        unsaved.rating = 2.0
+        stored.rating = 5.0
+        # Entities never stored are left for new(), the rest still flush
+        self.assertEqual(DatabaseHandler.flush(), 1)
+        self.assertEqual(Consumable.find(id=stored.id)[0].rating, 5.0)
+        self.assertEqual(len(Consumable.find(name="Unsaved")), 0)
+        with self.assertRaises(ValueError):
+            DatabaseHandler.flush([unsaved])
+
+    def test_upsert_many(self):
+        existing = Consumable.new(name="Dune", type="Novel", parts=1, rating=6.0)
+        upserted = Consumable.upsert_many(
+            [
+                {"name": "Dune", "type": "novel", "parts": 3},
+                {"name": "Dune", "type": "Film", "status": 4},
+                {"name": "Emma", "type": "Novel"},
+            ],
+            chunk_size=2,
+        )
+        self.assertEqual(len(upserted), 3)
+        self.assertEqual(len(Consumable.find()), 3)
+        updated = Consumable.find(id=existing.id)[0]
+        self.assertEqual(updated.parts, 3)
+        self.assertEqual(updated.rating, 6.0)
+        film = [c for c in upserted if c.type == "FILM"][0]
+        self.assertEqual(Consumable.find(id=film.id)[0].completions, 1)
+        with self.assertRaises(ValueError):
+            Consumable.upsert_many([{"name": "Emma", "tags": ["a"]}])
+        # Dune exists as both a Novel and a Film
+        with self.assertRaises(ValueError):
+            Consumable.upsert_many([{"name": "Dune"}], key=("name",))
+        repeated = Consumable.upsert_many(
+            [
+                {"name": "Persuasion", "type": "Novel", "parts": 1},
+                {"name": "Persuasion", "type": "NOVEL", "rating": 9.0},
+            ]
+        )
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual((repeated[0].parts, repeated[0].rating), (1, 9.0))
+        # Upserting leaves no unique index behind for new() to trip on
+        Consumable.new(name="Emma", type="Novel")
+        self.assertEqual(len(Consumable.find(name="Emma")), 2)
+
+    def test_upsert_existing(self):
+        series = Series.new(name="Austen")
+        existing = Consumable.new(name="Emma", type="Novel", series_id=series.id)
+        upserted = Consumable.upsert_many(
+            [
+                {
+                    "name": "Emma",
+                    "type": "Novel",
+                    "rating": 8.0,
+                    "status": Status.COMPLETED,
+                }
+            ]
+        )
+        self.assertEqual([c.id for c in upserted], [existing.id])
+        updated = Consumable.find(id=existing.id)[0]
+        self.assertEqual((updated.rating, updated.status), (8.0, Status.COMPLETED))
+        self.assertEqual(updated.series_id, series.id)
+        upserted = Consumable.upsert_many(
+            [{"name": "Emma", "type": "Novel", "series_id": -1}]
+        )
+        self.assertEqual(Consumable.find(id=existing.id)[0].series_id, -1)
+
+    def test_upsert_transaction(self):
+        existing = Consumable.new(name="Emma", type="Novel")
+        db = DatabaseHandler.get_db()
+        db.execute("BEGIN")
+        Consumable.upsert_many([{"name": "Emma", "type": "Novel", "parts": 2}])
+        self.assertTrue(db.in_transaction)
+        # A failing upsert leaves the caller's earlier work to the caller
+        db.execute("INSERT INTO consumables (name, type) VALUES ('Emma', 'NOVEL')")
+        with self.assertRaises(ValueError):
+            Consumable.upsert_many([{"name": "Emma", "type": "Novel", "parts": 3}])
+        self.assertTrue(db.in_transaction)
+        db.rollback()
+        self.assertEqual(Consumable.find(id=existing.id)[0].parts, 0)
+
+    def test_related(self):
+        series = Series.new(name="Related")
+        author = Personnel.new(first_name="Related", last_name="Author")
+        base = Consumable.new(name="Base", type="Novel", series_id=series.id)
+        sequel = Consumable.new(name="Sequel", type="Novel", series_id=series.id)
+        credited = Consumable.new(name="Credited", type="Novel")
+        tagged = Consumable.new(name="Tagged", type="Novel")
+        Consumable.new(name="Unrelated", type="Novel")
+        for consumable in [base, credited]:
+            author.role = "Author"
+            consumable.add_personnel(author)
+            author.role = "Editor"
+            consumable.add_personnel(author)
+        for consumable in [base, sequel, tagged]:
+            consumable.add_tag("fantasy")
+        related = base.related()
+        self.assertEqual(
+            [(c.id, score) for c, score in related],
+            [(sequel.id, 3.0), (credited.id, 3.0), (tagged.id, 1.0)],
+        )
+        self.assertEqual(
+            base.related(limit=1, weights={"series": 0.0})[0][0].id, credited.id
+        )
+        with self.assertRaises(ValueError):
+            base.related(weights={"rating": 1.0})
+
+    def test_by_ids(self):
+        # More ids than SQLite allows bound parameters, seeded in one transaction
+        db.executemany(
+            f"INSERT INTO {Consumable.DB_NAME} (name, type) VALUES (?, 'NOVEL')",
+            [(f"Id{i}",) for i in range(40000)],
+        )
+        db.commit()
+        ids = [c.id for c in Consumable.find()]
+        wanted = [ids[-1], ids[0], 0, ids[5], ids[0]]
+        found = Consumable.find_by_ids(wanted)
+        self.assertEqual([c.id for c in found], [ids[-1], ids[0], ids[5]])
+        self.assertEqual(len(Consumable.find_by_ids(ids)), len(ids))
+        updated = Consumable.update_by_ids(reversed(ids[:3]), {"type": "film"})
+        self.assertEqual([c.id for c in updated], list(reversed(ids[:3])))
+        self.assertTrue(all(c.type == "FILM" for c in updated))
+        self.assertEqual(Consumable.find(id=ids[3])[0].type, "NOVEL")
+        self.assertTrue(Consumable.delete_by_ids(ids[1:]))
+        self.assertEqual([c.id for c in Consumable.find()], ids[:1])
+        with self.assertRaises(ValueError):
+            Consumable.update_by_ids(ids, {"tags": ["a"]})
+
+    def test_increments(self):
+        cons = Consumable.new(name="Increment", type="Novel", max_parts=3)
+        self.assertEqual(cons.increment_parts(2).parts, 2)
+        self.assertEqual(cons.increment_parts(5).parts, 3)
+        self.assertEqual(cons.increment_parts(-10).parts, 0)
+        self.assertEqual(cons.increment_completions().completions, 1)
+
+        started = cons.advance()
+        self.assertEqual(started.status, Status.IN_PROGRESS)
+        self.assertEqual(started.parts, 1)
+        self.assertIsNotNone(started.start_date)
+        finished = cons.advance(5)
+        self.assertEqual(finished.status, Status.COMPLETED)
+        self.assertEqual(finished.parts, 3)
+        self.assertIsNotNone(finished.end_date)
+        # RETURNING already holds what the triggers would have set
+        self.assertTrue(Consumable.find(id=cons.id)[0]._precise_eq(finished))
+
+        other = Consumable.new(name="Other", type="Novel")
+        dropped = other.advance(0, status=Status.COMPLETED)
+        self.assertEqual(
+            (dropped.parts, dropped.max_parts, dropped.completions), (1, 1, 1)
+        )
+        self.assertTrue(Consumable.find(id=other.id)[0]._precise_eq(dropped))
+
+        # Repeated ids in one batch are summed
+        third = Consumable.new(name="Third", type="Novel")
+        batch = Consumable.increment_many([(third.id, 2), (cons.id, -1), (third.id, 3)])
+        self.assertEqual(
+            [(c.id, c.parts) for c in batch], [(third.id, 5), (cons.id, 2)]
+        )
+        self.assertEqual(
+            [c.status for c in Consumable.advance_many({third.id: 1})],
+            [Status.IN_PROGRESS],
+        )
+        self.assertRaises(ValueError, Consumable.increment_many, [])
+        self.assertRaises(
+            ValueError, Consumable.increment_many, {third.id: 1}, "rating"
+        )
+        self.assertRaises(
+            ValueError, Consumable(name="New", type="Novel").increment_parts
+        )
+
+    def test_chunked(self):
+        db.executemany(
+            f"INSERT INTO {Consumable.DB_NAME} (name, type) VALUES (?, ?)",
+            [(f"Chunk {i}", "Manga" if i % 2 else "Novel") for i in range(2500)],
+        )
+        db.commit()
+        with self.assertLogs("consumptionbackend.Consumable") as logs:
+            count = Consumable.update_chunked(
+                {"type": "Manga"}, {"type": "Comic"}, chunk_size=300
+            )
+        self.assertEqual(count, 1250)
+        self.assertEqual(len(logs.output), 1250)
+        self.assertTrue(
+            logs.output[0].split("#")[1].endswith("'MANGA',0,0,None,0,None,None,None")
+        )
+        self.assertEqual(len(Consumable.find(type="Comic")), 1250)
+        self.assertEqual(Consumable.find(type="Manga"), [])
+
+        # Applied in full before returning, one list per batch
+        batches = Consumable.iter_update(
+            {"type": "Novel"}, {"parts": 2}, chunk_size=100, do_log=False
+        )
+        self.assertEqual([len(batch) for batch in batches], [100] * 12 + [50])
+        self.assertEqual(batches[0][0].parts, 2)
+        connection = DatabaseHandler.DB_CONNECTION
+        self.assertFalse(connection.in_transaction)
+        self.assertEqual(len(Consumable.find(type="Novel", parts=2)), 1250)
+
+        deleted = Consumable.iter_delete(chunk_size=400, do_log=False, type="Comic")
+        self.assertEqual(sum(len(batch) for batch in deleted), 1250)
+        self.assertEqual(deleted[0][0].type, "COMIC")
+        # A transaction the caller opened is left for them to finish
+        connection.execute("BEGIN")
+        self.assertEqual(
+            Consumable.update_chunked({"name": "Chunk"}, {"parts": 3}, 500, False),
+            1250,
+        )
+        self.assertTrue(connection.in_transaction)
+        connection.rollback()
+        self.assertEqual(len(Consumable.find(parts=2)), 1250)
+        self.assertEqual(
+            Consumable.delete_chunked(chunk_size=7, do_log=False, name="Chunk"), 1250
+        )
+        self.assertEqual(Consumable.find(), [])
+
+        self.assertRaises(ValueError, Consumable.iter_update, {}, {}, 10)
+        self.assertRaises(ValueError, Consumable.iter_update, {}, {"tags": ["a"]}, 10)
+        self.assertRaises(ValueError, Consumable.delete_chunked, chunk_size=0)
+
 
 if __name__ == "__main__":
     unittest.main()
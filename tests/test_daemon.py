@@ -0,0 +1,132 @@
+from consumptionbackend.Personnel import Personnel
+from consumptionbackend.Series import Series
+from consumptionbackend.Consumable import Consumable
+from consumptionbackend.Database import (
+    DatabaseHandler,
+    DatabaseInstantiator,
+    SCHEMA_VERSION,
+)
+from consumptionbackend.Status import Status
+from consumptionbackend.client import Client
+from consumptionbackend.daemon import Daemon
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+db = sqlite3.connect("testdb.db")
+DatabaseHandler.DB_CONNECTION = db
+
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self) -> None:
+        # Stands in for the connection setup() opens on import
+        self.setup_connection = sqlite3.connect("testdb.db")
+        DatabaseHandler.DB_CONNECTION = self.setup_connection
+        DatabaseInstantiator.run()
+        self.directory = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.directory.name, "daemon.sock")
+        self.daemon = Daemon(self.socket_path, "testdb.db")
+        self.thread = threading.Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+        self.client = Client(self.socket_path)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.daemon.shutdown()
+        self.thread.join()
+        self.daemon.server_close()
+        self.directory.cleanup()
+        DatabaseHandler.DB_CONNECTION = db
+        drop = sqlite3.connect("testdb.db")
+        drop.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_NAME}")
+        drop.cursor().execute(
+            f"DROP TABLE IF EXISTS {Consumable.DB_PERSONNEL_MAPPING_NAME}"
+        )
+        drop.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_TAG_MAPPING_NAME}")
+        drop.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_NAME}")
+        drop.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_NAME}")
+        drop.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_STATS_NAME}")
+        drop.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_TRIGRAMS_NAME}")
+        drop.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_TRIGRAMS_NAME}")
+
+    def test_entities(self):
+        series = self.client.Series.new(name="Discworld")
+        self.assertIsInstance(series, Series)
+        cons = self.client.Consumable.new(
+            name="Mort", type="Novel", series_id=series.id, status=Status.IN_PROGRESS
+        )
+        self.assertIsInstance(cons, Consumable)
+        self.assertEqual(cons.type, "NOVEL")
+        self.assertEqual(cons.status, Status.IN_PROGRESS)
+        self.assertIsNotNone(cons.start_date)
+        self.assertEqual(cons.get_series().name, "Discworld")
+        cons.add_tag("fantasy")
+        self.assertEqual(cons.get_tags(), ["fantasy"])
+        personnel = self.client.Personnel.new(first_name="Terry", last_name="Pratchett")
+        personnel.role = "Author"
+        cons.add_personnel(personnel)
+        self.assertEqual(cons.get_personnel()[0].role, "Author")
+        found = self.client.Series.find(name="Discworld", with_stats=True)[0]
+        self.assertEqual(found.stats.consumables, 1)
+        self.assertEqual(found.stats.status_counts[Status.IN_PROGRESS], 1)
+        self.assertEqual(self.client.Series.fuzzy_find("Diskworld")[0][0].id, series.id)
+        self.assertIsInstance(self.client.Series.fuzzy_find("Diskworld")[0], tuple)
+        # Local sees what the daemon wrote
+        self.assertTrue(Consumable.find(id=cons.id)[0]._precise_eq(cons))
+
+    def test_save(self):
+        cons = self.client.Consumable.new(name="Mort", type="Novel")
+        cons.parts = 3
+        self.assertTrue(cons.is_dirty())
+        self.assertTrue(cons.save())
+        self.assertFalse(cons.is_dirty())
+        self.assertEqual(Consumable.find(id=cons.id)[0].parts, 3)
+        self.assertFalse(cons.save())
+        self.assertTrue(cons.delete_self())
+        self.assertEqual(self.client.Consumable.find(id=cons.id), [])
+
+    def test_errors(self):
+        self.assertRaises(ValueError, self.client.Consumable.find, colour="red")
+        self.assertRaises(
+            ValueError, self.client.call, "Consumable._cursor", None, (), {}
+        )
+        self.assertRaises(ValueError, self.client.call, "os.system", None, (), {})
+        # The connection survives failed calls
+        self.assertEqual(self.client.Consumable.find(name="%"), [])
+
+    def test_clients(self):
+        # The first client stays connected while a second one is served
+        other = Client(self.socket_path)
+        try:
+            other.Consumable.new(name="Mort", type="Novel")
+            self.assertEqual(len(self.client.Consumable.find(name="Mort")), 1)
+            found = []
+            threads = [
+                threading.Thread(
+                    target=lambda c=c: found.extend(
+                        c.Consumable.new(name=f"Sourcery {i}", type="Novel")
+                        for i in range(20)
+                    )
+                )
+                for c in (self.client, other)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len({c.id for c in found}), 40)
+        finally:
+            other.close()
+
+    def test_setup(self):
+        # The replaced connection is closed and a new file gets the schema
+        self.assertRaises(
+            sqlite3.ProgrammingError, self.setup_connection.execute, "SELECT 1"
+        )
+        path = os.path.join(self.directory.name, "new.db")
+        socket_path = os.path.join(self.directory.name, "new.sock")
+        with Daemon(socket_path, path):
+            self.assertEqual(DatabaseInstantiator.get_schema_version(), SCHEMA_VERSION)
+            self.assertEqual(Consumable.find(), [])
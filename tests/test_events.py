@@ -0,0 +1,130 @@
+from consumptionbackend.Personnel import Personnel
+from consumptionbackend.Series import Series
+from consumptionbackend.Consumable import Consumable
+from consumptionbackend.Database import DatabaseHandler, DatabaseInstantiator
+from consumptionbackend.Status import Status
+from consumptionbackend import events
+from datetime import datetime, timezone
+import sqlite3
+import unittest
+
+db = sqlite3.connect("testdb.db")
+DatabaseHandler.DB_CONNECTION = db
+
+
+def posix(year: int, month: int, day: int = 1) -> int:
+    return int(datetime(year, month, day, tzinfo=timezone.utc).timestamp())
+
+
+class TestEvents(unittest.TestCase):
+    def setUp(self) -> None:
+        DatabaseHandler.DB_CONNECTION = db
+        DatabaseInstantiator.run()
+        # Other suites leave their history behind
+        db.cursor().execute(f"DELETE FROM {events.EVENTS_NAME}")
+        db.commit()
+
+    def tearDown(self) -> None:
+        db = sqlite3.connect("testdb.db")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_NAME}")
+        db.cursor().execute(
+            f"DROP TABLE IF EXISTS {Consumable.DB_PERSONNEL_MAPPING_NAME}"
+        )
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_STATS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {events.EVENTS_NAME}")
+
+    def _events(self, rows):
+        # Synthetic history at chosen times, (timestamp, id, field, old, new)
+        db.cursor().executemany(
+            f"INSERT INTO {events.EVENTS_NAME} VALUES (?,?,?,?,?)",
+            [
+                (timestamp, id, events.EVENT_FIELDS.index(field), old, new)
+                for timestamp, id, field, old, new in rows
+            ],
+        )
+        db.commit()
+
+    def test_triggers(self):
+        book = Consumable.new(
+            name="a",
+            type="Novel",
+            status=Status.IN_PROGRESS,
+            start_date=posix(2023, 1, 1),
+        )
+        other = Consumable.new(name="b", type="Novel")
+        book.increment_parts(2)
+        Consumable.update({"id": book.id}, {"rating": 5.0})
+        Consumable.update({"id": book.id}, {"parts": 2})
+        Consumable.update({"id": book.id}, {"status": Status.COMPLETED})
+        history = [event[2:] for event in events.history(book.id)]
+        self.assertEqual(
+            history,
+            [
+                ("status", None, Status.IN_PROGRESS),
+                ("parts", 0, 2),
+                ("status", Status.IN_PROGRESS, Status.COMPLETED),
+                ("completions", 0, 1),
+            ],
+        )
+        self.assertEqual(events.history(other.id), [])
+        self.assertEqual(
+            [event[2:] for event in events.history(book.id, fields=["parts"])],
+            [("parts", 0, 2)],
+        )
+        # Completing with no parts fills them in through the triggers
+        Consumable.update({"id": other.id}, {"status": Status.COMPLETED})
+        self.assertIn(("parts", 0, 1), [e[2:] for e in events.history(other.id)])
+        # Append only, deleting keeps the history
+        Consumable.delete(id=book.id)
+        self.assertEqual(len(events.history(book.id)), 4)
+        self.assertEqual(len(events.between(fields=["status"])), 3)
+        self.assertRaises(ValueError, events.history, book.id, ["rating"])
+        self.assertRaises(ValueError, events.between, 2, 1)
+
+    def test_analytics(self):
+        self._events(
+            [
+                (posix(2023, 1, 1), 1, "parts", 0, 2),
+                (posix(2023, 1, 1) + 3600, 2, "parts", None, 1),
+                (posix(2023, 1, 3), 1, "parts", 2, 5),
+                # Corrections downwards are not progress
+                (posix(2023, 1, 4), 2, "parts", 1, 0),
+                (posix(2023, 1, 11), 1, "parts", 5, 12),
+                (posix(2023, 1, 11), 1, "status", 1, 4),
+            ]
+        )
+        self.assertEqual(
+            events.parts_per_day(),
+            [("2023-01-01", 3), ("2023-01-03", 3), ("2023-01-11", 7)],
+        )
+        self.assertEqual(
+            events.parts_per_day(start=posix(2023, 1, 2), end=posix(2023, 1, 5)),
+            [("2023-01-03", 3)],
+        )
+        self.assertEqual(events.parts_per_day(consumable_id=2), [("2023-01-01", 1)])
+        self.assertEqual(events.pace(), {1: 1.2, 2: 1.0})
+        self.assertEqual(events.pace(consumable_id=1, end=posix(2023, 1, 4)), {1: 2.5})
+        between = events.between(posix(2023, 1, 11), posix(2023, 1, 12))
+        self.assertEqual(
+            [event[2:] for event in between],
+            [("parts", 5, 12), ("status", Status.IN_PROGRESS, Status.COMPLETED)],
+        )
+
+    def test_covering(self):
+        for sql, values in [
+            events._events_sql(0, 10, ["parts"]),
+            events._events_sql(consumable_id=1),
+            events._progress_sql("consumable_id", 0, 10),
+        ]:
+            cur = db.cursor()
+            cur.execute(f"EXPLAIN QUERY PLAN {sql}", values)
+            plan = " ".join(row[3] for row in cur.fetchall())
+            self.assertIn("COVERING INDEX", plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
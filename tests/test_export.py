@@ -0,0 +1,70 @@
+from consumptionbackend.Personnel import Personnel
+from consumptionbackend.Series import Series
+from consumptionbackend.Consumable import Consumable
+from consumptionbackend.Database import DatabaseHandler, DatabaseInstantiator
+from consumptionbackend.export_handling import export_library
+import csv
+import io
+import json
+import sqlite3
+import unittest
+
+db = sqlite3.connect("testdb.db")
+DatabaseHandler.DB_CONNECTION = db
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self) -> None:
+        DatabaseHandler.DB_CONNECTION = db
+        DatabaseInstantiator.run()
+        series = Series.new(name="Export Series")
+        self.first = Consumable.new(name="First", type="Novel", series_id=series.id)
+        self.second = Consumable.new(name="Second", type="Film", status=4)
+        self.first.add_tag("b")
+        self.first.add_tag("a")
+        author = Personnel.new(first_name="Ex", last_name="Port")
+        author.role = "Author"
+        self.first.add_personnel(author)
+        self.second.add_personnel(author)
+
+    def tearDown(self) -> None:
+        db = sqlite3.connect("testdb.db")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_NAME}")
+        db.cursor().execute(
+            f"DROP TABLE IF EXISTS {Consumable.DB_PERSONNEL_MAPPING_NAME}"
+        )
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_TAG_MAPPING_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_STATS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_TRIGRAMS_NAME}")
+
+    def test_ndjson(self):
+        out = io.StringIO()
+        self.assertEqual(export_library(out), 2)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(records[0]["id"], self.first.id)
+        self.assertEqual(records[0]["series"], "Export Series")
+        self.assertEqual(records[0]["tags"], ["a", "b"])
+        self.assertEqual(records[0]["personnel"][0]["role"], "Author")
+        self.assertEqual(records[1]["series"], "None")
+        self.assertEqual(records[1]["status"], "COMPLETED")
+        self.assertEqual(records[1]["tags"], [])
+        self.assertEqual(len(records[1]["personnel"]), 1)
+
+    def test_csv(self):
+        out = io.StringIO()
+        export_library(out, format="csv")
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["tags"], "a;b")
+        credits = json.loads(rows[0]["personnel"])
+        self.assertEqual(credits[0]["first_name"], "Ex")
+        self.assertEqual(credits[0]["role"], "Author")
+        with self.assertRaises(ValueError):
+            export_library(out, format="xml")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+from consumptionbackend.Personnel import Personnel
+from consumptionbackend.Series import Series
+from consumptionbackend.Consumable import Consumable
+from consumptionbackend.Database import DatabaseHandler, DatabaseInstantiator
+from consumptionbackend.Status import Status
+from consumptionbackend.import_handling import import_library
+from consumptionbackend.export_handling import export_library
+import io
+import json
+import sqlite3
+import unittest
+
+db = sqlite3.connect("testdb.db")
+DatabaseHandler.DB_CONNECTION = db
+
+RECORDS = [
+    {
+        "name": "Imported",
+        "type": "novel",
+        "status": "COMPLETED",
+        "series": "Imported Series",
+        "tags": ["Fantasy", "classic"],
+        "personnel": [
+            {"first_name": "Ursula", "last_name": "Le Guin", "role": "Author"}
+        ],
+    },
+    {
+        "name": "Sequel",
+        "type": "novel",
+        "status": 1,
+        "series": "Imported Series",
+        "personnel": ['[Author] Ursula "" Le Guin', "[Illustrator] Jo Doe"],
+    },
+    {"name": "", "type": "novel"},
+    {"name": "Bad Dates", "type": "film", "start_date": 10, "end_date": 5},
+]
+
+
+class TestImport(unittest.TestCase):
+    def setUp(self) -> None:
+        DatabaseHandler.DB_CONNECTION = db
+        DatabaseInstantiator.run()
+        Personnel.new(first_name="Ursula", last_name="Le Guin")
+
+    def tearDown(self) -> None:
+        db = sqlite3.connect("testdb.db")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_NAME}")
+        db.cursor().execute(
+            f"DROP TABLE IF EXISTS {Consumable.DB_PERSONNEL_MAPPING_NAME}"
+        )
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_TAG_MAPPING_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_STATS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_TRIGRAMS_NAME}")
+
+    def _check(self, result, errors):
+        self.assertEqual(result.read, len(errors) + 2)
+        self.assertEqual(result.written, 2)
+        self.assertEqual([line for line, _ in result.errors], errors)
+        imported = Consumable.find(name="Imported")[0]
+        self.assertEqual(imported.status, Status.COMPLETED)
+        self.assertEqual(imported.type, "NOVEL")
+        self.assertEqual(imported.completions, 1)
+        self.assertEqual(sorted(imported.get_tags()), ["classic", "fantasy"])
+        sequel = Consumable.find(name="Sequel")[0]
+        self.assertEqual(sequel.series_id, imported.series_id)
+        self.assertEqual(len(Series.find(name="Imported Series")), 1)
+        # The existing author is reused, the illustrator is created
+        self.assertEqual(len(Personnel.find(first_name="Ursula")), 1)
+        self.assertEqual(len(Personnel.find()), 2)
+        self.assertEqual(len(sequel.get_personnel()), 2)
+
+    def test_import_inline(self):
+        lines = [json.dumps(record) for record in RECORDS]
+        source = io.StringIO("\n".join(lines[:2] + ["{broken"] + lines[2:]))
+        progress = []
+        result = import_library(
+            source, workers=0, batch_size=1, progress=progress.append
+        )
+        self._check(result, [3, 4, 5])
+        self.assertGreaterEqual(len(progress), 2)
+
+    def test_import_process_pool(self):
+        source = io.StringIO(json.dumps(RECORDS))
+        result = import_library(source, format="json", workers=2, chunk_size=1)
+        self._check(result, [3, 4])
+
+    def test_csv_round_trip(self):
+        mononym = Personnel.new(last_name="Mononym")
+        mononym.role = "Author"
+        Consumable.new(name="Exported", type="Novel").add_personnel(mononym)
+        out = io.StringIO()
+        export_library(out, format="csv")
+        Consumable.delete(name="Exported")
+        result = import_library(io.StringIO(out.getvalue()), format="csv", workers=0)
+        self.assertEqual(result.errors, [])
+        credits = Consumable.find(name="Exported")[0].get_personnel()
+        self.assertEqual([c.id for c in credits], [mononym.id])
+        self.assertEqual(len(Personnel.find()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
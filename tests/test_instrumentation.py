@@ -0,0 +1,61 @@
+from consumptionbackend.Personnel import Personnel
+from consumptionbackend.Series import Series
+from consumptionbackend.Consumable import Consumable
+from consumptionbackend.Database import DatabaseHandler, DatabaseInstantiator
+import sqlite3
+import unittest
+
+db = sqlite3.connect("testdb.db")
+DatabaseHandler.DB_CONNECTION = db
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self) -> None:
+        DatabaseHandler.DB_CONNECTION = db
+        DatabaseInstantiator.run()
+        DatabaseHandler.enable_instrumentation(slow_query_ms=0.0)
+
+    def tearDown(self) -> None:
+        DatabaseHandler.disable_instrumentation()
+        db = sqlite3.connect("testdb.db")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_NAME}")
+        db.cursor().execute(
+            f"DROP TABLE IF EXISTS {Consumable.DB_PERSONNEL_MAPPING_NAME}"
+        )
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_STATS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_TRIGRAMS_NAME}")
+
+    def test_query_counts(self):
+        for i in range(3):
+            Consumable.new(name=f"instrumented {i}", type="Novel")
+        Consumable.find(name="instrumented")
+        for consumable in Consumable.find(name="instrumented"):
+            consumable.get_tags()
+        stats = DatabaseHandler.query_stats()
+        tag_queries = [
+            query for template, query in stats["queries"].items() if "tag" in template
+        ]
+        self.assertEqual(len(tag_queries), 1)
+        self.assertEqual(tag_queries[0]["count"], 3)
+        find_query = [
+            query
+            for template, query in stats["queries"].items()
+            if template.startswith("SELECT * FROM consumables WHERE")
+        ][0]
+        self.assertEqual(find_query["count"], 2)
+        self.assertEqual(find_query["rows"], 6)
+        self.assertGreater(len(stats["traced"]), 0)
+        self.assertGreater(len(stats["slow"]), 0)
+
+    def test_disable(self):
+        DatabaseHandler.disable_instrumentation()
+        self.assertIs(DatabaseHandler.get_db(), db)
+        with self.assertRaises(RuntimeError):
+            DatabaseHandler.query_stats()
+
+
+if __name__ == "__main__":
+    unittest.main()
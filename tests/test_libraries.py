@@ -0,0 +1,124 @@
+from consumptionbackend.Personnel import Personnel
+from consumptionbackend.Consumable import Consumable
+from consumptionbackend.Database import DatabaseHandler
+from consumptionbackend.Status import Status
+import os
+import sqlite3
+import tempfile
+import unittest
+
+db = sqlite3.connect("testdb.db")
+DatabaseHandler.DB_CONNECTION = db
+
+
+class TestLibraries(unittest.TestCase):
+    def setUp(self) -> None:
+        DatabaseHandler.DB_CONNECTION = db
+        self.directory = tempfile.TemporaryDirectory()
+        for name in ("alice", "bob"):
+            DatabaseHandler.add_library(
+                name, os.path.join(self.directory.name, f"{name}.db")
+            )
+
+    def tearDown(self) -> None:
+        DatabaseHandler.use_library(None)
+        for name in DatabaseHandler.LIBRARIES.names():
+            DatabaseHandler.remove_library(name)
+        self.directory.cleanup()
+
+    def _fill(self) -> None:
+        with DatabaseHandler.library("alice"):
+            author = Personnel.new(first_name="Ursula", last_name="Le Guin")
+            author.role = "Author"
+            book = Consumable.new(
+                name="Earthsea", type="Novel", status=Status.COMPLETED, rating=9.0
+            )
+            book.add_tag("fantasy")
+            book.add_personnel(author)
+        with DatabaseHandler.library("bob"):
+            author = Personnel.new(first_name="Ursula", last_name="Le Guin")
+            author.role = "Author"
+            for name in ("Dispossessed", "Lathe of Heaven"):
+                book = Consumable.new(name=name, type="Novel")
+                book.add_personnel(author)
+            book.add_tag("fantasy")
+
+    def test_isolation(self):
+        self._fill()
+        self.assertIsNone(DatabaseHandler.ACTIVE_LIBRARY)
+        self.assertIs(DatabaseHandler.DB_CONNECTION, db)
+        with DatabaseHandler.library("alice"):
+            self.assertEqual([c.name for c in Consumable.find()], ["Earthsea"])
+            # Writing to one library while another holds its write lock
+            bob = DatabaseHandler.LIBRARIES.connection("bob")
+            bob.execute(f"UPDATE {Consumable.DB_NAME} SET parts = 1")
+            Consumable.new(name="Tehanu", type="Novel")
+            bob.commit()
+        with DatabaseHandler.library("bob"):
+            self.assertEqual(len(Consumable.find(parts=1)), 2)
+        # The combined connection only reads
+        self.assertRaises(
+            sqlite3.OperationalError,
+            DatabaseHandler.get_combined_db().execute,
+            f'DELETE FROM "alice".{Consumable.DB_NAME}',
+        )
+        DatabaseHandler.use_library("bob")
+        self.assertRaises(RuntimeError, DatabaseHandler.remove_library, "bob")
+        self.assertRaises(ValueError, DatabaseHandler.use_library, "carol")
+        self.assertRaises(ValueError, DatabaseHandler.add_library, "main", "x.db")
+        self.assertRaises(ValueError, DatabaseHandler.add_library, "a-b", "x.db")
+
+    def test_combined(self):
+        self._fill()
+        found = Consumable.find_across(type="Novel")
+        self.assertEqual(
+            [(library, c.name) for library, c in found],
+            [
+                ("alice", "Earthsea"),
+                ("bob", "Dispossessed"),
+                ("bob", "Lathe of Heaven"),
+            ],
+        )
+        # Ids repeat across libraries, tags must match within one
+        tagged = Consumable.find_across(tags=["fantasy"])
+        self.assertEqual(
+            [(library, c.name) for library, c in tagged],
+            [("alice", "Earthsea"), ("bob", "Lathe of Heaven")],
+        )
+        self.assertEqual(len(Consumable.find_across(libraries=["bob"])), 2)
+
+        stats = Personnel.aggregate_across(role="Author")
+        self.assertEqual(
+            [(library, p.last_name, s.consumables) for library, p, s in stats],
+            [("bob", "Le Guin", 2), ("alice", "Le Guin", 1)],
+        )
+        self.assertEqual(stats[1][2].completed, 1)
+        self.assertEqual(stats[1][2].average_rating(), 9.0)
+        self.assertEqual(len(Personnel.aggregate_across(libraries=["alice"])), 1)
+        # Writes from the library connections are visible straight away
+        with DatabaseHandler.library("alice"):
+            Consumable.new(name="Tehanu", type="Novel")
+        self.assertEqual(len(Consumable.find_across(type="Novel")), 4)
+
+    def test_flush(self):
+        self._fill()
+        with DatabaseHandler.library("alice"):
+            earthsea = Consumable.find(name="Earthsea")[0]
+        with DatabaseHandler.library("bob"):
+            dispossessed = Consumable.find(name="Dispossessed")[0]
+        # Both have the same id, each is saved to its own library
+        self.assertEqual(earthsea.id, dispossessed.id)
+        earthsea.parts = 3
+        dispossessed.parts = 5
+        _, lathe = Consumable.find_across(libraries=["bob"], name="Lathe")[0]
+        lathe.rating = 7.0
+        self.assertEqual(DatabaseHandler.flush(), 3)
+        self.assertIsNone(DatabaseHandler.ACTIVE_LIBRARY)
+        parts = {
+            library: c.parts
+            for library, c in Consumable.find_across(name="Dispossessed")
+            + Consumable.find_across(name="Earthsea")
+        }
+        self.assertEqual(parts, {"alice": 3, "bob": 5})
+        with DatabaseHandler.library("bob"):
+            self.assertEqual(Consumable.find(name="Lathe")[0].rating, 7.0)
@@ -0,0 +1,82 @@
+from consumptionbackend.Consumable import Consumable
+from consumptionbackend.Database import DatabaseHandler, DatabaseInstantiator
+import os
+import sqlite3
+import tempfile
+import unittest
+
+
+class TestMaintenance(unittest.TestCase):
+    def setUp(self) -> None:
+        self.previous = DatabaseHandler.DB_CONNECTION
+        DatabaseHandler.LAST_MAINTENANCE = None
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "maintenance.db")
+        DatabaseHandler.DB_CONNECTION = sqlite3.connect(self.path)
+        DatabaseInstantiator.run()
+
+    def tearDown(self) -> None:
+        DatabaseHandler.schedule_maintenance(writes=None, on_close=False)
+        DatabaseHandler.close()
+        DatabaseHandler.DB_CONNECTION = self.previous
+        self.directory.cleanup()
+
+    def _fill(self, count: int) -> None:
+        db = DatabaseHandler.get_db()
+        db.executemany(
+            f"INSERT INTO {Consumable.DB_NAME} (name, type) VALUES (?, ?)",
+            [(f"Book {i} " + "x" * 200, "NOVEL") for i in range(count)],
+        )
+        db.commit()
+
+    def test_maintain(self):
+        db = DatabaseHandler.get_db()
+        self.assertEqual(db.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+        self._fill(5000)
+        db.execute(f"DELETE FROM {Consumable.DB_NAME}")
+        db.commit()
+        self.assertGreater(db.execute("PRAGMA freelist_count").fetchone()[0], 0)
+        result = DatabaseHandler.maintain()
+        self.assertGreater(result["reclaimed_pages"], 0)
+        self.assertEqual(
+            result["reclaimed_bytes"],
+            result["reclaimed_pages"] * db.execute("PRAGMA page_size").fetchone()[0],
+        )
+        self.assertEqual(result["free_pages_after"], 0)
+        self.assertEqual(DatabaseHandler.LAST_MAINTENANCE, result)
+        cur = db.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        )
+        self.assertEqual(cur.fetchone()[0], 1)
+
+    def test_schedule(self):
+        self.assertRaises(ValueError, DatabaseHandler.schedule_maintenance, writes=0)
+        DatabaseHandler.schedule_maintenance(writes=1000, on_close=True)
+        self._fill(10)
+        DatabaseHandler.get_db()
+        self.assertIsNone(DatabaseHandler.LAST_MAINTENANCE)
+        self._fill(1000)
+        DatabaseHandler.get_db()
+        self.assertIsNotNone(DatabaseHandler.LAST_MAINTENANCE)
+        DatabaseHandler.LAST_MAINTENANCE = None
+        DatabaseHandler.close()
+        self.assertIsNotNone(DatabaseHandler.LAST_MAINTENANCE)
+        self.assertIsNone(DatabaseHandler.DB_CONNECTION)
+        DatabaseHandler.DB_CONNECTION = sqlite3.connect(self.path)
+
+    def test_enable_incremental_vacuum(self):
+        path = os.path.join(self.directory.name, "old.db")
+        old = sqlite3.connect(path)
+        old.execute("PRAGMA auto_vacuum = 0")
+        old.execute("CREATE TABLE kept (value)")
+        old.execute("INSERT INTO kept VALUES (1)")
+        old.commit()
+        DatabaseHandler.close()
+        DatabaseHandler.DB_CONNECTION = old
+        # Existing files are only rebuilt when asked to
+        DatabaseInstantiator.run()
+        self.assertEqual(old.execute("PRAGMA auto_vacuum").fetchone()[0], 0)
+        self.assertTrue(DatabaseHandler.enable_incremental_vacuum())
+        self.assertEqual(old.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+        self.assertEqual(old.execute("SELECT value FROM kept").fetchall(), [(1,)])
+        self.assertFalse(DatabaseHandler.enable_incremental_vacuum())
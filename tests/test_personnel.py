@@ -2,6 +2,7 @@ from consumptionbackend.Personnel import Personnel
 from consumptionbackend.Series import Series
 from consumptionbackend.Consumable import Consumable
 from consumptionbackend.Database import DatabaseHandler, DatabaseInstantiator
+from consumptionbackend.Status import Status
 import sqlite3
 import unittest
 
@@ -21,6 +22,9 @@ class TestPersonnel(unittest.TestCase):
         )
         db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_NAME}")
         db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_STATS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_TRIGRAMS_NAME}")
 
     def test_new(self):
         d = {"first_name": "test_new", "last_name": "World", "pseudonym": "!!"}
@@ -52,6 +56,83 @@ class TestPersonnel(unittest.TestCase):
         verify = Personnel.find(**d)
         self.assertEqual(len(verify), 0)
 
+    def test_upsert_many(self):
+        existing = Personnel.new(first_name="Ursula", last_name="Le Guin")
+        upserted = Personnel.upsert_many(
+            [
+                {"first_name": "Ursula", "last_name": "Le Guin"},
+                {"first_name": "Ursula", "last_name": "Le Guin", "pseudonym": "UKL"},
+            ]
+        )
+        self.assertEqual(len(upserted), 2)
+        self.assertIn(existing.id, [p.id for p in upserted])
+        self.assertEqual(len(Personnel.find(first_name="Ursula")), 2)
+        with self.assertRaises(ValueError):
+            Personnel.upsert_many([{"role": "Author"}])
+
+    def test_fuzzy_find(self):
+        tolkien = Personnel.new(first_name="J.R.R.", last_name="Tolkien")
+        Personnel.new(first_name="Ursula", last_name="Le Guin", pseudonym="UKL")
+        Personnel.new(first_name="Tom", last_name="Kent")
+        found = Personnel.fuzzy_find("Tolkein")
+        self.assertEqual(found[0][0].id, tolkien.id)
+        self.assertTrue(all(a[1] >= b[1] for a, b in zip(found, found[1:])))
+        exact = Personnel.fuzzy_find("j.r.r.  tolkien", limit=1)
+        self.assertEqual(exact[0][1], 1.0)
+        Personnel.update({"id": tolkien.id}, {"last_name": "Pratchett"})
+        self.assertEqual(Personnel.fuzzy_find("Tolkien", min_similarity=0.5), [])
+        self.assertEqual(Personnel.fuzzy_find("UKL Le Guin")[0][0].pseudonym, "UKL")
+
+    def test_aggregate(self):
+        author = Personnel.new(first_name="Terry", last_name="Pratchett")
+        artist = Personnel.new(first_name="Paul", last_name="Kidby")
+        books = [
+            Consumable.new(
+                name="Mort", type="Novel", status=Status.COMPLETED, rating=9.0
+            ),
+            Consumable.new(
+                name="Eric", type="Novel", status=Status.COMPLETED, rating=7.0
+            ),
+            Consumable.new(name="Snuff", type="Novel", status=Status.PLANNING),
+        ]
+        for book in books:
+            author.role = "Author"
+            book.add_personnel(author)
+        author.role = "Illustrator"
+        books[0].add_personnel(author)
+        for book in books[1:]:
+            artist.role = "Illustrator"
+            book.add_personnel(artist)
+
+        stats = author.get_stats()
+        self.assertEqual(stats.consumables, 3)
+        self.assertEqual(stats.completed, 2)
+        self.assertEqual(stats.average_rating(), 8.0)
+        self.assertEqual(stats.first_activity, books[0].start_date or books[0].end_date)
+        self.assertEqual(author.get_stats(role="Illustrator").consumables, 1)
+        self.assertEqual(artist.get_stats(role="Author").consumables, 0)
+        self.assertEqual(
+            {role: s.consumables for role, s in author.get_role_stats().items()},
+            {"Author": 3, "Illustrator": 1},
+        )
+
+        illustrators = Personnel.aggregate(role="Illustrator", order_by="completed")
+        self.assertEqual([p.id for p, _ in illustrators], [author.id, artist.id])
+        self.assertEqual(illustrators[0][0].role, "Illustrator")
+        self.assertEqual(illustrators[1][1].completed, 1)
+        top = Personnel.aggregate(order_by="average_rating", limit=1)
+        self.assertEqual(top[0][0].id, author.id)
+        by_role = Personnel.aggregate(by_role=True, order_by="consumables")
+        self.assertEqual(
+            [(p.id, s.role, s.consumables) for p, s in by_role],
+            [
+                (author.id, "Author", 3),
+                (artist.id, "Illustrator", 2),
+                (author.id, "Illustrator", 1),
+            ],
+        )
+        self.assertRaises(ValueError, Personnel.aggregate, order_by="id; DROP")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,111 @@
+from consumptionbackend.Personnel import Personnel
+from consumptionbackend.Series import Series
+from consumptionbackend.Consumable import Consumable
+from consumptionbackend.Database import DatabaseHandler, DatabaseInstantiator
+from consumptionbackend.ChangeTracker import ChangeTracker
+import sqlite3
+import unittest
+
+db = sqlite3.connect("testdb.db")
+DatabaseHandler.DB_CONNECTION = db
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self) -> None:
+        DatabaseHandler.DB_CONNECTION = db
+        DatabaseInstantiator.run()
+        DatabaseHandler.enable_cache()
+
+    def tearDown(self) -> None:
+        DatabaseHandler.disable_cache()
+        db = sqlite3.connect("testdb.db")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_NAME}")
+        db.cursor().execute(
+            f"DROP TABLE IF EXISTS {Consumable.DB_PERSONNEL_MAPPING_NAME}"
+        )
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_TAG_MAPPING_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_STATS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {ChangeTracker.GENERATIONS_NAME}")
+        db.cursor().execute("DROP TABLE IF EXISTS uncached")
+
+    def test_hits(self):
+        cons = Consumable.new(name="Cached", type="Novel")
+        first = Consumable.find(name="Cached")
+        stats = DatabaseHandler.cache_stats()
+        self.assertEqual(stats["hits"], 0)
+        second = Consumable.find(name="Cached")
+        self.assertTrue(first[0]._precise_eq(second[0]))
+        self.assertEqual(DatabaseHandler.cache_stats()["hits"], 1)
+        self.assertEqual(cons.get_tags(), [])
+        self.assertEqual(cons.get_tags(), [])
+        stats = DatabaseHandler.cache_stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertGreater(stats["hit_rate"], 0)
+        self.assertGreater(stats["bytes"], 0)
+
+    def test_invalidation(self):
+        cons = Consumable.new(name="Cached", type="Novel")
+        self.assertEqual(cons.get_tags(), [])
+        cons.add_tag("fresh")
+        self.assertEqual(cons.get_tags(), ["fresh"])
+        self.assertEqual(DatabaseHandler.cache_stats()["invalidations"], 1)
+        Consumable.find(name="Cached")
+        cons.update_self({"parts": 5})
+        self.assertEqual(Consumable.find(name="Cached")[0].parts, 5)
+        # Series stats are kept by triggers on consumables
+        series = Series.new(name="Cached Series")
+        self.assertEqual(
+            Series.find(id=series.id, with_stats=True)[0].stats.consumables, 0
+        )
+        cons.set_series(series)
+        self.assertEqual(
+            Series.find(id=series.id, with_stats=True)[0].stats.consumables, 1
+        )
+        # Commits by another connection
+        other = sqlite3.connect("testdb.db")
+        other.execute(f"UPDATE {Consumable.DB_NAME} SET parts = 7")
+        other.commit()
+        other.close()
+        self.assertEqual(Consumable.find(name="Cached")[0].parts, 7)
+
+    def test_uncacheable(self):
+        Consumable.new(name="Cached", type="Novel")
+        db.execute(f"UPDATE {Consumable.DB_NAME} SET parts = 2")
+        # Reads inside an open transaction
+        self.assertEqual(Consumable.find(name="Cached")[0].parts, 2)
+        db.rollback()
+        self.assertEqual(Consumable.find(name="Cached")[0].parts, 0)
+        self.assertEqual(DatabaseHandler.cache_stats()["entries"], 1)
+        DatabaseHandler.get_db().execute("PRAGMA user_version").fetchall()
+        self.assertGreater(DatabaseHandler.cache_stats()["uncacheable"], 0)
+
+    def test_schema_changes(self):
+        Consumable.new(name="Cached", type="Novel")
+        Consumable.find(name="Cached")
+        # A table created after the cache first read the schema
+        db.execute("CREATE TABLE uncached (value)")
+        db.execute("INSERT INTO uncached VALUES (1)")
+        db.commit()
+        sql = f"SELECT COUNT(*) FROM {Consumable.DB_NAME}, uncached"
+        self.assertEqual(DatabaseHandler.get_db().execute(sql).fetchone()[0], 1)
+        db.execute("INSERT INTO uncached VALUES (2)")
+        db.commit()
+        self.assertEqual(DatabaseHandler.get_db().execute(sql).fetchone()[0], 2)
+
+    def test_eviction(self):
+        DatabaseHandler.enable_cache(max_bytes=2000)
+        for i in range(20):
+            Consumable.new(name=f"Cached {i}", type="Novel")
+        for i in range(20):
+            Consumable.find(name=f"Cached {i}")
+        stats = DatabaseHandler.cache_stats()
+        self.assertLessEqual(stats["bytes"], 2000)
+        self.assertGreater(stats["evictions"], 0)
+        # Most recently used survive
+        Consumable.find(name="Cached 19")
+        self.assertEqual(DatabaseHandler.cache_stats()["hits"], 1)
+        self.assertRaises(ValueError, DatabaseHandler.enable_cache, max_bytes=0)
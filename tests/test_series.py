@@ -2,6 +2,7 @@ from consumptionbackend.Personnel import Personnel
 from consumptionbackend.Series import Series
 from consumptionbackend.Consumable import Consumable
 from consumptionbackend.Database import DatabaseHandler, DatabaseInstantiator
+from consumptionbackend.Status import Status
 import sqlite3
 import unittest
 
@@ -21,6 +22,9 @@ class TestSeries(unittest.TestCase):
         )
         db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_NAME}")
         db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_STATS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_TRIGRAMS_NAME}")
 
     def test_new(self):
         d = {"name": "test_new"}
@@ -51,6 +55,35 @@ class TestSeries(unittest.TestCase):
         verify = Series.find(name="test_delete")
         self.assertEqual(len(verify), 0)
 
+    def test_find_with_stats(self):
+        serTest = Series.new(name="test_stats")
+        c1 = Consumable.new(
+            series_id=serTest.id, name="A", type="Novel", status=4, rating=8.0
+        )
+        Consumable.new(series_id=serTest.id, name="B", type="Novel", status=1)
+        c3 = Consumable.new(
+            series_id=serTest.id, name="C", type="Novel", status=0, rating=6.0
+        )
+        c3.update_self({"status": 4})
+        c1.delete_self()
+        stats = Series.find(id=serTest.id, with_stats=True)[0].stats
+        self.assertEqual(stats.consumables, 2)
+        self.assertEqual(stats.completed, 1)
+        self.assertEqual(stats.status_counts[Status.IN_PROGRESS], 1)
+        self.assertEqual(stats.average_rating(), 6.0)
+        self.assertIsNotNone(stats.first_start_date)
+        self.assertIsNotNone(stats.last_end_date)
+        self.assertIsNone(Series.find(id=serTest.id)[0].stats)
+
+    def test_fuzzy_find(self):
+        discworld = Series.new(name="Discworld")
+        Series.new(name="Earthsea")
+        found = Series.fuzzy_find("Diskworld")
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found[0][0].id, discworld.id)
+        discworld.delete_self()
+        self.assertEqual(Series.fuzzy_find("Discworld"), [])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,78 @@
+from consumptionbackend.Personnel import Personnel
+from consumptionbackend.Series import Series
+from consumptionbackend.Consumable import Consumable
+from consumptionbackend.Database import DatabaseHandler, DatabaseInstantiator
+from consumptionbackend import timeline
+from datetime import datetime, timezone
+import sqlite3
+import unittest
+
+db = sqlite3.connect("testdb.db")
+DatabaseHandler.DB_CONNECTION = db
+
+DAY = 86400.0
+
+
+def posix(year: int, month: int, day: int = 1) -> float:
+    return datetime(year, month, day, tzinfo=timezone.utc).timestamp()
+
+
+class TestTimeline(unittest.TestCase):
+    def setUp(self) -> None:
+        DatabaseHandler.DB_CONNECTION = db
+        DatabaseInstantiator.run()
+        timeline.refresh(full=True)
+
+    def tearDown(self) -> None:
+        db = sqlite3.connect("testdb.db")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_NAME}")
+        db.cursor().execute(
+            f"DROP TABLE IF EXISTS {Consumable.DB_PERSONNEL_MAPPING_NAME}"
+        )
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_STATS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {timeline.BUCKETS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {timeline.DIRTY_NAME}")
+
+    def _completed(self, type, start, end, rating=None):
+        return Consumable.new(
+            name="timeline",
+            type=type,
+            status=4,
+            start_date=start,
+            end_date=end,
+            rating=rating,
+        )
+
+    def test_buckets(self):
+        self._completed("Novel", posix(2020, 1, 1), posix(2020, 1, 11), 8.0)
+        self._completed("Novel", posix(2020, 1, 1), posix(2020, 1, 21), 6.0)
+        film = self._completed("Film", posix(2020, 2, 1), posix(2020, 2, 3), 4.0)
+        self._completed("Film", None, posix(2021, 6, 1))
+        self.assertEqual(
+            timeline.completions(), [("2020-01", 2), ("2020-02", 1), ("2021-06", 1)]
+        )
+        self.assertEqual(timeline.completions("year"), [("2020", 3), ("2021", 1)])
+        self.assertEqual(timeline.completions(type="novel"), [("2020-01", 2)])
+        days = timeline.average_days_to_finish()
+        self.assertAlmostEqual(days["NOVEL"], 15.0)
+        self.assertAlmostEqual(days["FILM"], 2.0)
+        rolling = dict(timeline.rolling_rating(months=2))
+        self.assertAlmostEqual(rolling["2020-01"], 7.0)
+        self.assertAlmostEqual(rolling["2020-02"], 6.0)
+        self.assertNotIn("2021-06", rolling)
+
+        # Only the changed month is recomputed
+        film.update_self({"end_date": posix(2020, 3, 5)})
+        self.assertEqual(timeline.refresh(), 2)
+        self.assertEqual(timeline.refresh(), 0)
+        self.assertEqual(
+            timeline.completions(), [("2020-01", 2), ("2020-03", 1), ("2021-06", 1)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
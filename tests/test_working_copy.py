@@ -0,0 +1,111 @@
+from consumptionbackend.Personnel import Personnel
+from consumptionbackend.Series import Series
+from consumptionbackend.Consumable import Consumable
+from consumptionbackend.Database import DatabaseHandler, DatabaseInstantiator
+import sqlite3
+import time
+import unittest
+
+db = sqlite3.connect("testdb.db")
+DatabaseHandler.DB_CONNECTION = db
+
+
+class TestWorkingCopy(unittest.TestCase):
+    def setUp(self) -> None:
+        DatabaseHandler.DB_CONNECTION = db
+        DatabaseInstantiator.run()
+
+    def tearDown(self) -> None:
+        if DatabaseHandler.WORKING_COPY is not None:
+            DatabaseHandler.unload_from_memory(persist=False)
+        db = sqlite3.connect("testdb.db")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Consumable.DB_NAME}")
+        db.cursor().execute(
+            f"DROP TABLE IF EXISTS {Consumable.DB_PERSONNEL_MAPPING_NAME}"
+        )
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_STATS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Series.DB_TRIGRAMS_NAME}")
+        db.cursor().execute(f"DROP TABLE IF EXISTS {Personnel.DB_TRIGRAMS_NAME}")
+
+    def _on_disk(self, name: str) -> int:
+        disk = sqlite3.connect("testdb.db")
+        cur = disk.cursor()
+        cur.execute(f"SELECT COUNT(*) FROM {Consumable.DB_NAME} WHERE name = ?", [name])
+        count = cur.fetchone()[0]
+        disk.close()
+        return count
+
+    def test_persist(self):
+        Consumable.new(name="before", type="Novel")
+        DatabaseHandler.load_into_memory(pages=1)
+        self.assertIsNot(DatabaseHandler.get_db(), db)
+        self.assertEqual(len(Consumable.find(name="before")), 1)
+        Consumable.new(name="in_memory", type="Novel")
+        self.assertEqual(self._on_disk("in_memory"), 0)
+        self.assertTrue(DatabaseHandler.persist())
+        self.assertFalse(DatabaseHandler.persist())
+        self.assertEqual(self._on_disk("in_memory"), 1)
+        DatabaseHandler.unload_from_memory()
+        self.assertIs(DatabaseHandler.get_db(), db)
+        self.assertEqual(len(Consumable.find(name="in_memory")), 1)
+
+    def test_persist_interval(self):
+        DatabaseHandler.load_into_memory(persist_interval=0.05)
+        Consumable.new(name="background", type="Novel")
+        deadline = time.time() + 5
+        while self._on_disk("background") == 0 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self._on_disk("background"), 1)
+
+    def test_external_changes(self):
+        DatabaseHandler.load_into_memory()
+        Consumable.new(name="in_memory", type="Novel")
+        other = sqlite3.connect("testdb.db")
+        other.execute(
+            f"INSERT INTO {Consumable.DB_NAME} (name, type) VALUES ('cli', 'NOVEL')"
+        )
+        other.commit()
+        other.close()
+        self.assertTrue(DatabaseHandler.WORKING_COPY.has_external_changes())
+        with self.assertRaises(RuntimeError):
+            DatabaseHandler.persist()
+        self.assertEqual(self._on_disk("cli"), 1)
+
+    def test_persist_transaction(self):
+        working_copy = DatabaseHandler.load_into_memory(persist_interval=0.02)
+        memory = DatabaseHandler.DB_CONNECTION
+        memory.execute("BEGIN")
+        memory.execute(
+            f"INSERT INTO {Consumable.DB_NAME} (name, type) VALUES ('open', 'NOVEL')"
+        )
+        time.sleep(0.2)
+        # Nothing of an unfinished transaction reaches the file
+        self.assertEqual(self._on_disk("open"), 0)
+        memory.commit()
+        deadline = time.time() + 5
+        while working_copy.is_dirty() and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(self._on_disk("open"), 1)
+
+    def test_persist_interval_external_changes(self):
+        working_copy = DatabaseHandler.load_into_memory(persist_interval=0.02)
+        thread = working_copy._thread
+        other = sqlite3.connect("testdb.db")
+        other.execute(
+            f"INSERT INTO {Consumable.DB_NAME} (name, type) VALUES ('cli', 'NOVEL')"
+        )
+        other.commit()
+        other.close()
+        Consumable.new(name="in_memory", type="Novel")
+        # The thread gives up instead of failing every interval
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertIsInstance(working_copy.persist_error, RuntimeError)
+        self.assertEqual(self._on_disk("cli"), 1)
+        self.assertEqual(self._on_disk("in_memory"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()